@@ -6,8 +6,9 @@ from pydantic_ai import Agent, RunContext
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from pydantic_ai.models.gemini import GeminiModel
-from database import DatabaseService
+from database import AsyncDatabaseService
 from memory import memory_manager
+from rerank import MMR_ENABLED, candidate_count, diversify
 from tavily import TavilyClient
 import uuid
 
@@ -17,7 +18,7 @@ from local_db import sqlite_service
 pending_actions = {}
 
 # Initialize Services
-db_service = DatabaseService()
+db_service = AsyncDatabaseService()
 tavily_api_key = os.getenv("TAVILY_API_KEY")
 tavily_client = TavilyClient(api_key=tavily_api_key) if tavily_api_key else None
 
@@ -51,9 +52,16 @@ def create_model_instance(model_name: str):
         # Default to Gemini if not ollama
         return GeminiModel(model_name)
 
-# Initial model setup
+# Initial model setup: built on first use, since GeminiModel needs GEMINI_API_KEY at construction
 current_model_id = get_current_model_name()
-model = create_model_instance(current_model_id)
+_model = None
+
+def get_model():
+    """The configured default model, created on first use."""
+    global _model
+    if _model is None:
+        _model = create_model_instance(current_model_id)
+    return _model
 
 # Define Agent with Memory Capabilities
 system_prompt = (
@@ -83,8 +91,8 @@ class AetherResponse(BaseModel):
     internal_thought: str = Field(description="Your step-by-step reasoning and deduction about the user's request.")
     final_answer: str = Field(description="The final message you will return to the user.")
 
+# No model here: every run passes one (the /chat selection or get_model())
 aether_agent = Agent(
-    model=model,
     system_prompt=system_prompt,
     retries=3,
     deps_type=dict,
@@ -169,19 +177,25 @@ async def inject_dynamic_context(ctx: RunContext[dict]) -> str:
         return injected_text
     
     try:
-        # 1. Search semantic memories
-        memories = await memory_manager.search_relevant_memories(db_service, user_msg, limit=3, similarity_threshold=0.55)
-        
-        # 2. Search knowledge base documents
-        embedding = await memory_manager.get_embedding(user_msg)
-        docs = []
-        if embedding:
-            docs = await asyncio.to_thread(
-                db_service.search_documents,
-                query_embedding=embedding,
-                match_threshold=0.5,
-                match_count=3
-            )
+        # Embed the user message once per run; recall/search_knowledge_base reuse it via deps
+        embedding = await memory_manager.embed_query(user_msg, deps.setdefault("embeddings", {}))
+        if not embedding:
+            return injected_text
+
+        # 1. Semantic memories + 2. knowledge base documents in one multi-collection search
+        results = await db_service.search_multi(
+            query_embedding=embedding,
+            searches={
+                # Only what is injected below: memory text, document preview + source
+                "memories": {"match_threshold": 0.55, "match_count": 3, "fields": []},
+                # A larger pool with vectors, narrowed to 3 diverse chunks below (overlapping chunks repeat each other)
+                "documents": {"match_threshold": 0.5, "match_count": candidate_count(3), "fields": ["source"], "preview": True, "with_vectors": MMR_ENABLED},
+            },
+            # Lexical matching catches exact identifiers (function names, error codes) dense vectors miss
+            query_text=user_msg
+        )
+        memories = results.get("memories", [])
+        docs = diversify(embedding, results.get("documents", []), 3)
         
         if not memories and not docs:
             return injected_text
@@ -360,12 +374,13 @@ async def remember(ctx: RunContext[dict], content: str, category: str = "general
         return f"Error storing memory: {str(e)}"
 
 @aether_agent.tool
-async def recall(ctx: RunContext[dict], query: str) -> str:
+async def recall(ctx: RunContext[dict], query: str, category: Optional[str] = None) -> str:
     """
     Retrieves relevant information from your long-term memory.
     Use this when you need context to answer a question or when the user references past information.
     Args:
         query: A semantic search query to find relevant memories (e.g., 'project deadline', 'user preferences').
+        category: Optional category to search within (e.g., 'preference', 'project', 'task').
     """
     try:
         # Use MemoryManager to handle query embedding + search
@@ -374,7 +389,10 @@ async def recall(ctx: RunContext[dict], query: str) -> str:
             db_service=db_service,
             query=query,
             limit=3,
-            similarity_threshold=0.6
+            similarity_threshold=0.6,
+            memo=ctx.deps.setdefault("embeddings", {}) if ctx.deps is not None else None,
+            filters={"category": category} if category else None,
+            fields=[]
         )
         
         if not results:
@@ -446,12 +464,13 @@ async def connect_concepts(ctx: RunContext[dict], source: str, target: str, rela
         return f"Error connecting concepts: {str(e)}"
 
 @aether_agent.tool
-async def search_knowledge_base(ctx: RunContext[dict], query: str) -> str:
+async def search_knowledge_base(ctx: RunContext[dict], query: str, source: Optional[str] = None) -> str:
     """
     Searches the internal knowledge base (uploaded documents, specs, manuals) for relevant information.
     Use this when the user asks about the 'project', 'architecture', 'manifesto', or specific documented features.
     Args:
         query: The semantic search query.
+        source: Optional filename to search only within one document (e.g., 'manifesto.md').
     """
     try:
         print(f"[Agent] Searching knowledge base for: '{query}'")
@@ -467,17 +486,21 @@ async def search_knowledge_base(ctx: RunContext[dict], query: str) -> str:
         ctx.deps["search_count"] = search_count + 1
 
         await sqlite_service.add_log("info", "MEM", f"Knowledge base deep search: '{query}'")
-        query_embedding = await memory_manager.get_embedding(query)
+        query_embedding = await memory_manager.embed_query(query, ctx.deps.setdefault("embeddings", {}))
         if not query_embedding:
             return "Failed to generate query embedding."
             
-        # Run DB search in thread
-        docs = await asyncio.to_thread(
-            db_service.search_documents,
+        docs = await db_service.search_documents(
             query_embedding=query_embedding,
             match_threshold=0.5,
-            match_count=3
+            match_count=candidate_count(3),
+            filters={"source": source} if source else None,
+            fields=["source"],
+            preview=True,
+            query_text=query,
+            with_vectors=MMR_ENABLED
         )
+        docs = diversify(query_embedding, docs, 3)
         
         if not docs:
             return "No relevant documents found in knowledge base."
@@ -498,8 +521,9 @@ async def get_agent_response(prompt: str):
     # Initialize dependencies (deps) as a dictionary the Agent expects
     deps = {
         "user_message": prompt,
-        "search_count": 0
+        "search_count": 0,
+        "embeddings": {}  # Per-run embedding memo shared by context injection and tools
     }
     
-    result = await aether_agent.run(prompt, deps=deps)
+    result = await aether_agent.run(prompt, deps=deps, model=get_model())
     return result.data
@@ -0,0 +1,117 @@
+"""
+Benchmark: embedding dimensionality vs. search latency and recall.
+
+Builds one embedded-Qdrant collection per output dimensionality (Matryoshka truncation
++ re-normalization of the same corpus), then reports storage per vector, index build
+time, p50/p99 search latency and recall@10 against exact full-dimension search.
+
+By default the corpus is synthetic, with a decaying per-dimension variance that mimics
+Matryoshka-trained models (leading components carry most of the signal). For numbers
+that reflect your own knowledge base, dump real 3072-d Gemini vectors to a .npy file
+and pass it with --corpus.
+
+Usage:
+    python benchmarks/embedding_dimensions.py --docs 5000 --queries 200
+    python benchmarks/embedding_dimensions.py --corpus my_vectors.npy
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+# Ensure paths correctly resolve to Aether backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from embedding_providers import truncate_and_normalize
+
+
+def synthetic_corpus(n_docs: int, n_queries: int, dims: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(np.arange(1, dims + 1))
+    docs = rng.standard_normal((n_docs, dims)) * scale
+    # Queries are noisy paraphrases of random documents
+    picks = rng.integers(0, n_docs, n_queries)
+    queries = docs[picks] + rng.standard_normal((n_queries, dims)) * scale * 0.8
+    return docs, queries
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def run(docs: np.ndarray, queries: np.ndarray, dims_list, k: int = 10):
+    docs = normalize(docs)
+    queries = normalize(queries)
+    # Exact top-k at full dimensionality is the ground truth
+    truth = np.argsort(-(queries @ docs.T), axis=1)[:, :k]
+
+    rows = []
+    for dims in dims_list:
+        doc_vectors = np.asarray(truncate_and_normalize(docs.tolist(), dims))
+        query_vectors = truncate_and_normalize(queries.tolist(), dims)
+
+        with tempfile.TemporaryDirectory() as path:
+            client = QdrantClient(path=path)
+            client.create_collection("bench", vectors_config=VectorParams(size=dims, distance=Distance.COSINE))
+
+            started = time.perf_counter()
+            for start in range(0, len(doc_vectors), 512):
+                client.upsert("bench", points=[
+                    PointStruct(id=i, vector=doc_vectors[i].tolist())
+                    for i in range(start, min(start + 512, len(doc_vectors)))
+                ])
+            build_s = time.perf_counter() - started
+
+            latencies = []
+            hits = 0
+            for qi, query in enumerate(query_vectors):
+                t0 = time.perf_counter()
+                response = client.query_points("bench", query=query, limit=k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                hits += len({p.id for p in response.points} & set(truth[qi].tolist()))
+            client.close()
+
+        rows.append({
+            "dims": dims,
+            "bytes_per_vector": dims * 4,
+            "build_s": build_s,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "recall": hits / (len(query_vectors) * k),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--corpus", help="Optional .npy file of full-size document embeddings")
+    parser.add_argument("--dims", default="3072,1536,768,256")
+    args = parser.parse_args()
+
+    dims_list = [int(d) for d in args.dims.split(",")]
+    if args.corpus:
+        docs = np.load(args.corpus)
+        rng = np.random.default_rng(7)
+        picks = rng.integers(0, len(docs), args.queries)
+        queries = docs[picks] + rng.standard_normal((args.queries, docs.shape[1])) * docs.std() * 0.5
+    else:
+        docs, queries = synthetic_corpus(args.docs, args.queries, max(dims_list))
+
+    print(f"Corpus: {len(docs)} docs x {docs.shape[1]} dims, {len(queries)} queries\n")
+    print(f"{'dims':>6} {'KB/vec':>7} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'recall@10':>10}")
+    for row in run(docs, queries, dims_list):
+        print(
+            f"{row['dims']:>6} {row['bytes_per_vector'] / 1024:>7.1f} {row['build_s']:>8.2f} "
+            f"{row['p50_ms']:>7.2f} {row['p99_ms']:>7.2f} {row['recall']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: cost of MMR re-ranking the injected context.
+
+Times rerank.diversify on candidate pools shaped like the ones inject_dynamic_context
+fetches (hits with float32 vectors, several overlapping chunks per source) and reports
+p50/p99 latency per pool size. The re-rank budget is one millisecond.
+
+Usage:
+    python benchmarks/rerank_latency.py
+    python benchmarks/rerank_latency.py --dims 768 --pools 12,48 --k 5
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Ensure paths correctly resolve to Aether backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rerank import diversify
+from embedding_dimensions import normalize
+
+BUDGET_MS = 1.0
+
+
+def candidate_pool(rng: np.random.Generator, size: int, dims: int):
+    """A query plus `size` hits: groups of 3 near-identical chunks per source around the query."""
+    query = normalize(rng.standard_normal((1, dims)))[0]
+    hits = []
+    for i in range(size):
+        if i % 3 == 0:
+            base = query + rng.standard_normal(dims) * 0.05
+        vector = normalize((base + rng.standard_normal(dims) * 0.005)[None, :])[0].astype(np.float32)
+        hits.append({
+            "id": i,
+            "content": f"chunk {i}",
+            "similarity": float(vector @ query),
+            "fused_score": 1.0 / (61 + i),  # RRF score of rank i, as hybrid searches return
+            "metadata": {"source": f"file_{i // 3}.md"},
+            "vector": vector,
+        })
+    return query.tolist(), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--pools", default="6,12,24,48", help="Candidate pool sizes")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    print(f"{args.dims} dims, top {args.k}, {args.runs} runs per pool (budget {BUDGET_MS:.1f} ms)\n")
+    print(f"{'pool':>5} {'p50 ms':>8} {'p99 ms':>8} {'sources kept':>13}")
+    for size in (int(p) for p in args.pools.split(",")):
+        query, hits = candidate_pool(rng, size, args.dims)
+        latencies = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            picked = diversify(query, hits, args.k)
+            latencies.append((time.perf_counter() - started) * 1000)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        sources = len({h["metadata"]["source"] for h in picked})
+        verdict = "" if p99 < BUDGET_MS else "  over budget"
+        print(f"{size:>5} {p50:>8.3f} {p99:>8.3f} {sources:>10}/{len(picked)}{verdict}")
+
+
+if __name__ == "__main__":
+    main()
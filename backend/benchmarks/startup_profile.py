@@ -0,0 +1,85 @@
+"""
+Benchmark: kernel cold start (what the desktop app waits for before the UI is usable).
+
+Measures, each in a fresh interpreter against a throwaway embedded Qdrant store:
+- `import main` wall time, with the slowest modules from `python -X importtime`
+- the lifespan warm-up phases (Qdrant open + collection check, index probes, embedding provider)
+
+Usage:
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --runs 5 --top 20
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+WARM_UP_SNIPPET = """
+import asyncio, json, time
+t = time.perf_counter()
+from agent import db_service
+from memory import memory_manager
+imported = time.perf_counter() - t
+
+async def warm():
+    timings = {"import_ms": round(imported * 1000, 1)}
+    for phase in await asyncio.gather(db_service.warm_up(), memory_manager.warm_up()):
+        timings.update(phase)
+    await db_service.close()
+    return timings
+
+print(json.dumps(asyncio.run(warm())))
+"""
+
+
+def run_python(args, storage: str, env_overrides=None) -> subprocess.CompletedProcess:
+    env = {**os.environ, "QDRANT_LOCAL_PATH": storage, **(env_overrides or {})}
+    env.setdefault("GEMINI_API_KEY", "benchmark-placeholder")  # Profiles the Gemini embedding provider setup (no request is sent)
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def slowest_imports(stderr: str, top: int):
+    """Parses `-X importtime` output into (cumulative_ms, self_ms, module), slowest first."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage:
+        run_python(["-c", "import main"], storage)  # First run creates the store and compiles bytecode
+
+        imports = [float(run_python(["-c", IMPORT_SNIPPET], storage).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+        print(f"import main: median {statistics.median(imports) * 1000:.0f} ms over {args.runs} runs "
+              f"(min {min(imports) * 1000:.0f}, max {max(imports) * 1000:.0f})\n")
+
+        profile = run_python(["-X", "importtime", "-c", "import main"], storage)
+        print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for cumulative, own, module in slowest_imports(profile.stderr, args.top):
+            print(f"{cumulative:>14.1f} {own:>8.1f}  {module}")
+
+        phases = [json.loads(run_python(["-c", WARM_UP_SNIPPET], storage).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+        print("\nWarm-up phases (median ms):")
+        for name in phases[0]:
+            print(f"  {name:<20} {statistics.median(p[name] for p in phases):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark: Qdrant storage profiles (fast / balanced / compact) side by side.
+
+Builds one collection per profile from the same corpus, with the layout the app creates
+(dense vectors plus the sparse lexical vectors of hybrid search), then reports the measured
+RAM growth, index build time (upserts + background HNSW/quantization until the collection
+is green), p50/p99 search latency and recall@10 against exact search.
+
+RAM is the growth of the server's resident memory (Qdrant telemetry) across building and
+querying a collection; in embedded mode it is the growth of this process's RSS. Pages of
+on-disk vectors mapped in by searches count too, as they do in production.
+
+Quantization, on-disk vectors and HNSW settings are implemented by the Qdrant server;
+the embedded engine (QDRANT_LOCAL_PATH) is an exact in-memory scan that ignores them, so
+point the benchmark at a server for meaningful numbers:
+
+    docker run -p 6333:6333 qdrant/qdrant
+
+Usage:
+    python benchmarks/storage_profiles.py --url http://localhost:6333 --docs 20000
+    python benchmarks/storage_profiles.py --url http://localhost:6333 --corpus my_vectors.npy
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import gc
+import tempfile
+
+import numpy as np
+
+# Ensure paths correctly resolve to Aether backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from qdrant_client.http.models import PointStruct
+from database import STORAGE_PROFILES, _VectorStoreBase
+from embedding_dimensions import synthetic_corpus, normalize
+
+
+WORDS = [f"term{i}" for i in range(2000)]
+
+
+def synthetic_texts(n_docs: int, seed: int = 7):
+    """Chunk-sized texts over a Zipf-like vocabulary, so the sparse index is shaped like a real one."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    picks = rng.choice(len(WORDS), size=(n_docs, 120), p=weights / weights.sum())
+    return [" ".join(WORDS[i] for i in row) for row in picks]
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def memory_bytes(client: QdrantClient, embedded: bool) -> int:
+    """Resident memory of whatever holds the collections: the Qdrant server, or this process."""
+    gc.collect()
+    if embedded:
+        return rss_bytes()
+    telemetry = client.http.service_api.telemetry(details_level=1).result
+    return telemetry.memory.resident_bytes if telemetry.memory else 0
+
+
+def wait_until_indexed(client: QdrantClient, name: str, timeout: float = 600.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if client.get_collection(name).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.2)
+    print(f"Warning: '{name}' still optimizing after {timeout:.0f}s; numbers include a partial index.")
+
+
+def run(client: QdrantClient, docs: np.ndarray, queries: np.ndarray, profiles, k: int = 10, embedded: bool = False):
+    docs = normalize(docs)
+    queries = normalize(queries)
+    texts = synthetic_texts(len(docs))
+    truth = np.argsort(-(queries @ docs.T), axis=1)[:, :k]
+
+    # Collections are laid out exactly as the app creates them, sparse vectors included
+    store = _VectorStoreBase()
+    store.embedding_model = "benchmark"
+    rows = []
+    for name in profiles:
+        profile = STORAGE_PROFILES[name]
+        collection = f"bench_{name}_{uuid.uuid4().hex[:8]}"
+        store.profiles = {collection: name}
+        baseline = memory_bytes(client, embedded)
+        client.create_collection(collection, **store._collection_layout(collection, docs.shape[1]))
+        try:
+            started = time.perf_counter()
+            for start in range(0, len(docs), 512):
+                client.upsert(collection, points=[
+                    PointStruct(id=i, vector=store._point_vectors(docs[i].tolist(), texts[i]))
+                    for i in range(start, min(start + 512, len(docs)))
+                ])
+            wait_until_indexed(client, collection)
+            build_s = time.perf_counter() - started
+
+            latencies = []
+            hits = 0
+            for qi, query in enumerate(queries):
+                t0 = time.perf_counter()
+                response = client.query_points(collection, query=query.tolist(), limit=k, search_params=profile["search"])
+                latencies.append((time.perf_counter() - t0) * 1000)
+                hits += len({p.id for p in response.points} & set(truth[qi].tolist()))
+            ram_bytes = memory_bytes(client, embedded) - baseline
+        finally:
+            client.delete_collection(collection)
+
+        rows.append({
+            "profile": name,
+            "ram_mb": max(ram_bytes, 0) / 1024 ** 2,
+            "build_s": build_s,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "recall": hits / (len(queries) * k),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL"), help="Qdrant server (default: QDRANT_URL)")
+    parser.add_argument("--api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--corpus", help="Optional .npy file of document embeddings")
+    parser.add_argument("--profiles", default=",".join(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    if args.corpus:
+        docs = np.load(args.corpus)
+        rng = np.random.default_rng(7)
+        picks = rng.integers(0, len(docs), args.queries)
+        queries = docs[picks] + rng.standard_normal((args.queries, docs.shape[1])) * docs.std() * 0.5
+    else:
+        docs, queries = synthetic_corpus(args.docs, args.queries, args.dims)
+
+    with tempfile.TemporaryDirectory() as path:
+        if args.url:
+            client = QdrantClient(url=args.url, api_key=args.api_key)
+        else:
+            print("No --url given: using embedded Qdrant, which ignores storage profiles (all rows measure the same exact scan).\n")
+            client = QdrantClient(path=path)
+
+        print(f"Corpus: {len(docs)} docs x {docs.shape[1]} dims, {len(queries)} queries\n")
+        print(f"{'profile':>9} {'RAM MB':>12} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'recall@10':>10}")
+        for row in run(client, docs, queries, args.profiles.split(","), embedded=not args.url):
+            print(
+                f"{row['profile']:>9} {row['ram_mb']:>12.1f} {row['build_s']:>8.2f} "
+                f"{row['p50_ms']:>7.2f} {row['p99_ms']:>7.2f} {row['recall']:>10.3f}"
+            )
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,146 +1,912 @@
 """
 Database Service using Qdrant Cloud for vector storage.
 This replaces the ChromaDB implementation for better scalability and cloud persistence.
+
+AsyncDatabaseService (AsyncQdrantClient) is what the kernel uses, so vector store calls
+never block the event loop and concurrent requests don't serialize on a worker thread.
+DatabaseService is a thin blocking facade over it for scripts and tests: there is only
+one implementation of every operation.
 """
 import os
+import time
 import uuid
-from typing import List, Dict, Any
+import asyncio
+import inspect
+import functools
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Callable
 from datetime import datetime
+import numpy as np
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from embedding_providers import GeminiEmbeddingProvider, embedding_dimensions, is_auto_fallback, truncate_and_normalize
+from embedding_providers import embedding_model as configured_embedding_model
+import sparse
+from search_cache import search_cache_from_env
 
 load_dotenv()
 
-class DatabaseService:
-    def __init__(self):
-        # Initialize Qdrant client (Hybrid Mode: Cloud or Local Storage)
-        url = os.getenv("QDRANT_URL")
-        api_key = os.getenv("QDRANT_API_KEY")
-        local_path = os.getenv("QDRANT_LOCAL_PATH", "./qdrant_storage")
-        
-        if url and api_key:
-            print(f"[Database] Qdrant Cloud detected. Connecting to: {url}")
-            self.client = QdrantClient(url=url, api_key=api_key)
-        else:
-            print(f"[Database] Using Local Qdrant (No-Docker) at: {local_path}")
-            # This uses the embedded Qdrant engine (Rust) directly in the process
-            self.client = QdrantClient(path=local_path)
-        
-        # Dimensions for Gemini Embedding 001 are 3072
-        self.vector_size = 3072
-        
-        # Ensure collections exist
-        self._ensure_collection("memories")
-        self._ensure_collection("documents")
-        
-        print(f"[Database] Qdrant Cloud initialized. Base URL: {url}")
-
-    def _ensure_collection(self, collection_name: str):
-        """Creates the collection if it doesn't already exist."""
+UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))  # Points per upsert request
+COLLECTIONS = ("memories", "documents")
+PREVIEW_CHARS = int(os.getenv("QDRANT_PREVIEW_CHARS", "500"))  # Length of the "preview" payload field
+LIST_PAGE_SIZE = int(os.getenv("QDRANT_LIST_PAGE_SIZE", "256"))  # Points per scroll request in listings
+MEMORY_LIST_FIELDS = ["content", "category", "timestamp"]
+# Hybrid retrieval: every point also carries a BM25-style sparse vector of its text (see sparse.py)
+SPARSE_VECTOR = "text"
+HYBRID_SEARCH = os.getenv("QDRANT_HYBRID_SEARCH", "1") == "1"
+HYBRID_PREFETCH = int(os.getenv("QDRANT_HYBRID_PREFETCH", "4"))  # Candidates per retriever, x match_count
+# Lexical candidates must reach this BM25 score, as dense ones must reach match_threshold
+HYBRID_MIN_LEXICAL_SCORE = float(os.getenv("QDRANT_HYBRID_MIN_LEXICAL_SCORE", "1.0"))
+
+# Collection metadata key naming the embedding model that produced the stored vectors
+EMBEDDING_MODEL_KEY = "embedding_model"
+
+# Payload fields used in filters (deletes by source, category/source-scoped searches, listings),
+# indexed so Qdrant pre-filters inside the HNSW search instead of scanning the collection
+PAYLOAD_INDEXES = {
+    "memories": {
+        "category": models.PayloadSchemaType.KEYWORD,
+        "type": models.PayloadSchemaType.KEYWORD,
+        "timestamp": models.PayloadSchemaType.DATETIME,
+    },
+    "documents": {
+        "source": models.PayloadSchemaType.KEYWORD,
+        "type": models.PayloadSchemaType.KEYWORD,
+        "timestamp": models.PayloadSchemaType.DATETIME,
+        "chunk_index": models.PayloadSchemaType.INTEGER,
+    },
+}
+
+# Named storage profiles: trade RAM for latency/recall per collection. Quantized vectors stay in RAM
+# while the float32 originals are mmap'd from disk and only read to rescore the oversampled candidates.
+# Qdrant's embedded (QDRANT_LOCAL_PATH) mode is an exact in-memory scan that ignores these settings;
+# they take effect against a Qdrant server or Cloud. See benchmarks/storage_profiles.py for the tradeoffs.
+STORAGE_PROFILES = {
+    # float32 vectors and graph in RAM (~4 bytes x dims per point): lowest latency, exact scores
+    "fast": {
+        "on_disk": False,
+        "hnsw": models.HnswConfigDiff(m=16, ef_construct=100, on_disk=False),
+        "quantization": None,
+        "search": models.SearchParams(hnsw_ef=128),
+    },
+    # int8 scalar quantization in RAM (4x smaller), originals on disk for rescoring
+    "balanced": {
+        "on_disk": True,
+        "hnsw": models.HnswConfigDiff(m=16, ef_construct=128, on_disk=False),
+        "quantization": models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        ),
+        "search": models.SearchParams(hnsw_ef=96, quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)),
+    },
+    # 1-bit binary quantization in RAM (32x smaller; suits 1024+ dims), originals and graph on disk
+    "compact": {
+        "on_disk": True,
+        "hnsw": models.HnswConfigDiff(m=12, ef_construct=100, on_disk=True),
+        "quantization": models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True)),
+        "search": models.SearchParams(hnsw_ef=64, quantization=models.QuantizationSearchParams(rescore=True, oversampling=3.0)),
+    },
+}
+
+def storage_profile(collection_name: str) -> str:
+    """Profile name for a collection: QDRANT_STORAGE_PROFILE_<COLLECTION>, else QDRANT_STORAGE_PROFILE."""
+    name = os.getenv(f"QDRANT_STORAGE_PROFILE_{collection_name.upper()}") or os.getenv("QDRANT_STORAGE_PROFILE", "fast")
+    if name not in STORAGE_PROFILES:
+        print(f"[Database] Unknown storage profile '{name}' for '{collection_name}', using 'fast'.")
+        return "fast"
+    return name
+
+def _client_options() -> Dict[str, Any]:
+    """Qdrant connection settings (Hybrid Mode: Cloud or Local Storage)."""
+    url = os.getenv("QDRANT_URL")
+    api_key = os.getenv("QDRANT_API_KEY")
+    local_path = os.getenv("QDRANT_LOCAL_PATH", "./qdrant_storage")
+
+    if url and api_key:
+        print(f"[Database] Qdrant Cloud detected. Connecting to: {url}")
+        return {"url": url, "api_key": api_key}
+    print(f"[Database] Using Local Qdrant (No-Docker) at: {local_path}")
+    # This uses the embedded Qdrant engine (Rust) directly in the process
+    return {"path": local_path}
+
+
+class EmbeddingMismatchError(RuntimeError):
+    """A collection holds vectors that the configured embedding model can't be searched against."""
+
+
+class _VectorStoreBase:
+    """Client-independent parts of the database service: request building and result formatting."""
+    vector_size: int
+    embedding_model: str
+    local: bool  # Embedded mode: payload indexes have no effect there, filters always scan
+    dense_only: set  # Collections without sparse vectors, kept as they are while hybrid search is off
+    profiles: Dict[str, str]  # Storage profile name per collection
+
+    @staticmethod
+    def _missing_payload_indexes(collection_name: str, payload_schema: Dict[str, Any]) -> Dict[str, models.PayloadSchemaType]:
+        return {
+            field: schema for field, schema in PAYLOAD_INDEXES.get(collection_name, {}).items()
+            if field not in (payload_schema or {})
+        }
+
+    def _profile(self, collection_name: str) -> Dict[str, Any]:
+        # Staging copies made during migrations share their collection's profile
+        return STORAGE_PROFILES[self.profiles.get(collection_name.split("__")[0], "fast")]
+
+    def _collection_layout(self, collection_name: str, vector_size: int) -> Dict[str, Any]:
+        """create_collection arguments for the collection's storage profile."""
+        profile = self._profile(collection_name)
+        return {
+            "vectors_config": VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=profile["on_disk"]),
+            "sparse_vectors_config": {
+                SPARSE_VECTOR: models.SparseVectorParams(
+                    index=models.SparseIndexParams(on_disk=profile["on_disk"]),
+                    modifier=models.Modifier.IDF
+                )
+            },
+            "hnsw_config": profile["hnsw"],
+            "quantization_config": profile["quantization"],
+            "metadata": {EMBEDDING_MODEL_KEY: self.embedding_model},
+        }
+
+    @staticmethod
+    def _recorded_model(config) -> Optional[str]:
+        return (getattr(config, "metadata", None) or {}).get(EMBEDDING_MODEL_KEY)
+
+    @staticmethod
+    def _legacy_model(vector_size: int) -> Optional[str]:
+        # Collections created before the model was recorded were filled by Gemini Embedding 001 at full size
+        if vector_size == GeminiEmbeddingProvider.default_dimensions:
+            return GeminiEmbeddingProvider.default_model
+        return None
+
+    def _check_embedding_change(self, collection_name: str, stored_model: Optional[str], current_size: int, points: int):
+        """
+        Raises EmbeddingMismatchError unless a collection's `points` can follow the configured model:
+        empty collections always can, filled ones only when the model is the same and the vectors
+        only need truncating (Matryoshka) to the new size.
+        """
+        if not points:
+            return
+        if stored_model != self.embedding_model:
+            hint = (
+                " EMBEDDING_PROVIDER=auto fell back to the local provider because GEMINI_API_KEY is not set;"
+                " set the key (or EMBEDDING_PROVIDER) to match the stored vectors."
+                if is_auto_fallback() else
+                " Switch the embedding provider back, or delete the collection and re-index."
+            )
+            raise EmbeddingMismatchError(
+                f"Collection '{collection_name}' holds {points} vectors from "
+                f"{repr(stored_model) if stored_model else 'an unrecorded model'} ({current_size}-d), but the "
+                f"configured embedding model is '{self.embedding_model}' ({self.vector_size}-d). Searching one "
+                f"model's vectors with another's queries returns meaningless results.{hint}"
+            )
+        if current_size < self.vector_size:
+            raise EmbeddingMismatchError(
+                f"Collection '{collection_name}' stores {current_size}-d vectors but '{self.embedding_model}' is "
+                f"configured for {self.vector_size}-d vectors. Vectors can't be up-sized; delete the collection "
+                f"and re-index."
+            )
+
+    @staticmethod
+    def _point_vectors(dense: List[float], content: str, stored_sparse=None) -> Dict[str, Any]:
+        return {"": dense, SPARSE_VECTOR: stored_sparse or sparse.document_vector(content or "")}
+
+    @staticmethod
+    def _has_sparse_vectors(config) -> bool:
+        return SPARSE_VECTOR in (config.params.sparse_vectors or {})
+
+    def _query_args(
+        self, collection_name: str, query_embedding: List[float], match_threshold: float, match_count: int,
+        filters: Dict[str, Any] = None, query_text: str = None
+    ) -> Dict[str, Any]:
+        """
+        query_points arguments: a dense search, or with `query_text` (and QDRANT_HYBRID_SEARCH on)
+        a dense and a sparse lexical retriever fused with Reciprocal Rank Fusion in one request.
+        Every fused hit passed a floor in its retriever: match_threshold on the dense cosine, or
+        HYBRID_MIN_LEXICAL_SCORE on the BM25 score.
+        """
+        query_filter = self._build_filter(filters)
+        search_params = self._profile(collection_name)["search"]
+        lexical = sparse.query_vector(query_text) if HYBRID_SEARCH and query_text else None
+        if not lexical or not lexical.indices:
+            return {
+                "query": query_embedding,
+                "query_filter": query_filter,
+                "search_params": search_params,
+                "score_threshold": match_threshold,
+                "limit": match_count,
+            }
+        candidates = match_count * HYBRID_PREFETCH
+        return {
+            "prefetch": [
+                models.Prefetch(query=query_embedding, filter=query_filter, params=search_params, score_threshold=match_threshold, limit=candidates),
+                models.Prefetch(query=lexical, using=SPARSE_VECTOR, filter=query_filter, score_threshold=HYBRID_MIN_LEXICAL_SCORE, limit=candidates),
+            ],
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+            "limit": match_count,
+        }
+
+    @staticmethod
+    def _quantization_kind(config) -> Optional[str]:
+        if config is None:
+            return None
+        return type(config).__name__
+
+    def _profile_changes(self, collection_name: str, config) -> Dict[str, Any]:
+        """update_collection arguments that bring an existing collection to its profile ({} = up to date)."""
+        profile = self._profile(collection_name)
+        changes: Dict[str, Any] = {}
+        if bool(config.params.vectors.on_disk) != profile["on_disk"]:
+            changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=profile["on_disk"])}
+        hnsw = profile["hnsw"]
+        current = config.hnsw_config
+        if (current.m, current.ef_construct, bool(current.on_disk)) != (hnsw.m, hnsw.ef_construct, hnsw.on_disk):
+            changes["hnsw_config"] = hnsw
+        if self._quantization_kind(config.quantization_config) != self._quantization_kind(profile["quantization"]):
+            changes["quantization_config"] = profile["quantization"] or models.Disabled.DISABLED
+        return changes
+
+    def _invalidate(self, collection_name: str):
+        """Called after every write: cached searches of the collection are no longer served."""
+        if self.search_cache is not None:
+            self.search_cache.invalidate(collection_name)
+
+    def _hold_cache(self, collection_name: str) -> bool:
+        """
+        Holds the search cache for writes Qdrant acknowledges before applying them (wait=False),
+        so searches in between can't cache pre-write results. Not needed in embedded mode, where
+        every write is applied before it returns.
+        """
+        if self.search_cache is None or self.local:
+            return False
+        self.search_cache.hold(collection_name)
+        return True
+
+    async def _release_cache_when_applied(self, collection_name: str):
+        # A collection applies its updates in order, so once an empty delete sent with wait=True
+        # has completed, the acknowledged writes before it have been applied too
         try:
-            collections = self.client.get_collections().collections
-            exists = any(c.name == collection_name for c in collections)
-            
-            if not exists:
+            await self.client.delete(collection_name, points_selector=models.PointIdsList(points=[]), wait=True)
+        except Exception as e:
+            print(f"[Database] Couldn't confirm writes to '{collection_name}' were applied: {e}")
+        finally:
+            self.search_cache.release(collection_name)
+
+    def _cache_lookup(self, collection_name: str, query_embedding: List[float], match_threshold: float, match_count: int,
+                      filters, fields, preview: bool, query_text: Optional[str], with_vectors: bool = False):
+        """(key, generation, cached hits or None); key is None when the search cache is disabled."""
+        if self.search_cache is None:
+            return None, None, None
+        key = self.search_cache.make_key(
+            collection_name, query_embedding, threshold=match_threshold, limit=match_count,
+            filters=filters, fields=fields, preview=preview, query_text=query_text if HYBRID_SEARCH else None,
+            with_vectors=with_vectors
+        )
+        # Read the generation before searching: results that race a write are not stored
+        generation = self.search_cache.generation(collection_name)
+        return key, generation, self.search_cache.get(key)
+
+    @staticmethod
+    def _build_filter(filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        """
+        Payload filter from a simple mapping, e.g. {"category": "project"}:
+        a scalar matches exactly, a list matches any of its values, and a dict with
+        gt/gte/lt/lte is a range (datetime range for ISO timestamp strings).
+        """
+        if not filters:
+            return None
+        conditions = []
+        for field, value in filters.items():
+            if isinstance(value, dict):
+                bounds = {k: v for k, v in value.items() if k in ("gt", "gte", "lt", "lte") and v is not None}
+                is_datetime = any(isinstance(v, (str, datetime)) for v in bounds.values())
+                match = {"range": models.DatetimeRange(**bounds) if is_datetime else models.Range(**bounds)}
+            elif isinstance(value, (list, tuple, set)):
+                match = {"match": models.MatchAny(any=list(value))}
+            else:
+                match = {"match": models.MatchValue(value=value)}
+            conditions.append(models.FieldCondition(key=field, **match))
+        return models.Filter(must=conditions)
+
+    @staticmethod
+    def _build_payload(content: str, metadata: Dict[str, Any], item_type: str) -> Dict[str, Any]:
+        payload = dict(metadata or {})
+        payload["content"] = content # Qdrant stores text in payload
+        # Qdrant can't truncate payloads server-side: a stored preview lets searches that only
+        # display a snippet skip transferring the full content
+        payload["preview"] = content[:PREVIEW_CHARS]
+        payload["timestamp"] = datetime.now().isoformat()
+        payload["type"] = item_type
+        return payload
+
+    def _prepare_points(self, collection_name: str, items: List[Dict[str, Any]], item_type: str) -> Tuple[List[Dict[str, Any]], List[PointStruct], List[int]]:
+        """
+        Builds the points of a bulk write plus one status entry per item (input order).
+        Points with a missing or wrongly sized vector are rejected up front so they can't fail
+        the whole request. Returns (results, points, result position of each point).
+        """
+        results: List[Dict[str, Any]] = []
+        points: List[PointStruct] = []
+        positions: List[int] = []
+        for item in items:
+            point_id = item.get("id") or str(uuid.uuid4())
+            embedding = item.get("embedding")
+            if not embedding or len(embedding) != self.vector_size:
+                results.append({"id": point_id, "status": "error", "message": f"Missing or wrongly sized vector (expected {self.vector_size}-d)."})
+                continue
+            positions.append(len(results))
+            results.append({"id": point_id, "status": "success"})
+            points.append(PointStruct(
+                id=point_id,
+                vector=embedding if collection_name in self.dense_only else self._point_vectors(embedding, item["content"]),
+                payload=self._build_payload(item["content"], item.get("metadata"), item_type)
+            ))
+        return results, points, positions
+
+    @staticmethod
+    def _record_batch(results: List[Dict[str, Any]], positions: List[int], update: Any = None, error: Exception = None):
+        if error is not None:
+            for position in positions:
+                results[position].update(status="error", message=str(error))
+            return
+        status = "acknowledged" if update.status == models.UpdateStatus.ACKNOWLEDGED else "success"
+        for position in positions:
+            results[position]["status"] = status
+
+    @staticmethod
+    def _summarize_write(collection_name: str, results: List[Dict[str, Any]], attempted: bool) -> Dict[str, Any]:
+        count = sum(r["status"] != "error" for r in results)
+        if attempted:
+            print(f"[Database] {count}/{len(results)} points added to '{collection_name}'.")
+        status = "success" if count == len(results) else ("partial" if count else "error")
+        return {"status": status, "count": count, "failed": len(results) - count, "results": results}
+
+    @staticmethod
+    def _single_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        result = result["results"][0]
+        if result["status"] == "error":
+            return {"status": "error", "message": result["message"]}
+        return {"id": result["id"], "status": "success"}
+
+    @staticmethod
+    def _source_filter(filename: str) -> models.Filter:
+        return models.Filter(
+            must=[models.FieldCondition(key="source", match=models.MatchValue(value=filename))]
+        )
+
+    @staticmethod
+    def _payload_operations(payloads: Dict[str, Dict[str, Any]]) -> List[models.SetPayloadOperation]:
+        return [
+            models.SetPayloadOperation(set_payload=models.SetPayload(payload=fields, points=[point_id]))
+            for point_id, fields in payloads.items()
+        ]
+
+    @staticmethod
+    def _payload_selector(fields: Optional[List[str]], preview: bool):
+        """
+        Payload to fetch with each hit: the content (or its preview) plus `fields`
+        (None = every metadata field).
+        """
+        if fields is not None:
+            return models.PayloadSelectorInclude(include=["preview" if preview else "content", *fields])
+        return models.PayloadSelectorExclude(exclude=["content"]) if preview else True
+
+    @staticmethod
+    def _format_hits(points, preview: bool = False, with_vectors: bool = False, fused_query: List[float] = None) -> List[Dict[str, Any]]:
+        """
+        Search hits as dicts. "similarity" is always the dense cosine: for fused (hybrid) results,
+        given the query vector as `fused_query`, it is recomputed from the returned dense vectors
+        and the RRF score is kept as "fused_score".
+        """
+        query = np.asarray(fused_query, dtype=np.float32) if fused_query is not None else None
+        formatted_results = []
+        for hit in points:
+            payload = hit.payload or {}
+            content = payload.pop("content", "")
+            snippet = payload.pop("preview", None)
+
+            formatted = {
+                "id": hit.id,
+                "content": (snippet if snippet is not None else content[:PREVIEW_CHARS]) if preview else content,
+                "similarity": hit.score,
+                "metadata": payload
+            }
+            dense = None
+            if with_vectors or query is not None:
+                # Collections with sparse vectors store the dense one under the default name ""
+                dense = np.asarray(hit.vector.get("") if isinstance(hit.vector, dict) else hit.vector, dtype=np.float32)
+            if query is not None:
+                norms = float(np.linalg.norm(dense) * np.linalg.norm(query)) or 1.0
+                formatted["similarity"] = float(dense @ query) / norms
+                formatted["fused_score"] = hit.score
+            if with_vectors:
+                formatted["vector"] = dense
+            formatted_results.append(formatted)
+        return formatted_results
+
+    @staticmethod
+    def _legacy_preview_ids(points, preview: bool) -> List[Any]:
+        # Points written before previews were stored need their content fetched once
+        return [hit.id for hit in points if preview and "preview" not in (hit.payload or {})]
+
+    @staticmethod
+    def _format_memories(points) -> List[Dict[str, Any]]:
+        return [{
+            "id": point.id,
+            "content": point.payload.get("content", ""),
+            "category": point.payload.get("category", "general"),
+            "timestamp": point.payload.get("timestamp", "")
+        } for point in points]
+
+    @staticmethod
+    def _format_documents(points) -> List[Dict[str, Any]]:
+        sources = {}
+        for point in points:
+            _VectorStoreBase._collect_source(sources, point)
+        return [{"filename": src, "metadata": meta} for src, meta in sources.items()]
+
+    @staticmethod
+    def _collect_source(sources: Dict[str, Dict], point):
+        src = point.payload.get("source")
+        if src:
+            # Store latest metadata for each source
+            sources[src] = {k: v for k, v in point.payload.items() if k != "preview"}
+
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str]):
+        """Page cursors are point IDs: UUID strings, or integers for numeric IDs."""
+        if cursor is None or cursor == "":
+            return None
+        return int(cursor) if str(cursor).isdigit() else cursor
+
+    @staticmethod
+    def _encode_cursor(offset) -> Optional[str]:
+        return None if offset is None else str(offset)
+
+    @staticmethod
+    def _document_list_selector():
+        # Listings only need the metadata, never the chunk text
+        return models.PayloadSelectorExclude(exclude=["content", "preview"])
+
+
+class AsyncDatabaseService(_VectorStoreBase):
+    """
+    Vector store service on AsyncQdrantClient.
+    Collections are checked (and migrated) on first use, or up front via initialize().
+    """
+
+    def __init__(self, vector_size: int = None, embedding_model: str = None):
+        self._options = _client_options()
+        self._client: Optional[AsyncQdrantClient] = None
+        self.local = "path" in self._options
+        self.profiles = {name: storage_profile(name) for name in COLLECTIONS}
+        self.search_cache = search_cache_from_env()
+        self.dense_only = set()
+        # Vector size and model follow the configured embedding provider (3072 for Gemini Embedding 001)
+        self.vector_size = vector_size or embedding_dimensions()
+        self.embedding_model = embedding_model or configured_embedding_model()
+        self._initialized = False
+        self._init_lock: Optional[asyncio.Lock] = None
+        self._settling = set()  # Tasks releasing the search cache once wait=False writes are applied
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        # Opening embedded storage loads every point into memory: deferred to first use (or warm_up)
+        if self._client is None:
+            self._client = AsyncQdrantClient(**self._options)
+        return self._client
+
+    @client.setter
+    def client(self, client: AsyncQdrantClient):
+        self._client = client
+
+    async def initialize(self):
+        """Ensures the collections exist with the current vector size. Safe to call repeatedly."""
+        if self._initialized:
+            return
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self._initialized:
+                return
+            names = {c.name for c in (await self.client.get_collections()).collections}
+            for collection_name in COLLECTIONS:
+                await self._ensure_collection(collection_name, names)
+            self._initialized = True
+            print("[Database] Qdrant initialized (async client).")
+
+    async def warm_up(self) -> Dict[str, float]:
+        """
+        Opens the client, checks the collections and runs one tiny query per collection, so storage
+        is loaded and the HNSW graph / mmap'd vectors are paged in before the first real request.
+        Returns the duration of each completed phase in milliseconds. Failures are logged and left
+        to the first real call, except EmbeddingMismatchError: serving mixed models must not start.
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        try:
+            await self.initialize()
+            initialized = time.perf_counter()
+            timings["qdrant_init_ms"] = round((initialized - started) * 1000, 1)
+            probe = [1.0] + [0.0] * (self.vector_size - 1)
+            await asyncio.gather(*(
+                self.client.query_points(name, query=probe, limit=1, with_payload=False, search_params=self._profile(name)["search"])
+                for name in COLLECTIONS
+            ))
+            timings["qdrant_probe_ms"] = round((time.perf_counter() - initialized) * 1000, 1)
+        except EmbeddingMismatchError:
+            raise
+        except Exception as e:
+            # Best-effort: an unreachable Qdrant must not keep the kernel from starting
+            print(f"[Database] Warm-up skipped: {e}")
+        return timings
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+    async def _ensure_collection(self, collection_name: str, names: Optional[set] = None):
+        """
+        Creates the collection if it doesn't already exist, migrating its layout if it changed.
+        `names` is the set of existing collections (fetched once by the caller for all collections).
+        """
+        try:
+            if names is None:
+                names = {c.name for c in (await self.client.get_collections()).collections}
+            staging_name = f"{collection_name}__resize"
+
+            if collection_name not in names and staging_name in names:
+                # A previous resize was interrupted after dropping the original collection
+                print(f"[Database] Restoring '{collection_name}' from interrupted migration.")
+                await self._create_collection(collection_name, await self._collection_vector_size(staging_name))
+                await self._copy_points(staging_name, collection_name)
+                await self.client.delete_collection(staging_name)
+                names.add(collection_name)
+
+            info = None
+            if collection_name not in names:
                 print(f"[Database] Creating collection: '{collection_name}'")
-                self.client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE),
-                )
+                await self._create_collection(collection_name, self.vector_size)
             else:
-                print(f"[Database] Collection '{collection_name}' already exists.")
+                # One get_collection per collection on the common (already up to date) path
+                info = (await self.client.get_collection(collection_name))
+                current_size = info.config.params.vectors.size
+                recorded_model = self._recorded_model(info.config)
+                if (recorded_model, current_size) == (self.embedding_model, self.vector_size):
+                    print(f"[Database] Collection '{collection_name}' already exists.")
+                else:
+                    stored_model = recorded_model or self._legacy_model(current_size)
+                    points = (await self.client.count(collection_name)).count
+                    self._check_embedding_change(collection_name, stored_model, current_size, points)
+                    if current_size != self.vector_size:
+                        await self._migrate_vector_size(collection_name, current_size)
+                    else:
+                        await self.client.update_collection(collection_name, metadata={EMBEDDING_MODEL_KEY: self.embedding_model})
+                        print(f"[Database] Recorded embedding model '{self.embedding_model}' on '{collection_name}'.")
+                    info = (await self.client.get_collection(collection_name))
+                if not self._has_sparse_vectors(info.config) and not HYBRID_SEARCH:
+                    # Created before hybrid search, which is off: no relayout, writes stay dense-only
+                    self.dense_only.add(collection_name)
+                elif not self._has_sparse_vectors(info.config):
+                    # Created before hybrid search: sparse vectors can't be added in place
+                    print(f"[Database] Adding sparse vectors to '{collection_name}' for hybrid search...")
+                    copied = await self._relayout(collection_name, info.config.params.vectors.size)
+                    print(f"[Database] Re-indexed {copied} points of '{collection_name}' with sparse vectors.")
+                    info = (await self.client.get_collection(collection_name))
+                await self._ensure_storage_profile(collection_name, info)
+            await self._ensure_payload_indexes(collection_name, info)
+        except EmbeddingMismatchError:
+            raise
         except Exception as e:
             print(f"[Database] Error checking/creating collection '{collection_name}': {e}")
 
-    def add_memory(self, content: str, embedding: List[float], metadata: Dict[str, Any] = None):
+    async def _create_collection(self, collection_name: str, vector_size: int):
+        await self.client.create_collection(collection_name=collection_name, **self._collection_layout(collection_name, vector_size))
+        self.dense_only.discard(collection_name)
+        self._invalidate(collection_name)
+
+    async def _ensure_storage_profile(self, collection_name: str, info=None):
+        """
+        Migrates an existing collection to its storage profile in place: Qdrant re-lays out vectors,
+        quantizes and rebuilds the HNSW graph in the background while searches keep working.
+        """
+        if self.local:
+            return
+        changes = self._profile_changes(collection_name, (info or (await self.client.get_collection(collection_name))).config)
+        if changes:
+            await self.client.update_collection(collection_name, **changes)
+            print(f"[Database] Migrating '{collection_name}' to the '{self.profiles[collection_name]}' storage profile ({', '.join(changes)}).")
+
+    async def _collection_vector_size(self, collection_name: str) -> int:
+        return (await self.client.get_collection(collection_name)).config.params.vectors.size
+
+    async def _ensure_payload_indexes(self, collection_name: str, info=None):
+        """Creates the payload indexes declared in PAYLOAD_INDEXES that the collection lacks."""
+        if self.local:
+            return
+        payload_schema = (info or (await self.client.get_collection(collection_name))).payload_schema
+        for field, schema in self._missing_payload_indexes(collection_name, payload_schema).items():
+            await self.client.create_payload_index(collection_name, field_name=field, field_schema=schema, wait=True)
+            print(f"[Database] Created {schema.value} payload index on '{collection_name}.{field}'.")
+
+    async def _copy_points(self, source: str, target: str, vector_transform=None, batch_size: int = 256):
+        """Copies every point from `source` to `target`, optionally transforming vectors per batch."""
+        offset = None
+        copied = 0
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=source,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if points:
+                # Points written before hybrid search have an unnamed dense vector only
+                vectors = [p.vector.get("") if isinstance(p.vector, dict) else p.vector for p in points]
+                if vector_transform:
+                    vectors = vector_transform(vectors)
+                await self.client.upsert(
+                    collection_name=target,
+                    points=[
+                        PointStruct(
+                            id=p.id,
+                            vector=self._point_vectors(v, p.payload.get("content"), p.vector.get(SPARSE_VECTOR) if isinstance(p.vector, dict) else None),
+                            payload=p.payload
+                        )
+                        for p, v in zip(points, vectors)
+                    ]
+                )
+                copied += len(points)
+            if offset is None:
+                return copied
+
+    async def _migrate_vector_size(self, collection_name: str, current_size: int):
+        """
+        Re-lays out a collection for a new dimensionality of the same embedding model (see
+        _check_embedding_change): Matryoshka truncation + re-normalization of the stored vectors,
+        no re-embedding.
+        """
+        print(f"[Database] Migrating '{collection_name}' from {current_size}-d to {self.vector_size}-d vectors...")
+        copied = await self._relayout(
+            collection_name,
+            self.vector_size,
+            vector_transform=lambda vectors: truncate_and_normalize(vectors, self.vector_size)
+        )
+        print(f"[Database] Migrated {copied} points in '{collection_name}' to {self.vector_size}-d vectors.")
+
+    async def _relayout(self, collection_name: str, vector_size: int, vector_transform=None) -> int:
+        """
+        Rebuilds a collection with the current layout (vector size, sparse vectors, storage profile)
+        through a staging copy. Returns the number of points copied.
+        """
+        staging_name = f"{collection_name}__resize"
+        if await self.client.collection_exists(staging_name):
+            await self.client.delete_collection(staging_name)
+        await self._create_collection(staging_name, vector_size)
+        copied = await self._copy_points(collection_name, staging_name, vector_transform=vector_transform)
+
+        # Swap: recreate the original name with the new layout, then drop the staging copy
+        await self.client.delete_collection(collection_name)
+        await self._create_collection(collection_name, vector_size)
+        await self._copy_points(staging_name, collection_name)
+        await self.client.delete_collection(staging_name)
+        return copied
+
+    async def add_memory(self, content: str, embedding: List[float], metadata: Dict[str, Any] = None):
         """Adds a memory to the memories collection."""
-        return self._add_to_collection("memories", content, embedding, metadata, "memory")
+        return await self._add_to_collection("memories", content, embedding, metadata, "memory")
+
+    async def add_memories(self, memories: List[Dict[str, Any]], batch_size: int = None, wait: bool = True):
+        """Adds many memories with batched upserts. Items and result as in add_document_chunks."""
+        return await self._add_points("memories", memories, "memory", batch_size, wait)
 
-    def add_document_chunk(self, content: str, embedding: List[float], metadata: Dict[str, Any] = None):
+    async def add_document_chunk(self, content: str, embedding: List[float], metadata: Dict[str, Any] = None):
         """Adds a document chunk to the documents collection."""
-        return self._add_to_collection("documents", content, embedding, metadata, "document_chunk")
+        return await self._add_to_collection("documents", content, embedding, metadata, "document_chunk")
 
-    def _add_to_collection(self, collection_name: str, content: str, embedding: List[float], metadata: Dict[str, Any], item_type: str):
-        point_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
-        
-        payload = metadata or {}
-        payload["content"] = content # Qdrant stores text in payload
-        payload["timestamp"] = timestamp
-        payload["type"] = item_type
+    async def add_document_chunks(self, chunks: List[Dict[str, Any]], batch_size: int = None, wait: bool = True):
+        """
+        Adds many document chunks, `batch_size` points per upsert request.
+        Each item is a dict with "content", "embedding", optional "metadata" and optional
+        "id" (deterministic IDs make re-indexing idempotent).
+        With `wait=False` Qdrant acknowledges each request before the points are indexed.
+        """
+        return await self._add_points("documents", chunks, "document_chunk", batch_size, wait)
 
+    async def _add_points(self, collection_name: str, items: List[Dict[str, Any]], item_type: str, batch_size: int = None, wait: bool = True):
+        """
+        Batched upsert with a status per point, in input order:
+        {"id", "status": "success" | "acknowledged" | "error", "message" (errors only)}.
+        A failed request marks only its own batch as errored.
+        The overall status is "success", "partial" or "error"; "count" is the points written.
+        """
         try:
-            self.client.upsert(
-                collection_name=collection_name,
-                points=[
-                    PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload=payload
-                    )
-                ]
+            await self.initialize()
+            error = None
+        except Exception as e:
+            error = e
+        # After initialize(): the collection's layout decides whether points carry sparse vectors
+        results, points, positions = self._prepare_points(collection_name, items, item_type)
+        if error is not None:
+            print(f"[Database] Error adding {len(points)} points to '{collection_name}': {error}")
+            self._record_batch(results, positions, error=error)
+            return self._summarize_write(collection_name, results, bool(points))
+        batch_size = batch_size or UPSERT_BATCH_SIZE
+        held = not wait and bool(points) and self._hold_cache(collection_name)
+        for start in range(0, len(points), batch_size):
+            batch = points[start:start + batch_size]
+            try:
+                update = await self.client.upsert(collection_name=collection_name, points=batch, wait=wait)
+                self._record_batch(results, positions[start:start + batch_size], update)
+            except Exception as e:
+                print(f"[Database] Error adding {len(batch)} points to '{collection_name}': {e}")
+                self._record_batch(results, positions[start:start + batch_size], error=e)
+        self._invalidate(collection_name)
+        if held:
+            task = asyncio.get_running_loop().create_task(self._release_cache_when_applied(collection_name))
+            # Keep a reference so the task isn't garbage collected mid-flight
+            self._settling.add(task)
+            task.add_done_callback(self._settling.discard)
+        return self._summarize_write(collection_name, results, bool(points))
+
+    async def _add_to_collection(self, collection_name: str, content: str, embedding: List[float], metadata: Dict[str, Any], item_type: str):
+        return self._single_result(
+            await self._add_points(collection_name, [{"content": content, "embedding": embedding, "metadata": metadata}], item_type)
+        )
+
+    async def delete_document_chunks(self, point_ids: List[str]):
+        """Deletes specific document chunks by point ID."""
+        if not point_ids:
+            return True
+        try:
+            await self.initialize()
+            await self.client.delete(
+                collection_name="documents",
+                points_selector=models.PointIdsList(points=point_ids)
             )
-            print(f"[Database] {item_type.replace('_', ' ').capitalize()} added: {point_id}")
-            return {"id": point_id, "status": "success"}
+            print(f"[Database] Deleted {len(point_ids)} document chunks from Qdrant.")
+            return True
         except Exception as e:
-            print(f"[Database] Error adding {item_type} to Qdrant: {e}")
-            return {"status": "error", "message": str(e)}
+            print(f"[Database] Error deleting document chunks from Qdrant: {e}")
+            return False
+        finally:
+            self._invalidate("documents")
 
-    def search_memories(self, query_embedding: List[float], match_threshold: float = 0.5, match_count: int = 5):
-        """Searches the memories collection."""
-        return self._search_collection("memories", query_embedding, match_threshold, match_count)
+    async def update_document_chunks(self, payloads: Dict[str, Dict[str, Any]]):
+        """Merges payload fields into existing chunks (point ID -> fields) in one batch request."""
+        if not payloads:
+            return True
+        try:
+            await self.initialize()
+            await self.client.batch_update_points(
+                collection_name="documents",
+                update_operations=self._payload_operations(payloads)
+            )
+            return True
+        except Exception as e:
+            print(f"[Database] Error updating document chunks in Qdrant: {e}")
+            return False
+        finally:
+            self._invalidate("documents")
 
-    def search_documents(self, query_embedding: List[float], match_threshold: float = 0.5, match_count: int = 5):
-        """Searches the documents collection."""
-        return self._search_collection("documents", query_embedding, match_threshold, match_count)
+    async def update_document_fields(self, filename: str, fields: Dict[str, Any]):
+        """Merges payload fields into every chunk of a source with one filtered request."""
+        try:
+            await self.initialize()
+            await self.client.set_payload(
+                collection_name="documents",
+                payload=fields,
+                points=self._source_filter(filename)
+            )
+            return True
+        except Exception as e:
+            print(f"[Database] Error updating document {filename} in Qdrant: {e}")
+            return False
+        finally:
+            self._invalidate("documents")
+
+    async def search_memories(self, query_embedding: List[float], match_threshold: float = 0.5, match_count: int = 5, filters: Dict[str, Any] = None, fields: List[str] = None, preview: bool = False, query_text: str = None, with_vectors: bool = False):
+        """
+        Searches the memories collection, optionally pre-filtered by payload (e.g. {"category": "project"}).
+        Passing the query's `query_text` enables hybrid (dense + lexical) retrieval; `with_vectors`
+        adds each hit's dense "vector" (float32 array) for client-side re-ranking.
+        """
+        return await self._search_collection("memories", query_embedding, match_threshold, match_count, filters, fields, preview, query_text, with_vectors)
+
+    async def search_documents(self, query_embedding: List[float], match_threshold: float = 0.5, match_count: int = 5, filters: Dict[str, Any] = None, fields: List[str] = None, preview: bool = False, query_text: str = None, with_vectors: bool = False):
+        """
+        Searches the documents collection, optionally pre-filtered by payload (e.g. {"source": "spec.md"}).
+        Passing the query's `query_text` enables hybrid (dense + lexical) retrieval; `with_vectors`
+        adds each hit's dense "vector" (float32 array) for client-side re-ranking.
+        """
+        return await self._search_collection("documents", query_embedding, match_threshold, match_count, filters, fields, preview, query_text, with_vectors)
 
-    def _search_collection(self, collection_name: str, query_embedding: List[float], match_threshold: float, match_count: int):
+    async def search_multi(self, query_embedding: List[float], searches: Dict[str, Dict[str, Any]], query_text: str = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Runs one query vector against several collections concurrently.
+        `searches` maps a collection name to keyword arguments of search_memories/search_documents
+        ({"match_threshold", "match_count", "filters", "fields", "preview", "with_vectors"}); `query_text` makes
+        every search hybrid.
+        """
+        results = await asyncio.gather(*(
+            self._search_collection(
+                collection_name,
+                query_embedding,
+                params.get("match_threshold", 0.5),
+                params.get("match_count", 5),
+                params.get("filters"),
+                params.get("fields"),
+                params.get("preview", False),
+                query_text,
+                params.get("with_vectors", False)
+            )
+            for collection_name, params in searches.items()
+        ))
+        return dict(zip(searches, results))
+
+    async def _search_collection(
+        self, collection_name: str, query_embedding: List[float], match_threshold: float, match_count: int,
+        filters: Dict[str, Any] = None, fields: List[str] = None, preview: bool = False, query_text: str = None,
+        with_vectors: bool = False
+    ):
+        """
+        Top `match_count` hits scoring at least `match_threshold` (applied by Qdrant, so weaker
+        hits are never transferred); hybrid when `query_text` is given (see _query_args). `fields` limits the returned metadata keys (None = all);
+        with `preview`, "content" is the stored PREVIEW_CHARS snippet instead of the full text.
+        """
+        key, generation, cached = self._cache_lookup(collection_name, query_embedding, match_threshold, match_count, filters, fields, preview, query_text, with_vectors)
+        if cached is not None:
+            return cached
         try:
-            response = self.client.query_points(
+            await self.initialize()
+            query_args = self._query_args(collection_name, query_embedding, match_threshold, match_count, filters, query_text)
+            fused = "prefetch" in query_args
+            response = await self.client.query_points(
                 collection_name=collection_name,
-                query=query_embedding,
-                limit=match_count,
-                with_payload=True
+                with_payload=self._payload_selector(fields, preview),
+                # Fused scores are ranks, so the dense vectors come back to report each hit's cosine
+                with_vectors=[""] if fused and not with_vectors else with_vectors,
+                **query_args
             )
-            
-            formatted_results = []
-            for hit in response.points:
-                if hit.score >= match_threshold:
-                    payload = hit.payload or {}
-                    content = payload.pop("content", "")
-                    
-                    formatted_results.append({
-                        "id": hit.id,
-                        "content": content,
-                        "similarity": hit.score,
-                        "metadata": payload
-                    })
-            
-            return formatted_results
+            legacy = self._legacy_preview_ids(response.points, preview)
+            if legacy:
+                points = await self.client.retrieve(collection_name, legacy, with_payload=["content"])
+                contents = {p.id: p.payload.get("content", "") for p in points}
+                for hit in response.points:
+                    if hit.id in contents:
+                        hit.payload["content"] = contents[hit.id]
+            hits = self._format_hits(response.points, preview, with_vectors, query_embedding if fused else None)
+            if key is not None:
+                self.search_cache.put(key, hits, generation)
+            return hits
 
         except Exception as e:
             print(f"[Database] Error searching Qdrant collection '{collection_name}': {e}")
             return []
 
-    def get_stats(self):
+    async def get_stats(self):
         """Returns statistics about the database."""
         try:
-            memories_count = self.client.count(collection_name="memories").count
-            documents_count = self.client.count(collection_name="documents").count
+            await self.initialize()
+            memories, documents = await asyncio.gather(
+                self.client.count(collection_name="memories"),
+                self.client.count(collection_name="documents")
+            )
             return {
-                "memories_count": memories_count,
-                "documents_count": documents_count
+                "memories_count": memories.count,
+                "documents_count": documents.count
             }
         except Exception as e:
             print(f"[Database] Error getting Qdrant stats: {e}")
             return {"memories_count": 0, "documents_count": 0}
 
-    def delete_memory(self, memory_id: str):
+    async def delete_memory(self, memory_id: str):
         """Deletes a memory by its point ID."""
         try:
-            self.client.delete(
+            await self.initialize()
+            await self.client.delete(
                 collection_name="memories",
                 points_selector=models.PointIdsList(points=[memory_id])
             )
@@ -149,74 +915,139 @@ class DatabaseService:
         except Exception as e:
             print(f"[Database] Error deleting memory {memory_id} from Qdrant: {e}")
             return False
+        finally:
+            self._invalidate("memories")
+
+    async def list_memories_page(self, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of memories plus the cursor of the next page (None on the last page)."""
+        await self.initialize()
+        points, next_offset = await self.client.scroll(
+            collection_name="memories",
+            limit=limit,
+            offset=self._decode_cursor(cursor),
+            with_payload=MEMORY_LIST_FIELDS,
+            with_vectors=False
+        )
+        return {"memories": self._format_memories(points), "next_cursor": self._encode_cursor(next_offset)}
 
-    def list_memories(self):
-        """Returns a list of all memories."""
+    async def iter_memories(self, page_size: int = LIST_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """Yields every memory, fetching one page at a time."""
+        cursor = None
+        while True:
+            page = await self.list_memories_page(page_size, cursor)
+            for memory in page["memories"]:
+                yield memory
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    async def list_memories(self):
+        """Returns a list of all memories (use iter_memories on large collections)."""
+        try:
+            return [memory async for memory in self.iter_memories()]
+        except Exception as e:
+            print(f"[Database] Error listing memories from Qdrant: {e}")
+            return []
+
+    async def recent_memories(self, limit: int = 10):
+        """Returns the most recent memories, newest first."""
         try:
-            scroll_result = self.client.scroll(
+            await self.initialize()
+            points, _ = await self.client.scroll(
                 collection_name="memories",
-                limit=1000,
-                with_payload=True,
+                limit=limit,
+                order_by=models.OrderBy(key="timestamp", direction=models.Direction.DESC),
+                with_payload=MEMORY_LIST_FIELDS,
                 with_vectors=False
             )
-            points = scroll_result[0]
-            if not points:
-                return []
-            
-            return [{
-                "id": point.id,
-                "content": point.payload.get("content", ""),
-                "category": point.payload.get("category", "general"),
-                "timestamp": point.payload.get("timestamp", "")
-            } for point in points]
+            return self._format_memories(points)
         except Exception as e:
-            print(f"[Database] Error listing memories from Qdrant: {e}")
+            print(f"[Database] Error listing recent memories from Qdrant: {e}")
             return []
 
-    def delete_document(self, filename: str):
+    async def delete_document(self, filename: str):
         """Deletes all chunks associated with a specific file source."""
         try:
-            self.client.delete(
+            await self.initialize()
+            await self.client.delete(
                 collection_name="documents",
-                points_selector=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="source",
-                            match=models.MatchValue(value=filename),
-                        ),
-                    ],
-                ),
+                points_selector=self._source_filter(filename),
             )
             print(f"[Database] Deleted document from Qdrant: {filename}")
             return True
         except Exception as e:
             print(f"[Database] Error deleting document {filename} from Qdrant: {e}")
             return False
+        finally:
+            self._invalidate("documents")
 
-    def list_documents(self):
-        """Returns a list of unique document sources (filenames) in the collection."""
-        try:
-            # Scroll through all points but only request 'source' metadata
-            # For simplicity, we limit to 1000 items as we don't expect millions yet
-            scroll_result = self.client.scroll(
+    async def iter_document_chunks(self, page_size: int = LIST_PAGE_SIZE) -> AsyncIterator[Any]:
+        """Yields every document chunk (metadata only, no text), one page at a time."""
+        await self.initialize()
+        cursor = None
+        while True:
+            points, cursor = await self.client.scroll(
                 collection_name="documents",
-                limit=1000,
-                with_payload=True,
+                limit=page_size,
+                offset=cursor,
+                with_payload=self._document_list_selector(),
                 with_vectors=False
             )
-            
-            points = scroll_result[0]
-            if not points:
-                return []
-            
-            sources = {}
             for point in points:
-                src = point.payload.get("source")
-                if src:
-                    # Store latest metadata for each source
-                    sources[src] = point.payload
-            
+                yield point
+            if cursor is None:
+                return
+
+    async def list_documents(self):
+        """Returns a list of unique document sources (filenames) in the collection."""
+        try:
+            sources = {}
+            async for point in self.iter_document_chunks():
+                self._collect_source(sources, point)
             return [{"filename": src, "metadata": meta} for src, meta in sources.items()]
         except Exception as e:
             print(f"[Database] Error listing documents from Qdrant: {e}")
             return []
+
+
+class _Blocking:
+    """Wraps an async object: coroutine methods run to completion, async generators become iterators."""
+
+    def __init__(self, target: Any, run: Callable):
+        self._target = target
+        self._run = run
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if inspect.iscoroutinefunction(attr):
+            return functools.wraps(attr)(lambda *args, **kwargs: self._run(attr(*args, **kwargs)))
+        if inspect.isasyncgenfunction(attr):
+            def iterate(*args, **kwargs):
+                iterator = attr(*args, **kwargs)
+                while True:
+                    try:
+                        yield self._run(iterator.__anext__())
+                    except StopAsyncIteration:
+                        return
+            return functools.wraps(attr)(iterate)
+        return attr
+
+
+class DatabaseService(_Blocking):
+    """
+    Blocking facade over AsyncDatabaseService for scripts and tests: the same methods, run on a
+    private event loop (so it must not be used from inside a running loop). `client` is wrapped too.
+    """
+
+    def __init__(self, vector_size: int = None, embedding_model: str = None):
+        self._loop = asyncio.new_event_loop()
+        super().__init__(AsyncDatabaseService(vector_size, embedding_model), self._loop.run_until_complete)
+        self._run(self._target.initialize())
+
+    @property
+    def client(self) -> _Blocking:
+        return _Blocking(self._target.client, self._run)
+
+    def close(self):
+        self._run(self._target.close())
+        self._loop.close()
@@ -0,0 +1,228 @@
+"""
+Content-addressed cache for embedding vectors.
+Vectors are keyed by (model, output dimensionality, normalized text hash) and kept in:
+1. A small in-process LRU for hot queries.
+2. A SQLite file next to aether.db, so re-indexing a file or repeating a query
+   survives restarts without hitting the embedding API again.
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text so trivially different inputs (whitespace, unicode forms) share a cache entry."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    def __init__(self, db_path: str = None, lru_size: int = None, max_bytes: int = None):
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.db_path = db_path or os.getenv("EMBEDDING_CACHE_PATH") or os.path.join(base_dir, "embedding_cache.db")
+        self.lru_size = lru_size if lru_size is not None else int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "2048"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+
+        # Counters exposed through /stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, dimensions: Optional[int], text: str) -> str:
+        """Builds the content address for a (model, dimensionality, text) triple."""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model}|{dimensions or 'default'}|{digest}"
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                       key TEXT PRIMARY KEY,
+                       model TEXT NOT NULL,
+                       vector BLOB NOT NULL,
+                       size INTEGER NOT NULL,
+                       last_used REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self._conn.commit()
+            row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+            self._disk_bytes = row[0]
+        return self._conn
+
+    def _remember(self, key: str, vector: List[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_from_memory(self, model: str, dimensions: Optional[int], text: str) -> Optional[List[float]]:
+        """The vector if it is in the in-memory LRU (never touches the disk; a miss isn't counted)."""
+        key = self.make_key(model, dimensions, text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+        return vector
+
+    def get(self, model: str, dimensions: Optional[int], text: str) -> Optional[List[float]]:
+        """Returns the cached vector, or None on a miss."""
+        return self.get_many(model, dimensions, [text])[0]
+
+    def get_many(self, model: str, dimensions: Optional[int], texts: List[str]) -> List[Optional[List[float]]]:
+        """Looks up several texts at once; misses are returned as None in the same position."""
+        keys = [self.make_key(model, dimensions, t) for t in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+
+        with self._lock:
+            pending = {}
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector
+                else:
+                    pending.setdefault(key, []).append(i)
+
+            if not pending:
+                return results
+
+            try:
+                conn = self._connect()
+                found = {}
+                pending_keys = list(pending)
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(pending_keys), 500):
+                    batch = pending_keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = array("f", blob).tolist()
+
+                if found:
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] Disk lookup failed: {e}")
+                found = {}
+
+            for key, positions in pending.items():
+                vector = found.get(key)
+                if vector is None:
+                    self.misses += len(positions)
+                    continue
+                self.disk_hits += len(positions)
+                self._remember(key, vector)
+                for i in positions:
+                    results[i] = vector
+
+        return results
+
+    def put(self, model: str, dimensions: Optional[int], text: str, vector: List[float]):
+        """Stores a single vector."""
+        self.put_many(model, dimensions, [text], [vector])
+
+    def put_many(self, model: str, dimensions: Optional[int], texts: List[str], vectors: List[List[float]]):
+        """Stores several vectors in one transaction, evicting the least recently used rows if over budget."""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if not vector:
+                    continue
+                key = self.make_key(model, dimensions, text)
+                self._remember(key, list(vector))
+                blob = array("f", vector).tobytes()
+                rows.append((key, model, blob, len(blob), now))
+
+            if not rows:
+                return
+
+            try:
+                conn = self._connect()
+                for key, _, blob, size, _ in rows:
+                    existing = conn.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    self._disk_bytes += size - (existing[0] if existing else 0)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+                self._evict(conn)
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] Disk write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drops the least recently used rows until the file is back under 90% of its budget."""
+        if self._disk_bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self._disk_bytes > target:
+            rows = conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            victims = []
+            for key, size in rows:
+                if self._disk_bytes <= target:
+                    break
+                victims.append((key,))
+                self._lru.pop(key, None)
+                self._disk_bytes -= size
+                self.evictions += 1
+            conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        conn.commit()
+
+    def clear(self):
+        """Removes every cached vector (memory and disk)."""
+        with self._lock:
+            self._lru.clear()
+            conn = self._connect()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current cache size."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "lru_entries": len(self._lru),
+            "disk_bytes": self._disk_bytes,
+        }
@@ -0,0 +1,202 @@
+"""
+Embedding providers used by MemoryManager.
+Each provider declares its model name and output dimensionality, so the embedding
+cache and the Qdrant collections follow whichever provider is configured:
+- "gemini": Google Gemini embedding API (network, API key required).
+- "local":  Hashed word/character n-gram vectors computed on the CPU (offline, deterministic).
+EMBEDDING_PROVIDER=auto (default) picks Gemini when GEMINI_API_KEY is set, local otherwise.
+EMBEDDING_DIMENSIONS shrinks Gemini vectors (e.g. 768 or 1536) using Matryoshka truncation.
+"""
+import os
+import re
+import zlib
+import asyncio
+from typing import List
+
+import numpy as np
+
+from embedding_cache import normalize_text
+
+
+def truncate_and_normalize(vectors: List[List[float]], dimensions: int) -> List[List[float]]:
+    """
+    Matryoshka-style reduction: keep the leading `dimensions` components and
+    re-normalize to unit length so cosine/dot scores stay comparable.
+    """
+    if not vectors:
+        return []
+    matrix = np.asarray(vectors, dtype=np.float64)[:, :dimensions]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).tolist()
+
+
+class EmbeddingProvider:
+    """Interface for embedding backends."""
+    name = "base"
+
+    def __init__(self, model: str, dimensions: int):
+        self.model = model
+        self.dimensions = dimensions
+
+    @classmethod
+    def configured_dimensions(cls) -> int:
+        """Output dimensionality this provider will use, without constructing a client."""
+        raise NotImplementedError
+
+    @classmethod
+    def configured_model(cls) -> str:
+        """Model name this provider will report, without constructing a client."""
+        raise NotImplementedError
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Returns one vector per input text. May raise on transport errors."""
+        raise NotImplementedError
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini"
+    # Dimensions for Gemini Embedding 001 are 3072
+    default_dimensions = 3072
+    default_model = "models/gemini-embedding-001"
+
+    def __init__(self, api_key: str = None, model: str = default_model, dimensions: int = None):
+        from google import genai
+
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        super().__init__(model, dimensions or self.configured_dimensions())
+        self.client = genai.Client(api_key=api_key)
+
+    @classmethod
+    def configured_dimensions(cls) -> int:
+        dimensions = int(os.getenv("EMBEDDING_DIMENSIONS", str(cls.default_dimensions)))
+        if not 1 <= dimensions <= cls.default_dimensions:
+            raise ValueError(f"EMBEDDING_DIMENSIONS must be between 1 and {cls.default_dimensions}, got {dimensions}")
+        return dimensions
+
+    @classmethod
+    def configured_model(cls) -> str:
+        # Truncated outputs are prefixes of the same vectors, so the model name doesn't change
+        return cls.default_model
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        from google.genai import types
+
+        config = None
+        if self.dimensions < self.default_dimensions:
+            config = types.EmbedContentConfig(output_dimensionality=self.dimensions)
+
+        # Native async client so the event loop keeps serving other requests
+        result = await self.client.aio.models.embed_content(
+            model=self.model,
+            contents=texts,
+            config=config
+        )
+        # The structure is EmbedContentResponse(embeddings=[ContentEmbedding(values=[...]), ...])
+        embeddings = result.embeddings or []
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        vectors = [e.values or [] for e in embeddings]
+
+        # Only the full 3072-d output comes back normalized; truncated outputs must be re-normalized
+        if self.dimensions < self.default_dimensions and all(vectors):
+            vectors = truncate_and_normalize(vectors, self.dimensions)
+        return vectors
+
+
+class LocalHashEmbeddingProvider(EmbeddingProvider):
+    """
+    Offline CPU embeddings using signed feature hashing over words and character trigrams.
+    Captures lexical rather than deep semantic similarity, but needs no network or model
+    download, so it suits offline use, cheap bulk re-indexing and deterministic tests.
+    """
+    name = "local"
+    default_dimensions = 768
+    _TOKEN = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, dimensions: int = None):
+        dimensions = dimensions or self.configured_dimensions()
+        super().__init__(self.model_name(dimensions), dimensions)
+
+    @staticmethod
+    def model_name(dimensions: int) -> str:
+        # Hash buckets depend on the size: vectors of different sizes are different models
+        return f"local-hash-ngram-v1-{dimensions}"
+
+    @classmethod
+    def configured_dimensions(cls) -> int:
+        return int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", str(cls.default_dimensions)))
+
+    @classmethod
+    def configured_model(cls) -> str:
+        return cls.model_name(cls.configured_dimensions())
+
+    def _features(self, text: str):
+        words = self._TOKEN.findall(normalize_text(text).casefold())
+        features = [(w, 1.0) for w in words]
+        for w in words:
+            padded = f" {w} "
+            features.extend((padded[i:i + 3], 0.5) for i in range(len(padded) - 2))
+        return features
+
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            features = self._features(text)
+            if not features:
+                vectors.append([0.0] * self.dimensions)
+                continue
+            # crc32 is stable across processes (unlike hash()), so vectors are reproducible
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f, _ in features), dtype=np.uint64, count=len(features))
+            weights = np.fromiter((w for _, w in features), dtype=np.float64, count=len(features))
+            signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+            vec = np.bincount((hashes % self.dimensions).astype(np.int64), weights=signs * weights, minlength=self.dimensions)
+            norm = np.linalg.norm(vec)
+            vectors.append((vec / norm if norm else vec).tolist())
+        return vectors
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        # CPU-bound work goes to a worker thread to keep the loop responsive
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+
+PROVIDERS = {
+    GeminiEmbeddingProvider.name: GeminiEmbeddingProvider,
+    LocalHashEmbeddingProvider.name: LocalHashEmbeddingProvider,
+}
+
+
+def resolve_provider_name(name: str = None) -> str:
+    """Resolves EMBEDDING_PROVIDER (auto/gemini/local) to a concrete provider name."""
+    name = (name or os.getenv("EMBEDDING_PROVIDER", "auto")).strip().lower()
+    if name == "auto":
+        return "gemini" if os.getenv("GEMINI_API_KEY") else "local"
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{name}'. Choose from: auto, {', '.join(PROVIDERS)}")
+    return name
+
+
+def get_embedding_provider(name: str = None) -> EmbeddingProvider:
+    """Builds the configured embedding provider."""
+    resolved = resolve_provider_name(name)
+    if is_auto_fallback(name):
+        print("[Embeddings] GEMINI_API_KEY not set. Falling back to the local CPU embedding provider.")
+    return PROVIDERS[resolved]()
+
+
+def is_auto_fallback(name: str = None) -> bool:
+    """True when EMBEDDING_PROVIDER=auto resolved to the local provider for lack of an API key."""
+    requested = (name or os.getenv("EMBEDDING_PROVIDER", "auto")).strip().lower()
+    return requested == "auto" and resolve_provider_name(name) == "local"
+
+
+def embedding_dimensions(name: str = None) -> int:
+    """Vector size of the configured provider (used to size Qdrant collections)."""
+    return PROVIDERS[resolve_provider_name(name)].configured_dimensions()
+
+
+def embedding_model(name: str = None) -> str:
+    """Model name of the configured provider (recorded on the Qdrant collections it fills)."""
+    return PROVIDERS[resolve_provider_name(name)].configured_model()
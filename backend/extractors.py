@@ -0,0 +1,293 @@
+"""
+Text extraction for knowledge sources.
+Plain-text formats (Markdown, text, logs, source code) are streamed straight from disk.
+Other formats go through a registered extractor that runs in a ProcessPoolExecutor, so
+CPU-heavy parsing (PDF, DOCX, large JSON) uses every core without stalling the API's event
+loop. Extractors write plain text to a temporary file which the chunker then streams, so
+neither process ever holds a whole document's text in memory just to hand it over.
+
+Register a new format with:
+
+    @register(".ext")
+    def extract_ext(path: str, out: TextIO): ...
+
+PDF extraction uses `pypdf` (a project dependency).
+"""
+import os
+import csv
+import json
+import asyncio
+import zipfile
+import tempfile
+import multiprocessing
+from html.parser import HTMLParser
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, TextIO
+from xml.etree import ElementTree
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "0")) or os.cpu_count() or 2
+TEXT_SNIFF_BYTES = 8192
+
+# Streamed as-is (UTF-8, invalid bytes replaced)
+TEXT_EXTENSIONS = (
+    ".md", ".markdown", ".txt", ".rst", ".log",
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".java", ".go", ".rs", ".c", ".h", ".cpp", ".hpp",
+    ".cs", ".rb", ".php", ".sh", ".sql", ".yaml", ".yml", ".toml", ".ini", ".css", ".xml",
+)
+
+EXTRACTORS: Dict[str, Callable[[str, TextIO], None]] = {}
+
+
+class ExtractionError(Exception):
+    """The file could not be converted to text."""
+
+
+def register(*extensions: str):
+    """Registers an extractor function for one or more file extensions."""
+    def decorator(func: Callable[[str, TextIO], None]):
+        for ext in extensions:
+            EXTRACTORS[ext.lower()] = func
+        return func
+    return decorator
+
+
+def supported_extensions() -> tuple:
+    return TEXT_EXTENSIONS + tuple(EXTRACTORS)
+
+
+def _extension(path: str) -> str:
+    return os.path.splitext(path)[1].lower()
+
+
+def looks_like_text(path: str) -> bool:
+    """Heuristic for unknown extensions: no NUL bytes in the first few KB."""
+    with open(path, "rb") as f:
+        return b"\x00" not in f.read(TEXT_SNIFF_BYTES)
+
+
+# --- Extractors (run inside pool worker processes) ---
+
+class _HTMLText(HTMLParser):
+    SKIP = {"script", "style", "noscript", "template", "svg"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "section", "article", "header", "footer", "pre", "blockquote",
+              "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol"}
+
+    def __init__(self, out: TextIO):
+        super().__init__(convert_charrefs=True)
+        self.out = out
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skip_depth += 1
+        elif tag in self.BLOCKS:
+            self.out.write("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag in self.BLOCKS:
+            self.out.write("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth and data.strip():
+            self.out.write(" ".join(data.split()) + " ")
+
+
+@register(".html", ".htm", ".xhtml")
+def extract_html(path: str, out: TextIO):
+    parser = _HTMLText(out)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while block := f.read(64 * 1024):
+            parser.feed(block)
+    parser.close()
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@register(".docx")
+def extract_docx(path: str, out: TextIO):
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+            # iterparse keeps memory flat on very long documents
+            for _, element in ElementTree.iterparse(document, events=("end",)):
+                if element.tag == f"{_W}p":
+                    text = "".join(
+                        node.text or ("\t" if node.tag == f"{_W}tab" else "")
+                        for node in element.iter()
+                        if node.tag in (f"{_W}t", f"{_W}tab")
+                    )
+                    out.write(text + "\n\n" if text.strip() else "\n")
+                    element.clear()
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ExtractionError(f"Not a valid DOCX file: {e}")
+
+
+@register(".pdf")
+def extract_pdf(path: str, out: TextIO):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtractionError("PDF support requires the 'pypdf' package (pip install pypdf).")
+    from pypdf.errors import PdfReadError
+    try:
+        reader = PdfReader(path)
+    except PdfReadError as e:
+        raise ExtractionError(f"Not a valid PDF file: {e}")
+    for number, page in enumerate(reader.pages, start=1):
+        text = page.extract_text() or ""
+        if text.strip():
+            out.write(f"[Page {number}]\n{text.strip()}\n\n")
+
+
+def _flatten_json(value, prefix: str, out: TextIO):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten_json(item, f"{prefix}.{key}" if prefix else str(key), out)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            _flatten_json(item, f"{prefix}[{index}]", out)
+    else:
+        out.write(f"{prefix or 'value'}: {value}\n")
+
+
+def _iter_json_records(f: TextIO, block_size: int = 64 * 1024):
+    """
+    Yields (index, element) for each element of a top-level JSON array, holding only the
+    current element (plus one read block) in memory. Any other top-level value is parsed
+    whole and yielded once as (None, value): memory is then bounded by the file size.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(block_size).lstrip()
+    if not buffer.startswith("["):
+        yield None, json.loads(buffer + f.read())
+        return
+
+    position, eof, index, after_element = 1, False, 0, False
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Unterminated array", buffer, position)
+            block = f.read(block_size)
+            eof = not block
+            buffer, position = block, 0
+            continue
+
+        char = buffer[position]
+        if after_element or (char == "]" and index == 0):
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            position += 1
+            after_element = False
+            continue
+
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+            # A number cut off by the block boundary ("-1." of "-1.5") parses too: only trust a value
+            # followed by a delimiter
+            complete = eof or (end < len(buffer) and buffer[end] in " \t\r\n,]")
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # Read at least as much again as is buffered, so large elements parse in linear time
+            block = f.read(max(block_size, len(buffer) - position))
+            eof = not block
+            buffer, position = buffer[position:] + block, 0
+            continue
+        yield index, element
+        buffer, position, index, after_element = buffer[end:], 0, index + 1, True
+
+
+@register(".json")
+def extract_json(path: str, out: TextIO):
+    # Top-level array elements are streamed one at a time (see _iter_json_records) and become
+    # paragraphs, so each lands in its own chunk where possible
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        try:
+            for index, record in _iter_json_records(f):
+                _flatten_json(record, f"[{index}]" if index is not None else "", out)
+                out.write("\n")
+        except json.JSONDecodeError as e:
+            raise ExtractionError(f"Invalid JSON: {e}")
+
+
+@register(".jsonl", ".ndjson")
+def extract_jsonl(path: str, out: TextIO):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                _flatten_json(json.loads(line), "", out)
+            except json.JSONDecodeError:
+                out.write(line.strip() + "\n")
+            out.write("\n")
+
+
+@register(".csv", ".tsv")
+def extract_csv(path: str, out: TextIO):
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f, delimiter="\t" if path.lower().endswith(".tsv") else ",")
+        header = next(reader, None)
+        if header is None:
+            return
+        for row in reader:
+            # "column: value" pairs keep each row meaningful once it is split into chunks
+            out.write(" | ".join(f"{h}: {v}" for h, v in zip(header, row) if v) + "\n")
+
+
+def _run_extractor(path: str, destination: str):
+    """Pool entry point: converts `path` to UTF-8 text in `destination`."""
+    extractor = EXTRACTORS[_extension(path)]
+    with open(destination, "w", encoding="utf-8") as out:
+        extractor(path, out)
+
+
+# --- Process pool ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # "spawn" keeps workers clean: forking a process that runs threads (asyncio, Qdrant) can deadlock
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+@asynccontextmanager
+async def extracted_text_path(path: str):
+    """
+    Yields a path to a UTF-8 text rendition of `path`: the file itself for text formats,
+    otherwise a temporary file produced by the format's extractor in the process pool.
+    """
+    ext = _extension(path)
+    if ext not in EXTRACTORS:
+        if ext not in TEXT_EXTENSIONS and not await asyncio.to_thread(looks_like_text, path):
+            raise ExtractionError(f"Unsupported file type: {ext or os.path.basename(path)}")
+        yield path
+        return
+
+    fd, destination = tempfile.mkstemp(prefix="aether-extract-", suffix=".txt")
+    os.close(fd)
+    try:
+        await asyncio.get_running_loop().run_in_executor(get_pool(), _run_extractor, path, destination)
+        yield destination
+    finally:
+        os.remove(destination)
@@ -1,16 +1,40 @@
-
 import os
+import time
+import uuid
+import zlib
+import codecs
+import hashlib
 import asyncio
-import glob
+import argparse
+from datetime import datetime
+from contextlib import asynccontextmanager
+from itertools import islice
 from pathlib import Path
+from typing import List, Optional, Callable, Dict, Any, Iterator, Iterable, AsyncIterable, AsyncIterator, Tuple, Union
+import neardup
+from extractors import extracted_text_path, shutdown_pool, supported_extensions
 from memory import memory_manager
-from database import DatabaseService
+from database import AsyncDatabaseService
+from local_db import sqlite_service
 
 # Configuration
 SOURCE_DIR = "./knowledge_source"
+INDEXABLE_EXTENSIONS = supported_extensions()  # Text/code streamed as-is, other formats via extractors.py
+IGNORED_SUFFIXES = ("~", ".tmp", ".part", ".swp", ".crdownload")  # Editor backups and partial downloads
 CHUNK_SIZE = 1000  # Characters for now, rough approximation
 CHUNK_OVERLAP = 200
 
+# Pipeline tuning
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))      # Chunks per embedding request
+EMBED_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))           # Embedding batches in flight
+UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "256"))   # Points per Qdrant upsert
+RATE_LIMIT = float(os.getenv("INGEST_RATE_LIMIT", "0"))                 # Embedding requests/sec (0 = unlimited)
+MANIFEST_BATCH_SIZE = int(os.getenv("INGEST_SCAN_BATCH_SIZE", "256"))   # Chunks read and checked against the manifest at once
+STREAM_BLOCK_SIZE = 64 * 1024                                           # Bytes read from disk per block
+
+# Namespace for deterministic chunk point IDs (uuid5 of source + chunk hash)
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a4e-8d3b-5e7f-9a0b-c4d5e6f7a8b9")
+
 def split_text(text: str, chunk_size=1000, overlap=100) -> list[str]:
     """
     Very simple text splitter.
@@ -19,86 +43,721 @@ def split_text(text: str, chunk_size=1000, overlap=100) -> list[str]:
     chunks = []
     start = 0
     text_len = len(text)
-    
+
     while start < text_len:
         end = start + chunk_size
         chunks.append(text[start:end])
         start += chunk_size - overlap
-        
+
     return chunks
 
-async def process_content(content: str, filename: str, db: DatabaseService):
+def _split_long_lines(lines, max_len: int) -> Iterator[str]:
+    for line in lines:
+        while len(line) > max_len:
+            yield line[:max_len]
+            line = line[max_len:]
+        if line:
+            yield line
+
+def _iter_lines(pieces: Iterable[str], max_len: int) -> Iterator[str]:
     """
-    Chunks content, embeds it, and saves to DB.
+    Re-splits streamed text blocks into lines (keeping line endings) while holding at
+    most one partial line. A line longer than `max_len` is emitted in slices, so a file
+    without newlines (minified JSON, binary-ish dumps) cannot grow the buffer unbounded.
+    """
+    partial = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        lines = (partial + piece).splitlines(keepends=True)
+        last = lines[-1]
+        # A trailing "\r" may be the first half of a "\r\n" split across blocks
+        partial = lines.pop() if last.splitlines()[0] == last or last.endswith("\r") else ""
+        yield from lines
+        while len(partial) > max_len:
+            yield partial[:max_len]
+            partial = partial[max_len:]
+    if partial:
+        yield partial
+
+def _is_boundary(piece: str) -> bool:
+    # Paragraph breaks, plus ~1 in 8 lines chosen by content hash, so boundaries
+    # depend only on nearby text and re-align right after an edit.
+    return not piece.strip() or zlib.crc32(piece.encode("utf-8")) % 8 == 0
+
+def iter_chunks(text: Union[str, Iterable[str]], chunk_size: int = 1000, overlap: int = 100) -> Iterator[str]:
+    """
+    Content-defined splitter. Chunks end at line boundaries chosen by content
+    (blank lines or hash-selected lines) once they reach half of `chunk_size`, so editing
+    one paragraph only changes the chunks around it instead of shifting every later chunk.
+    Each chunk is prefixed with the last `overlap` characters of the previous one.
+    `text` may be a string or an iterable of text blocks (e.g. FileTextStream); blocks
+    are consumed lazily and produce the same chunks as the joined string.
+    """
+    body_limit = max(chunk_size - overlap, 1)
+    min_size = body_limit // 2
+    buffer: List[str] = []
+    size = 0
+    tail = ""
+
+    def flush():
+        nonlocal buffer, size, tail
+        body = "".join(buffer)
+        buffer, size = [], 0
+        chunk = tail + body
+        tail = body[-overlap:] if overlap > 0 else ""
+        return chunk
+
+    pieces = [text] if isinstance(text, str) else text
+    for piece in _split_long_lines(_iter_lines(pieces, body_limit), body_limit):
+        if size and size + len(piece) > body_limit:
+            yield flush()
+        buffer.append(piece)
+        size += len(piece)
+        if size >= min_size and _is_boundary(piece):
+            yield flush()
+
+    if buffer:
+        yield flush()
+
+class FileTextStream:
+    """
+    Iterates a UTF-8 file as decoded text blocks without loading it whole.
+    Invalid bytes are replaced rather than aborting the ingest; `bytes_read` / `size`
+    allow progress reporting while the total chunk count is still unknown. `sha256` hashes
+    the raw bytes as they are read, so it matches exactly what was chunked.
+    """
+    def __init__(self, path: str, block_size: int = None):
+        self.path = path
+        self.block_size = block_size or STREAM_BLOCK_SIZE
+        self.size = os.path.getsize(path)
+        self.bytes_read = 0
+        self.sha256 = hashlib.sha256()
+
+    def __iter__(self) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(self.path, "rb") as f:
+            while block := f.read(self.block_size):
+                self.bytes_read += len(block)
+                self.sha256.update(block)
+                yield decoder.decode(block)
+        yield decoder.decode(b"", final=True)
+
+def source_path(filename: str, source_dir: str = None) -> Optional[str]:
+    """
+    Resolved path of a source file named relative to the source folder, or None when the name
+    escapes it ("../", absolute paths, symlinks pointing outside). Nested names are allowed.
+    """
+    root = os.path.realpath(source_dir or SOURCE_DIR)
+    path = os.path.realpath(os.path.join(root, filename))
+    return path if os.path.commonpath([root, path]) == root and path != root else None
+
+def walk_sources(source_dir: str = None, indexable_only: bool = True) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    (filename, path, stat) of every file under the source folder, recursively and in sorted
+    order. The filename is the POSIX path relative to the folder (e.g. "specs/api.md"): the
+    name used by the catalog, the manifest, jobs and the watcher alike. Hidden files and
+    folders and IGNORED_SUFFIXES are skipped; with `indexable_only`, so are unsupported types.
+    """
+    root = source_dir or SOURCE_DIR
+    for folder, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith(".") or name.endswith(IGNORED_SUFFIXES):
+                continue
+            if indexable_only and not name.lower().endswith(INDEXABLE_EXTENSIONS):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue  # Removed while walking
+            yield Path(os.path.relpath(path, root)).as_posix(), path, info
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+def chunk_point_id(source: str, content_hash: str) -> str:
+    """Deterministic point ID, so re-indexing the same chunk overwrites instead of duplicating."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source}:{content_hash}"))
+
+class RateLimiter:
+    """Spaces out calls to at most `rate` per second (rate <= 0 disables limiting)."""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+# Shared by concurrent runs, so INGEST_RATE_LIMIT is a process-wide embedding budget
+rate_limiter = RateLimiter(RATE_LIMIT)
+
+async def _as_async(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+async def run_ingest_pipeline(
+    units: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    filename: str,
+    db: AsyncDatabaseService,
+    total_chunks: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_stored: Optional[Callable[[List[Dict[str, Any]]], Any]] = None
+) -> Dict[str, Any]:
     """
+    Staged ingestion: batch-embed chunks with bounded concurrency, then
+    batch-upsert many points per Qdrant request.
+    Each unit is a dict with "content", "chunk_index" and optional "id" / "chunk_hash".
+    `units` may be a list or a (async) generator; it is consumed as embedding batches
+    are needed, so a lazily produced stream never has to be materialized.
+    `total_chunks` (optional) is written into each chunk's metadata when known up front.
+    `progress` (optional) is called with the running stats after every upsert, and
+    `on_stored` (optional, awaited) receives each batch of points once it is stored.
+    """
+    started = time.perf_counter()
+    stats = {"filename": filename, "total_chunks": total_chunks, "to_embed": 0, "embedded": 0, "failed": 0, "stored": 0}
+
+    batch_queue: asyncio.Queue = asyncio.Queue(maxsize=EMBED_CONCURRENCY * 2)
+    point_queue: asyncio.Queue = asyncio.Queue(maxsize=UPSERT_BATCH_SIZE * 2)
+
+    async def produce():
+        # Stage 1: group chunks into embedding batches as they arrive
+        error = None
+        try:
+            batch = []
+            async for unit in (units if hasattr(units, "__aiter__") else _as_async(units)):
+                stats["to_embed"] += 1
+                batch.append(unit)
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    await batch_queue.put(batch)
+                    batch = []
+            if batch:
+                await batch_queue.put(batch)
+        except Exception as e:
+            error = e
+        # Release the workers even if the source stream fails mid-way (not when cancelled:
+        # then the workers are cancelled too and nobody would drain the queue)
+        for _ in range(EMBED_CONCURRENCY):
+            await batch_queue.put(None)
+        if error:
+            raise error
+
+    async def embed_worker():
+        # Stage 2: one embedding request per batch, EMBED_CONCURRENCY in flight
+        while (batch := await batch_queue.get()) is not None:
+            await rate_limiter.acquire()
+            embeddings = await memory_manager.get_embeddings([u["content"] for u in batch])
+            for unit, embedding in zip(batch, embeddings):
+                if not embedding:
+                    print(f" -> Failed to embed chunk {unit['chunk_index']}. Skipping.")
+                    stats["failed"] += 1
+                    continue
+                stats["embedded"] += 1
+                metadata = {
+                    "source": filename,
+                    "chunk_index": unit["chunk_index"]
+                }
+                if total_chunks is not None:
+                    metadata["total_chunks"] = total_chunks
+                if unit.get("chunk_hash"):
+                    metadata["chunk_hash"] = unit["chunk_hash"]
+                await point_queue.put({
+                    "id": unit.get("id"),
+                    "content": unit["content"],
+                    "embedding": embedding,
+                    "metadata": metadata
+                })
+
+    async def flush(points: List[Dict[str, Any]]):
+        result = await db.add_document_chunks(points)
+        if "results" in result:
+            # Per-point statuses (input order): only the points actually written count as stored
+            written = [p for p, r in zip(points, result["results"]) if r["status"] != "error"]
+        else:
+            written = points if result.get("status") == "success" else []
+        stats["stored"] += len(written)
+        stats["failed"] += len(points) - len(written)
+        if written and on_stored:
+            await on_stored(written)
+        if progress:
+            progress(dict(stats))
+
+    async def upsert_worker():
+        # Stage 3: many PointStructs per Qdrant request
+        pending = []
+        while (point := await point_queue.get()) is not None:
+            pending.append(point)
+            if len(pending) >= UPSERT_BATCH_SIZE:
+                await flush(pending)
+                pending = []
+        if pending:
+            await flush(pending)
+
+    upserter = asyncio.create_task(upsert_worker())
+    # Let in-flight batches finish before surfacing a producer error
+    embedding = asyncio.gather(produce(), *(embed_worker() for _ in range(EMBED_CONCURRENCY)), return_exceptions=True)
+    end_of_stream = None
     try:
-        chunks = split_text(content, CHUNK_SIZE, CHUNK_OVERLAP)
-        
-        print(f" -> Found {len(chunks)} chunks for {filename}.")
-        
-        for i, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = await memory_manager.get_embedding(chunk)
-            if not embedding:
-                print(f" -> Failed to embed chunk {i}. Skipping.")
+        # The upserter only returns after the end-of-stream marker, so finishing first means it
+        # failed: stop the stages feeding it instead of letting them block on its full queue
+        await asyncio.wait({embedding, upserter}, return_when=asyncio.FIRST_COMPLETED)
+        if upserter.done():
+            embedding.cancel()
+            await asyncio.gather(embedding, return_exceptions=True)
+            upserter.result()
+        end_of_stream = asyncio.create_task(point_queue.put(None))
+        await asyncio.wait({end_of_stream, upserter}, return_when=asyncio.FIRST_COMPLETED)
+        await upserter
+        results = embedding.result()
+    finally:
+        # No-ops once finished; on failure or cancellation nothing is left blocked on a queue
+        for task in (embedding, upserter, end_of_stream):
+            if task is not None:
+                task.cancel()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_sec"] = round(stats["stored"] / elapsed, 1) if elapsed > 0 else 0.0
+    print(f" -> {filename}: stored {stats['stored']}/{stats['to_embed']} chunks in {elapsed:.1f}s ({stats['chunks_per_sec']} chunks/sec)")
+    return stats
+
+async def index_stream(chunks: Iterable[str], filename: str, db: AsyncDatabaseService, progress=None) -> Dict[str, Any]:
+    """
+    Incrementally indexes a (possibly lazy) stream of chunks. Chunks are pulled in
+    MANIFEST_BATCH_SIZE batches, checked against the source's manifest, and only new ones
+    flow on to the embedding pipeline, so memory is bounded by batch and queue sizes rather
+    than the file size. New chunks that are near-duplicates of chunks already stored for
+    another source are linked to them instead of being embedded (see neardup.py).
+    Known chunks are marked as seen (and repositioned if they moved); chunks not seen in
+    this run are deleted at the end, when total_chunks is also fixed up.
+    """
+    run_started = datetime.now().isoformat()
+    if not await sqlite_service.has_chunk_manifest(filename):
+        # First manifest-tracked run: drop points written by older ingests with random IDs
+        await db.delete_document(filename)
+
+    scan = {"scanned": 0, "unchanged": 0, "moved": 0, "deduplicated": 0}
+    fingerprints: Dict[str, int] = {}  # chunk hash -> SimHash of chunks in flight
+    # A repeated chunk keeps its first position instead of flipping between occurrences across
+    # runs. Chunks already handled this run are recognised by their manifest row (indexed_at is
+    # this run's start); only new chunks not yet recorded are tracked here, so memory stays
+    # bounded by the pipeline's queues rather than growing with the source
+    in_flight: set = set()
+    matcher: Optional[neardup.FingerprintMatcher] = None
+    chunk_iter = iter(chunks)
+
+    def next_batch() -> List[str]:
+        return list(islice(chunk_iter, MANIFEST_BATCH_SIZE))
+
+    async def link_near_duplicates(new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        nonlocal matcher
+        if matcher is None:
+            # Other sources' fingerprints, loaded once per run
+            matcher = neardup.FingerprintMatcher(await sqlite_service.get_fingerprints(filename))
+
+        def fingerprint():
+            values = [neardup.simhash(u["content"]) for u in new]
+            return values, matcher.match(values)
+
+        values, matches = await asyncio.to_thread(fingerprint)
+        linked, remaining = [], []
+        for unit, value, match in zip(new, values, matches):
+            if match:
+                linked.append({**unit, "point_id": unit["id"], "total_chunks": 0, "duplicate_of": match})
                 continue
-                
-            # Save to DB (Documents Collection)
-            metadata = {
-                "source": filename,
-                "chunk_index": i,
-                "total_chunks": len(chunks)
+            if value is not None:
+                fingerprints[unit["chunk_hash"]] = value
+            remaining.append(unit)
+        if linked:
+            await sqlite_service.upsert_chunk_manifest(filename, linked, seen_at=run_started)
+            in_flight.difference_update(u["chunk_hash"] for u in linked)
+            scan["deduplicated"] += len(linked)
+        return remaining
+
+    async def units():
+        # Reading and chunking run in a worker thread so large files never block the loop
+        while batch := await asyncio.to_thread(next_batch):
+            start = scan["scanned"]
+            scan["scanned"] += len(batch)
+            hashes = [chunk_hash(c) for c in batch]
+            known = await sqlite_service.get_chunk_manifest(filename, hashes)
+
+            new, seen, moved = [], [], []
+            handled = set()  # Rows of this batch are only written once it has been scanned
+            for offset, (chunk, content_hash) in enumerate(zip(batch, hashes)):
+                entry = known.get(content_hash)
+                if content_hash in handled or content_hash in in_flight or (entry and entry["indexed_at"] == run_started):
+                    continue  # Identical chunk repeated earlier in the source
+                handled.add(content_hash)
+
+                if entry is None:
+                    in_flight.add(content_hash)
+                    new.append({
+                        "id": chunk_point_id(filename, content_hash),
+                        "content": chunk,
+                        "chunk_index": start + offset,
+                        "chunk_hash": content_hash
+                    })
+                elif entry["chunk_index"] != start + offset:
+                    moved.append({**entry, "chunk_index": start + offset})
+                else:
+                    seen.append(content_hash)
+
+            if new and neardup.ENABLED:
+                new = await link_near_duplicates(new)
+            for unit in new:
+                yield unit
+
+            if moved:
+                # Linked chunks have no point of their own; only the manifest tracks their position
+                positions = {e["point_id"]: {"chunk_index": e["chunk_index"]} for e in moved if not e.get("duplicate_of")}
+                if await db.update_document_chunks(positions):
+                    await sqlite_service.upsert_chunk_manifest(filename, moved, seen_at=run_started)
+                    scan["moved"] += len(moved)
+                else:
+                    seen.extend(e["chunk_hash"] for e in moved)
+            await sqlite_service.touch_chunk_manifest(filename, seen, run_started)
+            scan["unchanged"] += len(seen)
+
+    async def record(points: List[Dict[str, Any]]):
+        # Manifest rows are written per upsert batch so an interrupted run resumes where it stopped
+        await sqlite_service.upsert_chunk_manifest(filename, [
+            {
+                "chunk_hash": p["metadata"]["chunk_hash"],
+                "point_id": p["id"],
+                "chunk_index": p["metadata"]["chunk_index"],
+                "total_chunks": 0
             }
-            
-            db.add_document_chunk(
-                content=chunk,
-                embedding=embedding,
-                metadata=metadata
+            for p in points
+        ], seen_at=run_started)
+        in_flight.difference_update(p["metadata"]["chunk_hash"] for p in points)
+        stored_fingerprints = [
+            (p["id"], fingerprints.pop(p["metadata"]["chunk_hash"]))
+            for p in points if p["metadata"]["chunk_hash"] in fingerprints
+        ]
+        await sqlite_service.add_fingerprints(filename, stored_fingerprints)
+
+    def report(running: Dict[str, Any]):
+        progress({**running, **scan})
+
+    stats = await run_ingest_pipeline(units(), filename, db, progress=report if progress else None, on_stored=record)
+    total = scan["scanned"]
+
+    orphaned: List[str] = []
+    stale = await sqlite_service.get_stale_chunk_manifest(filename, run_started)
+    if stale:
+        stored_ids = [e["point_id"] for e in stale.values() if not e.get("duplicate_of")]
+        if await db.delete_document_chunks(stored_ids):
+            await sqlite_service.remove_chunk_manifest(filename, list(stale))
+            # Other sources linked to the deleted chunks must embed their own copies again
+            orphaned = await sqlite_service.release_points(stored_ids)
+    if stats["stored"] or stale or scan["moved"] or scan["deduplicated"]:
+        # The chunk count is only known once the stream ends: one filtered payload update
+        if await db.update_document_fields(filename, {"total_chunks": total}):
+            await sqlite_service.set_chunk_manifest_total(filename, total)
+
+    print(
+        f" -> {filename}: {stats['to_embed']} new, {scan['deduplicated']} near-duplicates linked, "
+        f"{len(stale)} removed, {scan['unchanged']} unchanged, {scan['moved']} moved chunks."
+    )
+    stats.update({
+        "total_chunks": total,
+        "unchanged": scan["unchanged"],
+        "removed": len(stale),
+        "moved": scan["moved"],
+        "deduplicated": scan["deduplicated"],
+        "orphaned_sources": orphaned
+    })
+    return stats
+
+async def forget_source(filename: str, db: AsyncDatabaseService) -> Dict[str, Any]:
+    """
+    Removes a source from the vector store and its indexing state. Returns whether the
+    vectors were deleted and which other sources must be re-indexed because they had
+    chunks linked to this one.
+    """
+    deleted = await db.delete_document(filename)
+    orphaned: List[str] = []
+    if deleted:
+        await sqlite_service.forget_document(filename)
+        orphaned = await sqlite_service.release_points(source=filename)
+    return {"deleted": deleted, "orphaned_sources": orphaned}
+
+@asynccontextmanager
+async def cataloged(filename: str, **file_fields):
+    """
+    Tracks an indexing run in the document catalog: 'indexing' while it runs, then 'indexed'
+    (or 'failed' / 'cancelled'). The body sets result["stats"] and result["content_hash"].
+    """
+    await sqlite_service.update_document_entry(filename, **file_fields, state="indexing", error=None)
+    result: Dict[str, Any] = {}
+    try:
+        yield result
+    except asyncio.CancelledError:
+        await sqlite_service.update_document_entry(filename, state="cancelled")
+        raise
+    except Exception as e:
+        await sqlite_service.update_document_entry(filename, state="failed", error=str(e))
+        raise
+    stats = result["stats"]
+    await sqlite_service.update_document_entry(
+        filename,
+        content_hash=result.get("content_hash"),
+        total_chunks=stats["total_chunks"],
+        embedding_model=memory_manager.embedding_model,
+        state="failed" if stats["failed"] else "indexed",
+        error=f"{stats['failed']} chunk(s) failed to index" if stats["failed"] else None,
+        indexed_at=datetime.now().isoformat()
+    )
+
+async def sync_catalog(source_dir: str = None, startup: bool = False, if_stale: bool = False) -> bool:
+    """
+    Registers the files in the source folder in the document catalog (see SQLiteService.sync_document_catalog).
+    At `startup`, rows still marked 'indexing' belong to runs killed with the last process and are failed.
+    With `if_stale`, the catalog is only written when the folder's names, sizes or mtimes differ from it.
+    Returns whether the catalog was synced.
+    """
+    source_dir = source_dir or SOURCE_DIR
+
+    def listing() -> Dict[str, tuple]:
+        # Every file is listed (unsupported types too), so the catalog mirrors the folder
+        return {name: (info.st_size, info.st_mtime_ns) for name, _, info in walk_sources(source_dir, indexable_only=False)}
+
+    files = await asyncio.to_thread(listing)
+    if if_stale:
+        # 'missing' rows are indexed sources that are no longer on disk
+        catalog = {
+            entry["filename"]: (entry["size"], entry["mtime_ns"])
+            for entry in await sqlite_service.list_document_catalog() if entry["state"] != "missing"
+        }
+        if catalog == files:
+            return False
+    await sqlite_service.sync_document_catalog(files, interrupted=startup)
+    return True
+
+async def ingest_content(content: str, filename: str, db: AsyncDatabaseService, progress=None) -> Dict[str, Any]:
+    """
+    Chunks content and incrementally indexes it. Returns the pipeline stats.
+    """
+    data = content.encode("utf-8")
+    async with cataloged(filename, size=len(data)) as run:
+        run["content_hash"] = hashlib.sha256(data).hexdigest()
+        run["stats"] = await index_stream(iter_chunks(content, CHUNK_SIZE, CHUNK_OVERLAP), filename, db, progress=progress)
+    return run["stats"]
+
+async def ingest_file(file_path: str, db: AsyncDatabaseService, filename: str = None, progress=None) -> Dict[str, Any]:
+    """
+    Streams a file from disk through the chunker and incremental indexer.
+    Non-text formats (PDF, DOCX, HTML, ...) are extracted in the process pool first.
+    Progress updates also carry "bytes_read" / "bytes_total" of the text being chunked.
+    """
+    filename = filename or os.path.basename(file_path)
+    info = os.stat(file_path)
+    async with cataloged(filename, size=info.st_size, mtime_ns=info.st_mtime_ns) as run:
+        async with extracted_text_path(file_path) as text_path:
+            stream = FileTextStream(text_path)
+
+            def report(running: Dict[str, Any]):
+                progress({**running, "bytes_read": stream.bytes_read, "bytes_total": stream.size})
+
+            run["stats"] = await index_stream(
+                iter_chunks(stream, CHUNK_SIZE, CHUNK_OVERLAP), filename, db, progress=report if progress else None
             )
-            # Rate limit politeness
-            await asyncio.sleep(0.5) 
-            
+            run["content_hash"] = stream.sha256.hexdigest()
+    return run["stats"]
+
+async def process_content(content: str, filename: str, db: AsyncDatabaseService):
+    """
+    Chunks content, embeds it, and saves to DB.
+    """
+    try:
+        await ingest_content(content, filename, db)
         print(f" -> Finished processing {filename}")
         return True
-        
+
     except Exception as e:
         print(f"Error processing content for {filename}: {e}")
         return False
 
-async def process_file(file_path: str, db: DatabaseService):
+async def process_file(file_path: str, db: AsyncDatabaseService):
     """
-    Reads a file and delegates to process_content.
+    Streams a file from disk into the vector database.
     """
     print(f"Processing: {file_path}")
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            
-        filename = os.path.basename(file_path)
-        await process_content(content, filename, db)
-        
+        await ingest_file(file_path, db)
+        print(f" -> Finished processing {os.path.basename(file_path)}")
+
     except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
-
-async def main():
-    db = DatabaseService()
-    
-    # 1. Find all markdown and text files
-    files = glob.glob(os.path.join(SOURCE_DIR, "**/*.md"), recursive=True) + \
-            glob.glob(os.path.join(SOURCE_DIR, "**/*.txt"), recursive=True)
-            
+        print(f"Error processing file {file_path}: {e}")
+
+# --- Bulk ingest CLI ---
+
+def discover_files(source_dir: str) -> List[Tuple[str, str]]:
+    """(path, filename) of every supported file under `source_dir` (see walk_sources)."""
+    return [(path, name) for name, path, _ in walk_sources(source_dir)]
+
+async def plan_file(file_path: str, filename: str) -> Dict[str, Any]:
+    """
+    Dry run of ingest_file: counts the file's chunks, how many are not indexed yet, and how
+    many of those miss the embedding cache. Nothing is written. Near-duplicate linking is not
+    simulated, so the embedding numbers are an upper bound.
+    """
+    plan = {"chunks": 0, "unchanged": 0, "to_embed": 0, "cache_misses": 0}
+    async with extracted_text_path(file_path) as text_path:
+        chunk_iter = iter_chunks(FileTextStream(text_path), CHUNK_SIZE, CHUNK_OVERLAP)
+        tracked = await sqlite_service.has_chunk_manifest(filename)
+        while batch := await asyncio.to_thread(lambda: list(islice(chunk_iter, MANIFEST_BATCH_SIZE))):
+            plan["chunks"] += len(batch)
+            hashes = [chunk_hash(c) for c in batch]
+            known = await sqlite_service.get_chunk_manifest(filename, hashes) if tracked else {}
+            new = {h: c for c, h in zip(batch, hashes) if h not in known}
+            plan["unchanged"] += len({h for h in hashes if h in known})
+            plan["to_embed"] += len(new)
+            cache = memory_manager.cache
+            if cache and new:
+                texts = list(new.values())
+                cached = await asyncio.to_thread(cache.get_many, memory_manager.embedding_model, memory_manager.output_dimensionality, texts)
+                plan["cache_misses"] += sum(vector is None for vector in cached)
+            else:
+                plan["cache_misses"] += len(new)
+    return plan
+
+async def bulk_ingest(
+    files: List[Tuple[str, str]], db: Optional[AsyncDatabaseService], workers: int = 4,
+    resume: bool = False, dry_run: bool = False, fail_fast: bool = False
+) -> Dict[str, Any]:
+    """
+    Indexes many files with `workers` files in flight. Each fully indexed file is recorded in
+    the ingest_checkpoint table; with `resume`, files already recorded (and unchanged on disk)
+    are skipped. A file that stopped mid-way resumes at chunk level through the chunk manifest.
+    With `dry_run`, files are only planned (see plan_file). Returns the run totals.
+    """
+    if not resume and not dry_run:
+        await sqlite_service.clear_ingest_checkpoint()
+    checkpoint = await sqlite_service.get_ingest_checkpoint() if resume else {}
+
+    totals = {
+        "files": len(files), "indexed": 0, "skipped": 0, "failed_files": [], "bytes": 0,
+        "chunks": 0, "stored": 0, "unchanged": 0, "deduplicated": 0, "failed": 0,
+        "to_embed": 0, "cache_misses": 0
+    }
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in files:
+        queue.put_nowait(item)
+    stop = asyncio.Event()
+    started = time.perf_counter()
+
+    async def worker():
+        while not stop.is_set():
+            try:
+                path, filename = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                print(f" -> {filename}: skipped ({e})")
+                totals["failed_files"].append(filename)
+                continue
+            done = checkpoint.get(filename)
+            if done and (done["mtime_ns"], done["size"]) == (stat.st_mtime_ns, stat.st_size):
+                totals["skipped"] += 1
+                continue
+            try:
+                if dry_run:
+                    stats = await plan_file(path, filename)
+                else:
+                    stats = await ingest_file(path, db, filename=filename)
+            except Exception as e:
+                print(f" -> {filename}: failed ({e})")
+                stats = {"error": str(e)}
+            totals["bytes"] += stat.st_size
+            totals["chunks"] += stats.get("total_chunks", stats.get("chunks", 0))
+            for key in ("stored", "unchanged", "deduplicated", "failed", "to_embed", "cache_misses"):
+                totals[key] += stats.get(key, 0)
+
+            if stats.get("error") or stats.get("failed"):
+                # Not checkpointed: --resume picks the file up again (stored chunks are kept)
+                totals["failed_files"].append(filename)
+                if fail_fast:
+                    stop.set()
+                continue
+            totals["indexed"] += 1
+            if not dry_run:
+                await sqlite_service.mark_ingest_checkpoint(filename, stat.st_mtime_ns, stat.st_size, stats["total_chunks"])
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    totals["seconds"] = round(time.perf_counter() - started, 2)
+    totals["remaining"] = queue.qsize()
+    return totals
+
+def print_summary(totals: Dict[str, Any], dry_run: bool = False):
+    elapsed = totals["seconds"] or 1e-9
+    megabytes = totals["bytes"] / (1024 * 1024)
+    print("\n=== Ingest summary" + (" (dry run)" if dry_run else "") + " ===")
+    print(f"Files:      {totals['indexed']} done, {totals['skipped']} skipped (checkpoint), "
+          f"{len(totals['failed_files'])} failed, {totals['remaining']} not started / {totals['files']} total")
+    if dry_run:
+        calls = -(-totals["cache_misses"] // max(1, memory_manager.batch_size))
+        print(f"Chunks:     {totals['chunks']} total, {totals['unchanged']} already indexed, {totals['to_embed']} to embed")
+        print(f"Embedding:  {totals['cache_misses']} chunks miss the cache -> ~{calls} embedding API calls (upper bound)")
+    else:
+        print(f"Chunks:     {totals['chunks']} total, {totals['stored']} stored, {totals['unchanged']} unchanged, "
+              f"{totals['deduplicated']} near-duplicates linked, {totals['failed']} failed")
+        print(f"Throughput: {totals['stored'] / elapsed:.1f} chunks/sec, {megabytes / elapsed:.2f} MB/sec")
+    print(f"Elapsed:    {totals['seconds']:.1f}s ({megabytes:.1f} MB read)")
+    if totals["failed_files"]:
+        print(f"Failed:     {', '.join(totals['failed_files'][:10])}" + (" ..." if len(totals["failed_files"]) > 10 else ""))
+        print("Re-run with --resume to retry only the files that did not complete.")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-index the knowledge source folder into the vector store.")
+    parser.add_argument("--source", default=SOURCE_DIR, help=f"Folder to index (default: {SOURCE_DIR})")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INGEST_CLI_WORKERS", "4")), help="Files indexed in parallel")
+    parser.add_argument("--concurrency", type=int, help="Embedding requests in flight per file (INGEST_CONCURRENCY)")
+    parser.add_argument("--rate-limit", type=float, help="Embedding requests/sec across all workers (INGEST_RATE_LIMIT)")
+    parser.add_argument("--resume", action="store_true", help="Skip files completed by the previous run")
+    parser.add_argument("--dry-run", action="store_true", help="Only report chunk and embedding call counts")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop starting new files after the first failure")
+    return parser.parse_args(argv)
+
+async def main(argv: Optional[List[str]] = None):
+    global EMBED_CONCURRENCY, rate_limiter
+    args = parse_args(argv)
+    if args.concurrency:
+        EMBED_CONCURRENCY = args.concurrency
+    if args.rate_limit is not None:
+        rate_limiter = RateLimiter(args.rate_limit)
+
+    await sqlite_service.init_db()
+    files = discover_files(args.source)
     if not files:
-        print(f"No .md or .txt files found in {SOURCE_DIR}")
+        print(f"No supported files found in {args.source}")
         print("Please add some files to ingest.")
         return
 
-    print(f"Found {len(files)} files to ingest...")
-    
-    # 2. Process each file
-    for file in files:
-        await process_file(file, db)
-        
-    print("\nIngestion complete!")
+    print(f"Found {len(files)} files to ingest ({args.workers} in parallel)...")
+    db = None if args.dry_run else AsyncDatabaseService()
+    try:
+        totals = await bulk_ingest(files, db, args.workers, resume=args.resume, dry_run=args.dry_run, fail_fast=args.fail_fast)
+    finally:
+        shutdown_pool()
+        if db:
+            await db.close()
+    print_summary(totals, dry_run=args.dry_run)
 
 if __name__ == "__main__":
     asyncio.run(main())
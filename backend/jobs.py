@@ -0,0 +1,272 @@
+"""
+Background ingestion jobs.
+Indexing requests are persisted in SQLite (ingest_jobs) and processed by a small pool of
+asyncio workers, so HTTP handlers return immediately while large files index at full
+pipeline speed. Jobs report live progress (chunks done / total, throughput, ETA), can be
+cancelled, and are retried automatically on failure. Jobs interrupted by a shutdown or
+crash are resumed on the next start; since indexing is incremental, a resumed job only
+embeds the chunks that were not stored yet.
+"""
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from local_db import sqlite_service
+from extractors import ExtractionError
+
+PROGRESS_WRITE_INTERVAL = 1.0  # Seconds between persisted progress snapshots
+
+
+def summarize_progress(stats: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    """
+    Turns running pipeline stats into job progress. While a file is still streaming the
+    chunk total is unknown, so it is extrapolated from the bytes read so far.
+    """
+    scanned = stats.get("scanned", 0)
+    done = stats.get("stored", 0) + stats.get("failed", 0) + stats.get("unchanged", 0) + stats.get("moved", 0)
+    total = stats.get("total_chunks")
+    estimated = total is None
+    if estimated:
+        bytes_read, bytes_total = stats.get("bytes_read"), stats.get("bytes_total")
+        total = round(scanned * bytes_total / bytes_read) if bytes_read and bytes_total else scanned
+        total = max(total, scanned, done)
+
+    rate = done / elapsed if elapsed > 0 else 0.0
+    return {
+        "chunks_done": done,
+        "chunks_total": total,
+        "total_is_estimate": estimated,
+        "percent": round(100.0 * done / total, 1) if total else 100.0,
+        "chunks_per_sec": round(rate, 1),
+        "eta_seconds": round((total - done) / rate, 1) if rate else None,
+        "stored": stats.get("stored", 0),
+        "failed": stats.get("failed", 0),
+        "unchanged": stats.get("unchanged", 0),
+        "elapsed_seconds": round(elapsed, 1),
+    }
+
+
+class IngestJobManager:
+    """Queue + worker pool for indexing files from the knowledge source directory."""
+
+    def __init__(self, workers: int = None, max_attempts: int = None, retry_delay: float = None, runner: Callable[..., Awaitable[Dict[str, Any]]] = None):
+        self.workers = workers or int(os.getenv("INGEST_JOB_WORKERS", "2"))
+        self.max_attempts = max_attempts or int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("INGEST_JOB_RETRY_DELAY", "5"))
+        self.runner = runner  # Defaults to ingest.ingest_file (resolved lazily)
+        self.db = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._live: Dict[str, Dict[str, Any]] = {}
+        self._claimed = set()
+        self._file_locks: Dict[str, asyncio.Lock] = {}
+        self._timers: List[asyncio.TimerHandle] = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, db):
+        """Starts the worker pool and resumes jobs left queued or running by a previous process."""
+        if self.started:
+            return
+        self.db = db
+        self.queue = asyncio.Queue()
+        for job_id in await sqlite_service.requeue_interrupted_ingest_jobs():
+            self.queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"[Jobs] Ingestion workers started ({self.workers}), {self.queue.qsize()} job(s) queued.")
+
+    async def stop(self):
+        """Stops the workers. Running jobs go back to 'queued' and resume on the next start."""
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.queue = None
+
+    async def enqueue(self, filename: str, max_attempts: int = None, follow_up: bool = False) -> Dict[str, Any]:
+        """
+        Queues a file for indexing. Returns the already active job if the file is queued or running.
+        With `follow_up`, a running job does not count: the file changed after that run started,
+        so a new job is queued to run once it finishes.
+        """
+        statuses = ("queued",) if follow_up else ("queued", "running")
+        active = await sqlite_service.get_active_ingest_job(filename, statuses)
+        if active:
+            return self._with_live(active)
+        job = await sqlite_service.create_ingest_job(filename, max_attempts or self.max_attempts)
+        if self.queue is not None:
+            self.queue.put_nowait(job["id"])
+        await sqlite_service.add_log("info", "KNOWLEDGE", f"Queued indexing job for {filename}")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await sqlite_service.get_ingest_job(job_id)
+        return self._with_live(job) if job else None
+
+    async def list(self, status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return [self._with_live(job) for job in await sqlite_service.list_ingest_jobs(status, limit)]
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancels a queued or running job. Chunks already stored stay indexed."""
+        job = await sqlite_service.get_ingest_job(job_id)
+        if not job or job["status"] not in ("queued", "running"):
+            return job
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()  # The worker records the final status
+        else:
+            await sqlite_service.update_ingest_job(job_id, status="cancelled", finished_at=datetime.now().isoformat())
+        return await self.get(job_id)
+
+    async def cancel_file(self, filename: str):
+        """Cancels every queued or running job for a file (e.g. after it was deleted)."""
+        while queued := await sqlite_service.get_active_ingest_job(filename, ("queued",)):
+            await self.cancel(queued["id"])
+        running = await sqlite_service.get_active_ingest_job(filename, ("running",))
+        if running:
+            await self.cancel(running["id"])
+
+    async def retry(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Re-queues a failed or cancelled job with a fresh attempt budget."""
+        job = await sqlite_service.get_ingest_job(job_id)
+        if not job or job["status"] not in ("failed", "cancelled"):
+            return job
+        await sqlite_service.update_ingest_job(job_id, status="queued", attempts=0, error=None, finished_at=None)
+        if self.queue is not None:
+            self.queue.put_nowait(job_id)
+        return await self.get(job_id)
+
+    def _with_live(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        # Running jobs report in-memory progress, fresher than the throttled DB snapshot
+        live = self._live.get(job["id"])
+        if live and job["status"] == "running":
+            job = {**job, "progress": live}
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Jobs] Unexpected error in job {job_id}: {e}")
+
+    async def _run_job(self, job_id: str):
+        if job_id in self._claimed:
+            return  # Queued twice (e.g. retried while a retry timer was pending)
+        self._claimed.add(job_id)
+        try:
+            job = await sqlite_service.get_ingest_job(job_id)
+            if not job or job["status"] != "queued":
+                return
+            # One run per file at a time: a follow-up job waits for the running one
+            async with self._file_locks.setdefault(job["filename"], asyncio.Lock()):
+                await self._execute(job_id)
+        finally:
+            self._claimed.discard(job_id)
+
+    async def _execute(self, job_id: str):
+        job = await sqlite_service.get_ingest_job(job_id)
+        if not job or job["status"] != "queued":
+            return  # Cancelled while waiting, or already picked up
+
+        from ingest import source_path, ingest_file
+        runner = self.runner or ingest_file
+        filename = job["filename"]
+        # Re-checked here: jobs persist across restarts and may predate validation
+        file_path = source_path(filename)
+        attempts = job["attempts"] + 1
+        await sqlite_service.update_ingest_job(
+            job_id, status="running", attempts=attempts, error=None, started_at=datetime.now().isoformat()
+        )
+
+        started = time.perf_counter()
+        last_write = 0.0
+        pending_write: Optional[asyncio.Task] = None
+
+        def on_progress(stats: Dict[str, Any]):
+            nonlocal last_write, pending_write
+            snapshot = summarize_progress(stats, time.perf_counter() - started)
+            self._live[job_id] = snapshot
+            if time.perf_counter() - last_write >= PROGRESS_WRITE_INTERVAL and (pending_write is None or pending_write.done()):
+                last_write = time.perf_counter()
+                pending_write = asyncio.create_task(sqlite_service.update_ingest_job(job_id, progress=snapshot))
+
+        async def finish(**fields):
+            if pending_write and not pending_write.done():
+                await pending_write  # Never let a stale snapshot land after the final one
+            self._live.pop(job_id, None)
+            await sqlite_service.update_ingest_job(job_id, **fields)
+
+        if file_path is None:
+            await finish(status="failed", error=f"'{filename}' is outside the knowledge source folder.", finished_at=datetime.now().isoformat())
+            return
+        if not os.path.exists(file_path):
+            await finish(status="failed", error=f"File '{filename}' not found on disk.", finished_at=datetime.now().isoformat())
+            return
+
+        task = asyncio.create_task(runner(file_path, self.db, filename=filename, progress=on_progress))
+        self._running[job_id] = task
+        try:
+            stats = await task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                # Kernel shutdown: resume this job on the next start
+                await finish(status="queued", progress=self._live.get(job_id))
+                raise
+            await finish(status="cancelled", progress=self._live.get(job_id), finished_at=datetime.now().isoformat())
+            await sqlite_service.add_log("warning", "KNOWLEDGE", f"Indexing job for {filename} cancelled")
+            return
+        except ExtractionError as e:
+            # Unsupported or corrupt file: retrying cannot help
+            await self._fail_or_retry(job_id, filename, attempts, attempts, str(e), finish)
+            return
+        except Exception as e:
+            await self._fail_or_retry(job_id, filename, attempts, job["max_attempts"], str(e), finish)
+            return
+        finally:
+            self._running.pop(job_id, None)
+
+        progress = summarize_progress(stats, time.perf_counter() - started)
+        if stats.get("failed"):
+            # Chunks that failed to embed are retried; the incremental index skips everything already stored
+            await self._fail_or_retry(job_id, filename, attempts, job["max_attempts"], f"{stats['failed']} chunk(s) failed to index", finish, progress)
+            return
+
+        await finish(status="completed", progress=progress, finished_at=datetime.now().isoformat())
+        await sqlite_service.add_log(
+            "success", "KNOWLEDGE",
+            f"Indexed source: {filename} ({stats['stored']} new chunks, {progress['chunks_per_sec']} chunks/sec)"
+        )
+        await self.requeue_orphans(stats.get("orphaned_sources"))
+
+    async def requeue_orphans(self, sources: Optional[List[str]]):
+        """Re-indexes sources whose near-duplicate links pointed at chunks that were just deleted."""
+        for source in sources or []:
+            await self.enqueue(source, follow_up=True)
+
+    async def _fail_or_retry(self, job_id, filename, attempts, max_attempts, error, finish, progress=None):
+        if attempts < max_attempts:
+            print(f"[Jobs] {filename} attempt {attempts}/{max_attempts} failed ({error}). Retrying in {self.retry_delay}s.")
+            await finish(status="queued", error=error, progress=progress)
+            loop = asyncio.get_running_loop()
+            self._timers = [t for t in self._timers if t.when() > loop.time()]
+            self._timers.append(loop.call_later(self.retry_delay, self.queue.put_nowait, job_id))
+            return
+        await finish(status="failed", error=error, progress=progress, finished_at=datetime.now().isoformat())
+        await sqlite_service.add_log("error", "KNOWLEDGE", f"Indexing job for {filename} failed: {error}")
+
+
+# Singleton instance
+ingest_jobs = IngestJobManager()
@@ -12,11 +12,22 @@ class SQLiteService:
         self.db_path = db_path or os.path.join(base_dir, "aether.db")
         self.schema_path = schema_path or os.path.join(base_dir, "schema.sql")
 
+    # Columns added after their table first shipped (CREATE TABLE IF NOT EXISTS won't add them)
+    COLUMN_MIGRATIONS = [
+        ("chunk_manifest", "duplicate_of", "TEXT"),
+    ]
+
     async def init_db(self):
         """Initializes the SQLite database with the schema."""
         async with aiosqlite.connect(self.db_path) as db:
             with open(self.schema_path, "r", encoding="utf-8") as f:
                 schema = f.read()
+            # Bring older tables up to date first, so indexes on new columns can be created
+            for table, column, declaration in self.COLUMN_MIGRATIONS:
+                async with db.execute(f"PRAGMA table_info({table})") as cursor:
+                    columns = {row[1] for row in await cursor.fetchall()}
+                if columns and column not in columns:
+                    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
             await db.executescript(schema)
             await db.commit()
 
@@ -226,5 +237,341 @@ class SQLiteService:
                             pass
                 return links
 
+    # --- KNOWLEDGE INDEX (CHUNK MANIFEST) ---
+
+    async def has_chunk_manifest(self, source: str) -> bool:
+        """True once any chunk of the source has been recorded."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT 1 FROM chunk_manifest WHERE source = ? LIMIT 1", (source,)) as cursor:
+                return await cursor.fetchone() is not None
+
+    async def get_chunk_manifest(self, source: str, chunk_hashes: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Returns the indexed chunks of a source keyed by chunk hash (optionally only the given hashes)."""
+        query = "SELECT chunk_hash, point_id, chunk_index, total_chunks, indexed_at, duplicate_of FROM chunk_manifest WHERE source = ?"
+        params: List[Any] = [source]
+        if chunk_hashes is not None:
+            if not chunk_hashes:
+                return {}
+            query += f" AND chunk_hash IN ({','.join('?' * len(chunk_hashes))})"
+            params.extend(chunk_hashes)
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(query, params) as cursor:
+                rows = await cursor.fetchall()
+                return {row["chunk_hash"]: dict(row) for row in rows}
+
+    async def upsert_chunk_manifest(self, source: str, entries: List[Dict[str, Any]], seen_at: Optional[str] = None):
+        """Records (or repositions) indexed chunks of a source."""
+        if not entries:
+            return
+        seen_at = seen_at or datetime.now().isoformat()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                """INSERT INTO chunk_manifest (source, chunk_hash, point_id, chunk_index, total_chunks, indexed_at, duplicate_of)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(source, chunk_hash) DO UPDATE SET
+                     point_id=excluded.point_id,
+                     chunk_index=excluded.chunk_index,
+                     total_chunks=excluded.total_chunks,
+                     indexed_at=excluded.indexed_at,
+                     duplicate_of=excluded.duplicate_of""",
+                [
+                    (source, e["chunk_hash"], e["point_id"], e["chunk_index"], e["total_chunks"], seen_at, e.get("duplicate_of"))
+                    for e in entries
+                ]
+            )
+            await db.commit()
+
+    async def touch_chunk_manifest(self, source: str, chunk_hashes: List[str], seen_at: str):
+        """Marks chunks as seen by the indexing run that started at `seen_at`."""
+        if not chunk_hashes:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "UPDATE chunk_manifest SET indexed_at = ? WHERE source = ? AND chunk_hash = ?",
+                [(seen_at, source, h) for h in chunk_hashes]
+            )
+            await db.commit()
+
+    async def get_stale_chunk_manifest(self, source: str, seen_before: str) -> Dict[str, Dict[str, Any]]:
+        """Chunks of a source not seen since `seen_before` (i.e. gone from the latest run)."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT chunk_hash, point_id, chunk_index, total_chunks, duplicate_of FROM chunk_manifest WHERE source = ? AND indexed_at < ?",
+                (source, seen_before)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return {row["chunk_hash"]: dict(row) for row in rows}
+
+    async def set_chunk_manifest_total(self, source: str, total_chunks: int):
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("UPDATE chunk_manifest SET total_chunks = ? WHERE source = ?", (total_chunks, source))
+            await db.commit()
+
+    async def remove_chunk_manifest(self, source: str, chunk_hashes: Optional[List[str]] = None):
+        """Forgets specific chunks of a source, or the whole source when no hashes are given."""
+        async with aiosqlite.connect(self.db_path) as db:
+            if chunk_hashes is None:
+                await db.execute("DELETE FROM chunk_manifest WHERE source = ?", (source,))
+            else:
+                await db.executemany(
+                    "DELETE FROM chunk_manifest WHERE source = ? AND chunk_hash = ?",
+                    [(source, h) for h in chunk_hashes]
+                )
+            await db.commit()
+
+    # --- NEAR-DUPLICATE FINGERPRINTS ---
+
+    async def add_fingerprints(self, source: str, fingerprints: List[tuple]):
+        """Stores (point_id, simhash) fingerprints of stored chunks."""
+        from neardup import to_signed
+        if not fingerprints:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO chunk_fingerprints (point_id, source, simhash) VALUES (?, ?, ?)",
+                [(point_id, source, to_signed(value)) for point_id, value in fingerprints]
+            )
+            await db.commit()
+
+    async def get_fingerprints(self, exclude_source: str) -> List[tuple]:
+        """(point_id, simhash) of every stored chunk outside `exclude_source`."""
+        from neardup import from_signed
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT point_id, simhash FROM chunk_fingerprints WHERE source != ?", (exclude_source,)) as cursor:
+                return [(row[0], from_signed(row[1])) for row in await cursor.fetchall()]
+
+    async def release_points(self, point_ids: Optional[List[str]] = None, source: Optional[str] = None) -> List[str]:
+        """
+        Forgets fingerprints of deleted points (given IDs, or all points of a source) and
+        unlinks chunks that were deduplicated against them. Returns the sources that lost
+        linked chunks and need re-indexing.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            if point_ids is None:
+                async with db.execute("SELECT point_id FROM chunk_fingerprints WHERE source = ?", (source,)) as cursor:
+                    point_ids = [row[0] for row in await cursor.fetchall()]
+            orphaned = set()
+            for start in range(0, len(point_ids), 500):
+                batch = point_ids[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                async with db.execute(f"SELECT DISTINCT source FROM chunk_manifest WHERE duplicate_of IN ({marks})", batch) as cursor:
+                    orphaned.update(row[0] for row in await cursor.fetchall())
+                await db.execute(f"DELETE FROM chunk_manifest WHERE duplicate_of IN ({marks})", batch)
+                await db.execute(f"DELETE FROM chunk_fingerprints WHERE point_id IN ({marks})", batch)
+            await db.commit()
+            orphaned.discard(source)
+            return sorted(orphaned)
+
+    async def get_dedup_stats(self) -> Dict[str, int]:
+        """Chunks linked to a near-duplicate instead of being embedded and stored."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT COUNT(*) FROM chunk_manifest WHERE duplicate_of IS NOT NULL") as cursor:
+                linked = (await cursor.fetchone())[0]
+            async with db.execute("SELECT COUNT(*) FROM chunk_fingerprints") as cursor:
+                fingerprints = (await cursor.fetchone())[0]
+        return {"linked_chunks": linked, "fingerprints": fingerprints}
+
+    # --- INGESTION JOBS ---
+
+    @staticmethod
+    def _job_from_row(row) -> Dict[str, Any]:
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        return job
+
+    async def create_ingest_job(self, filename: str, max_attempts: int = 3) -> Dict[str, Any]:
+        """Persists a queued ingestion job and returns it."""
+        job_id = str(uuid.uuid4())
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "INSERT INTO ingest_jobs (id, filename, max_attempts) VALUES (?, ?, ?)",
+                (job_id, filename, max_attempts)
+            )
+            await db.commit()
+        return await self.get_ingest_job(job_id)
+
+    async def get_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)) as cursor:
+                row = await cursor.fetchone()
+                return self._job_from_row(row) if row else None
+
+    async def get_active_ingest_job(self, filename: str, statuses=("queued", "running")) -> Optional[Dict[str, Any]]:
+        """Returns the queued or running job for a file, if any."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                f"SELECT * FROM ingest_jobs WHERE filename = ? AND status IN ({','.join('?' * len(statuses))}) ORDER BY created_at LIMIT 1",
+                (filename, *statuses)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return self._job_from_row(row) if row else None
+
+    async def list_ingest_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Lists jobs, newest first, optionally filtered by status."""
+        query = "SELECT * FROM ingest_jobs"
+        params: List[Any] = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(query, params) as cursor:
+                rows = await cursor.fetchall()
+                return [self._job_from_row(row) for row in rows]
+
+    async def update_ingest_job(self, job_id: str, **fields):
+        """Updates job columns (status, attempts, progress, error, started_at, finished_at)."""
+        if not fields:
+            return
+        if "progress" in fields and fields["progress"] is not None:
+            fields["progress"] = json.dumps(fields["progress"])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(f"UPDATE ingest_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            await db.commit()
+
+    async def requeue_interrupted_ingest_jobs(self) -> List[str]:
+        """Puts jobs left 'running' by a previous process back in the queue; returns all queued IDs in order."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("UPDATE ingest_jobs SET status = 'queued' WHERE status = 'running'")
+            await db.commit()
+            async with db.execute("SELECT id FROM ingest_jobs WHERE status = 'queued' ORDER BY created_at, rowid") as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+
+    # --- KNOWLEDGE WATCHER ---
+
+    async def get_watched_files(self) -> Dict[str, Dict[str, Any]]:
+        """Last known (mtime_ns, size) of each knowledge source file, keyed by filename."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT filename, mtime_ns, size FROM watched_files") as cursor:
+                rows = await cursor.fetchall()
+                return {row["filename"]: dict(row) for row in rows}
+
+    async def upsert_watched_file(self, filename: str, mtime_ns: int, size: int):
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """INSERT INTO watched_files (filename, mtime_ns, size) VALUES (?, ?, ?)
+                   ON CONFLICT(filename) DO UPDATE SET mtime_ns=excluded.mtime_ns, size=excluded.size, seen_at=CURRENT_TIMESTAMP""",
+                (filename, mtime_ns, size)
+            )
+            await db.commit()
+
+    async def remove_watched_file(self, filename: str):
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM watched_files WHERE filename = ?", (filename,))
+            await db.commit()
+
+    # --- BULK INGEST CHECKPOINT ---
+
+    async def get_ingest_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Files completed by the current bulk ingest run, keyed by filename."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT filename, mtime_ns, size, total_chunks FROM ingest_checkpoint") as cursor:
+                rows = await cursor.fetchall()
+                return {row["filename"]: dict(row) for row in rows}
+
+    async def mark_ingest_checkpoint(self, filename: str, mtime_ns: int, size: int, total_chunks: int):
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """INSERT INTO ingest_checkpoint (filename, mtime_ns, size, total_chunks) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(filename) DO UPDATE SET mtime_ns=excluded.mtime_ns, size=excluded.size,
+                   total_chunks=excluded.total_chunks, completed_at=CURRENT_TIMESTAMP""",
+                (filename, mtime_ns, size, total_chunks)
+            )
+            await db.commit()
+
+    async def clear_ingest_checkpoint(self):
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM ingest_checkpoint")
+            await db.commit()
+
+    # --- DOCUMENT CATALOG ---
+
+    async def list_document_catalog(self) -> List[Dict[str, Any]]:
+        """Every known knowledge source with its index state, ordered by filename."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM document_catalog ORDER BY filename") as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_document_entry(self, filename: str) -> Optional[Dict[str, Any]]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM document_catalog WHERE filename = ?", (filename,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
+    async def update_document_entry(self, filename: str, **fields):
+        """Creates or updates a catalog row (size, mtime_ns, content_hash, total_chunks, embedding_model, state, error, indexed_at)."""
+        columns = ", ".join(["filename", *fields])
+        placeholders = ", ".join("?" * (len(fields) + 1))
+        assignments = "".join(f"{column}=excluded.{column}, " for column in fields)
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                f"""INSERT INTO document_catalog ({columns}) VALUES ({placeholders})
+                    ON CONFLICT(filename) DO UPDATE SET {assignments}updated_at=CURRENT_TIMESTAMP""",
+                (filename, *fields.values())
+            )
+            await db.commit()
+
+    async def forget_document(self, filename: str):
+        """Drops a source's catalog row and chunk manifest in one transaction."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM chunk_manifest WHERE source = ?", (filename,))
+            await db.execute("DELETE FROM document_catalog WHERE filename = ?", (filename,))
+            await db.commit()
+
+    async def sync_document_catalog(self, files: Dict[str, tuple], interrupted: bool = False):
+        """
+        Reconciles the catalog with a listing of the source folder (filename -> (size, mtime_ns)).
+        New files are registered as on_disk, rows of never-indexed files that are gone are dropped,
+        indexed files that are gone are marked 'missing' (their vectors stay until the source is
+        deleted) and sources indexed before the catalog existed are backfilled from the chunk manifest.
+        With `interrupted`, rows left in 'indexing' by a crashed run are marked failed first.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            if interrupted:
+                await db.execute(
+                    """UPDATE document_catalog SET state = 'failed', error = 'Indexing was interrupted by a shutdown',
+                       updated_at = CURRENT_TIMESTAMP WHERE state = 'indexing'"""
+                )
+            await db.executemany(
+                """INSERT INTO document_catalog (filename, size, mtime_ns) VALUES (?, ?, ?)
+                   ON CONFLICT(filename) DO UPDATE SET size=excluded.size, mtime_ns=excluded.mtime_ns""",
+                [(name, size, mtime_ns) for name, (size, mtime_ns) in files.items()]
+            )
+            await db.execute("CREATE TEMP TABLE disk_files (filename TEXT PRIMARY KEY)")
+            await db.executemany("INSERT INTO disk_files VALUES (?)", [(name,) for name in files])
+            await db.execute(
+                "DELETE FROM document_catalog WHERE indexed_at IS NULL AND filename NOT IN (SELECT filename FROM disk_files)"
+            )
+            await db.execute(
+                """UPDATE document_catalog SET state = 'missing', error = 'Source file is no longer on disk',
+                   updated_at = CURRENT_TIMESTAMP
+                   WHERE indexed_at IS NOT NULL AND state NOT IN ('missing', 'indexing')
+                     AND filename NOT IN (SELECT filename FROM disk_files)"""
+            )
+            await db.execute(
+                """UPDATE document_catalog SET state = 'indexed', error = NULL, updated_at = CURRENT_TIMESTAMP
+                   WHERE state = 'missing' AND filename IN (SELECT filename FROM disk_files)"""
+            )
+            await db.execute(
+                """UPDATE document_catalog SET
+                     state = 'indexed',
+                     total_chunks = (SELECT MAX(total_chunks) FROM chunk_manifest WHERE source = document_catalog.filename),
+                     indexed_at = (SELECT MAX(indexed_at) FROM chunk_manifest WHERE source = document_catalog.filename)
+                   WHERE indexed_at IS NULL AND state = 'on_disk'
+                     AND EXISTS (SELECT 1 FROM chunk_manifest WHERE source = document_catalog.filename)"""
+            )
+            await db.commit()
+
 # Singleton instance
 sqlite_service = SQLiteService()
@@ -1,18 +1,44 @@
 from fastapi import FastAPI, UploadFile, File
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from agent import aether_agent, db_service, pending_actions
+from memory import memory_manager
 import asyncio
+import json
 import os
-from ingest import process_content
+import time
 from local_db import sqlite_service
+from jobs import ingest_jobs
+from watcher import knowledge_watcher
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     await sqlite_service.init_db()
+    # Warm-up: open Qdrant, check collections, page in each index and build the embedding
+    # provider concurrently, so the first chat doesn't pay for them. Best-effort: a phase that
+    # fails is logged and retried on first use; only an embedding model mismatch stops startup
+    started = time.perf_counter()
+    timings = {}
+    for phase in await asyncio.gather(db_service.warm_up(), memory_manager.warm_up()):
+        timings.update(phase)
+    timings["warm_up_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    app.state.warm_up = timings
+    summary = ", ".join(f"{name}={ms:.0f}ms" for name, ms in timings.items())
+    print(f"[CORE] Warm-up complete: {summary}")
+    await sqlite_service.add_log("info", "CORE", f"Warm-up complete: {summary}")
+    # Register files added to the source folder while the kernel was down
+    from ingest import sync_catalog
+    await sync_catalog(startup=True)
     await sqlite_service.add_log("success", "CORE", "Aether Kernel initialized. Core services operational.")
     
+    # Background ingestion workers (resumes jobs interrupted by the last shutdown)
+    await ingest_jobs.start(db_service)
+    # Optional auto-indexing of the knowledge source folder (KNOWLEDGE_WATCHER=1)
+    if knowledge_watcher.enabled:
+        await knowledge_watcher.start(db_service)
+    
     # Start Telegram Bridge in background
     from telegram_bridge import run_telegram_bot
     asyncio.create_task(run_telegram_bot())
@@ -20,14 +46,21 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown logic
+    await knowledge_watcher.stop()
+    await ingest_jobs.stop()
+    from extractors import shutdown_pool
+    shutdown_pool()
     from telegram_bridge import stop_telegram_bot
     await stop_telegram_bot()
+    await db_service.close()
     print("[CORE] Aether Kernel shut down.")
 
 app = FastAPI(title="Aether API", version="1.0.0", lifespan=lifespan)
 
 from typing import Optional, List, Any
 
+MAX_PAGE_SIZE = 1000  # Largest page a client may request from paginated listings
+
 class ChatRequest(BaseModel):
     message: str
     model: Optional[str] = "gemini"
@@ -38,6 +71,19 @@ class ActionApproval(BaseModel):
     action_id: str
     approved: bool
 
+class MemoryImportItem(BaseModel):
+    content: str
+    metadata: Optional[dict] = None
+    id: Optional[str] = None
+
+class MemoryImportRequest(BaseModel):
+    memories: List[MemoryImportItem]
+    wait: bool = True
+
+class IngestJobRequest(BaseModel):
+    filename: str
+    max_attempts: Optional[int] = None
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -58,7 +104,7 @@ async def ping():
 @app.get("/stats")
 async def get_stats():
     """Returns database statistics for the dashboard."""
-    stats = db_service.get_stats()
+    stats = await db_service.get_stats()
     
     # Calculate reliability from logs
     logs = await sqlite_service.get_logs(limit=100)
@@ -73,6 +119,17 @@ async def get_stats():
     # Add session count
     sessions = await sqlite_service.get_sessions()
     stats["sessions_count"] = len(sessions)
+
+    # Embedding cache effectiveness
+    if memory_manager.cache:
+        stats["embedding_cache"] = memory_manager.cache.stats()
+    if db_service.search_cache:
+        stats["search_cache"] = db_service.search_cache.stats()
+
+    # Work saved by linking near-duplicate chunks instead of embedding them
+    dedup = await sqlite_service.get_dedup_stats()
+    dedup["vector_bytes_saved"] = dedup["linked_chunks"] * db_service.vector_size * 4
+    stats["deduplication"] = dedup
     
     return {
         "status": "success",
@@ -124,45 +181,64 @@ async def update_configuration(new_conf: ConfigUpdate):
         return {"status": "error", "message": str(e)}
 
 @app.post("/ingest")
-async def ingest_file(file: UploadFile = File(...)):
+async def ingest_file(file: UploadFile = File(...), index: bool = False):
     """
     Endpoint to ingest a file (PDF, TXT, MD) into the knowledge base.
+    With ?index=true the file is also queued for background indexing.
     """
-    from ingest import SOURCE_DIR
+    from ingest import SOURCE_DIR, STREAM_BLOCK_SIZE, source_path
     try:
         # Ensure directory exists
         os.makedirs(SOURCE_DIR, exist_ok=True)
         
-        content = await file.read()
-        file_path = os.path.join(SOURCE_DIR, file.filename)
+        # Uploads land at the top of the source folder
+        filename = os.path.basename(file.filename or "")
+        file_path = source_path(filename)
+        if file_path is None:
+            return {"status": "error", "message": "Invalid file name."}
         
-        # Save to disk
+        # Save to disk block by block instead of buffering the whole upload
         with open(file_path, "wb") as f:
-            f.write(content)
+            while block := await file.read(STREAM_BLOCK_SIZE):
+                f.write(block)
             
         # Return early after just saving
-        await sqlite_service.add_log("info", "KNOWLEDGE", f"Saved new source file to disk: {file.filename}")
-        return {"status": "success", "message": f"File '{file.filename}' uploaded successfully. Ready for manual indexing."}
+        info = os.stat(file_path)
+        await sqlite_service.update_document_entry(filename, size=info.st_size, mtime_ns=info.st_mtime_ns)
+        await sqlite_service.add_log("info", "KNOWLEDGE", f"Saved new source file to disk: {filename}")
+        if index:
+            job = await ingest_jobs.enqueue(filename)
+            return {"status": "success", "message": f"File '{filename}' uploaded successfully. Indexing in background.", "job": job}
+        return {"status": "success", "message": f"File '{filename}' uploaded successfully. Ready for manual indexing."}
             
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-@app.delete("/knowledge/{filename}")
+@app.delete("/knowledge/{filename:path}")
 async def delete_document(filename: str):
     """
     Deletes a document from the knowledge base by filename (DB + Disk).
+    Filenames are relative to the source folder and may include subfolders.
     """
-    from ingest import SOURCE_DIR
+    from ingest import source_path, forget_source
     try:
-        # 1. Delete from DB
-        db_success = db_service.delete_document(filename)
+        file_path = source_path(filename)
+        if file_path is None:
+            return {"status": "error", "message": f"'{filename}' is outside the knowledge source folder."}
+        # A queued or running job would re-insert the chunks after the delete
+        await ingest_jobs.cancel_file(filename)
+        # 1. Delete from DB (and forget its indexed chunks)
+        forgotten = await forget_source(filename, db_service)
+        db_success = forgotten["deleted"]
+        # Sources deduplicated against this one must embed their own copies again
+        await ingest_jobs.requeue_orphans(forgotten["orphaned_sources"])
         
         # 2. Delete from Disk
-        file_path = os.path.join(SOURCE_DIR, filename)
         disk_success = False
         if os.path.exists(file_path):
             os.remove(file_path)
             disk_success = True
+            await sqlite_service.forget_document(filename)
             
         if db_success or disk_success:
             await sqlite_service.add_log("warning", "KNOWLEDGE", f"Deleted source: {filename}")
@@ -172,54 +248,112 @@ async def delete_document(filename: str):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-@app.post("/knowledge/index/{filename}")
-async def index_existing_file(filename: str):
-    """
-    Indexes a file that already exists on disk into the vector database.
-    """
-    from ingest import SOURCE_DIR
+async def queue_index_job(filename: str, max_attempts: Optional[int] = None):
+    from ingest import source_path
     try:
-        file_path = os.path.join(SOURCE_DIR, filename)
+        file_path = source_path(filename)
+        if file_path is None:
+            return {"status": "error", "message": f"'{filename}' is outside the knowledge source folder."}
         if not os.path.exists(file_path):
             return {"status": "error", "message": f"File '{filename}' not found on disk."}
-            
-        with open(file_path, "r", encoding="utf-8") as f:
-            text_content = f.read()
-            
-        success = await process_content(text_content, filename, db_service)
-        
-        if success:
-            await sqlite_service.add_log("success", "KNOWLEDGE", f"Manually indexed existing source: {filename}")
-            return {"status": "success", "message": f"File '{filename}' indexed successfully."}
-        else:
-            return {"status": "error", "message": "Failed to index content."}
+
+        job = await ingest_jobs.enqueue(filename, max_attempts=max_attempts)
+        return {"status": "success", "message": f"Indexing of '{filename}' queued.", "job": job}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-@app.get("/knowledge/content/{filename}")
+@app.post("/knowledge/index/{filename:path}")
+async def index_existing_file(filename: str):
+    """
+    Queues a file that already exists on disk for background indexing.
+    Returns immediately; poll /knowledge/jobs/{job_id} for progress.
+    """
+    return await queue_index_job(filename)
+
+@app.post("/knowledge/jobs")
+async def create_ingest_job(request: IngestJobRequest):
+    """Queues a knowledge source file for background indexing."""
+    return await queue_index_job(request.filename, request.max_attempts)
+
+@app.get("/knowledge/jobs")
+async def list_ingest_jobs(status: Optional[str] = None, limit: int = 50):
+    """Lists indexing jobs, newest first (optionally filtered by status)."""
+    return {"status": "success", "jobs": await ingest_jobs.list(status, limit)}
+
+@app.get("/knowledge/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """Polls a job: status, attempts, error and progress (chunks done/total, chunks/sec, ETA)."""
+    job = await ingest_jobs.get(job_id)
+    if not job:
+        return {"status": "error", "message": f"Job '{job_id}' not found."}
+    return {"status": "success", "job": job}
+
+@app.post("/knowledge/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str):
+    """Cancels a queued or running job. Chunks stored so far stay indexed."""
+    job = await ingest_jobs.cancel(job_id)
+    if not job:
+        return {"status": "error", "message": f"Job '{job_id}' not found."}
+    return {"status": "success", "job": job}
+
+@app.post("/knowledge/jobs/{job_id}/retry")
+async def retry_ingest_job(job_id: str):
+    """Re-queues a failed or cancelled job."""
+    job = await ingest_jobs.retry(job_id)
+    if not job:
+        return {"status": "error", "message": f"Job '{job_id}' not found."}
+    return {"status": "success", "job": job}
+
+@app.get("/knowledge/content/{filename:path}")
 async def get_document_content(filename: str):
     """
     Retrieves the raw text content of a document from the disk.
     """
-    from ingest import SOURCE_DIR
+    from ingest import source_path
+    from extractors import extracted_text_path
     try:
-        file_path = os.path.join(SOURCE_DIR, filename)
+        file_path = source_path(filename)
+        if file_path is None:
+            return {"status": "error", "message": f"'{filename}' is outside the knowledge source folder."}
         if not os.path.exists(file_path):
             return {"status": "error", "message": f"File '{filename}' not found on disk."}
             
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        # PDF, DOCX, HTML, ... are shown as their extracted text
+        async with extracted_text_path(file_path) as text_path:
+            with open(text_path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
             
         return {"status": "success", "content": content}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.get("/memories")
-async def list_memories():
-    """Returns a list of all memories."""
+async def list_memories(cursor: Optional[str] = None, limit: int = 100, format: str = "json"):
+    """
+    Returns memories one page at a time: pass `next_cursor` back as `cursor` for the next page.
+    With `format=ndjson`, streams every memory instead, one JSON object per line.
+    """
+    if format == "ndjson":
+        async def stream():
+            try:
+                async for memory in db_service.iter_memories():
+                    yield json.dumps(memory) + "\n"
+            except Exception as e:
+                yield json.dumps({"status": "error", "message": str(e)}) + "\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    try:
+        page = await db_service.list_memories_page(min(max(limit, 1), MAX_PAGE_SIZE), cursor)
+        return {"status": "success", **page}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.post("/memories/import")
+async def import_memories(request: MemoryImportRequest):
+    """Bulk-imports memories with batched embedding and upserts. Returns a status per memory."""
     try:
-        memories = db_service.list_memories()
-        return {"status": "success", "memories": memories}
+        result = await memory_manager.add_memories(db_service, [m.model_dump() for m in request.memories], wait=request.wait)
+        await sqlite_service.add_log("info", "MEM", f"Imported {result['count']}/{len(request.memories)} memories")
+        return result
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -227,7 +361,7 @@ async def list_memories():
 async def delete_memory(memory_id: str):
     """Deletes a memory by its ID."""
     try:
-        if db_service.delete_memory(memory_id):
+        if await db_service.delete_memory(memory_id):
             return {"status": "success", "message": f"Memory deleted."}
         else:
             return {"status": "error", "message": "Failed to delete memory."}
@@ -235,34 +369,33 @@ async def delete_memory(memory_id: str):
         return {"status": "error", "message": str(e)}
 
 @app.get("/knowledge")
-async def list_knowledge():
+async def list_knowledge(rescan: bool = False):
     """
-    Returns a list of all documents, combining disk files and vector index status.
+    Returns all knowledge sources with their index status from the document catalog.
+    The source folder is listed first (off the event loop) and the catalog re-synced when it
+    differs, so files copied in by hand show up before the watcher gets to them.
+    ?rescan=true re-syncs unconditionally.
     """
-    from ingest import SOURCE_DIR
+    from ingest import sync_catalog
     try:
-        # 1. Get indexed docs from Vector DB
-        indexed_docs = {doc["filename"]: doc for doc in db_service.list_documents()}
-        
-        # 2. Scan physical folder
-        disk_files = []
-        if os.path.exists(SOURCE_DIR):
-            for filename in os.listdir(SOURCE_DIR):
-                if filename.startswith('.'): continue
-                
-                path = os.path.join(SOURCE_DIR, filename)
-                if os.path.isfile(path):
-                    stats = os.stat(path)
-                    
-                    is_indexed = filename in indexed_docs
-                    disk_files.append({
-                        "filename": filename,
-                        "status": "indexed" if is_indexed else "on_disk",
-                        "size": f"{round(stats.st_size / 1024, 1)} KB",
-                        "metadata": indexed_docs.get(filename, {}).get("metadata", {})
-                    })
-        
-        return {"status": "success", "documents": disk_files}
+        await sync_catalog(if_stale=not rescan)
+        documents = []
+        for entry in await sqlite_service.list_document_catalog():
+            indexed = entry["indexed_at"] is not None
+            documents.append({
+                "filename": entry["filename"],
+                "status": "indexed" if indexed else "on_disk",
+                "state": entry["state"],
+                "size": f"{round(entry['size'] / 1024, 1)} KB",
+                "metadata": {
+                    "total_chunks": entry["total_chunks"],
+                    "embedding_model": entry["embedding_model"],
+                    "content_hash": entry["content_hash"],
+                    "indexed_at": entry["indexed_at"],
+                    "error": entry["error"],
+                } if indexed else {}
+            })
+        return {"status": "success", "documents": documents}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -304,7 +437,7 @@ async def get_recent_activity():
         activities = []
         
         # 1. Fetch memories
-        memories = db_service.list_memories()
+        memories = await db_service.recent_memories(limit=8)
         for mem in memories:
             timestamp = mem.get("timestamp")
             if not timestamp:
@@ -500,7 +633,8 @@ async def chat(request: ChatRequest):
             "user_prompt": request.message,
             "deps": {
                 "user_message": request.message,
-                "search_count": 0
+                "search_count": 0,
+                "embeddings": {}  # Per-run embedding memo shared by context injection and tools
             },
         }
         if history:
@@ -1,55 +1,231 @@
 """
 This module handles memory operations:
-1. Converting text to vector embeddings using Google Generative AI.
-2. Interfacing with DatabaseService to store/retrieve memories.
+1. Converting text to vector embeddings via the configured EmbeddingProvider
+   (Google Generative AI by default, or the offline local provider).
+2. Interfacing with the (async) DatabaseService to store/retrieve memories.
 """
 import os
+import time
 import asyncio
-from typing import List, Optional
-from google import genai
-from google.genai import types
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache, normalize_text
+from embedding_providers import EmbeddingProvider, get_embedding_provider
 
 # Load env variables if not already loaded
 load_dotenv()
 
+class EmbeddingBatcher:
+    """
+    Micro-batcher for single-text embedding requests.
+    Concurrent callers (chat, tools, ingest) are collected for a few milliseconds
+    and sent as one batch; each caller gets its own vector back through a future.
+    """
+    def __init__(self, embed_batch, max_batch_size: int = 100, max_wait_ms: float = 5.0):
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        # Counters for observability
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, text: str) -> List[float]:
+        """Queues a text for the next batch and waits for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]):
+        try:
+            vectors = await self._embed_batch([text for text, _ in batch])
+        except Exception as e:
+            print(f"[EmbeddingBatcher] Batch of {len(batch)} failed: {e}")
+            vectors = [[] for _ in batch]
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
 class MemoryManager:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        
-        self.client = genai.Client(api_key=api_key)
-        # Using the standard embedding model
-        # Available model found: models/gemini-embedding-001
-        self.embedding_model = "models/gemini-embedding-001"
+    def __init__(self, provider: EmbeddingProvider = None):
+        # Selected via EMBEDDING_PROVIDER (auto/gemini/local); built on first use, since the
+        # Gemini SDK import alone dominates cold start
+        self._provider: Optional[EmbeddingProvider] = provider
+
+        # Content-addressed cache in front of the embedding API (EMBEDDING_CACHE=0 disables it)
+        cache_enabled = os.getenv("EMBEDDING_CACHE", "1").lower() not in ("0", "false", "no")
+        self.cache = EmbeddingCache() if cache_enabled else None
+
+        # Gemini accepts up to 100 contents per embed_content request
+        self.batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+        # The batcher only sees texts get_embedding already missed in the cache
+        self.batcher = EmbeddingBatcher(
+            self._embed_and_store,
+            max_batch_size=self.batch_size,
+            max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+        )
+
+        # Bounds on in-flight embedding requests so ingest can't starve chat
+        self.max_concurrency = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+        self.timeout = float(os.getenv("EMBEDDING_TIMEOUT", "30"))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+    @property
+    def provider(self) -> EmbeddingProvider:
+        if self._provider is None:
+            self._provider = get_embedding_provider()
+        return self._provider
+
+    @provider.setter
+    def provider(self, provider: EmbeddingProvider):
+        self._provider = provider
+
+    async def warm_up(self) -> Dict[str, float]:
+        """Builds the embedding provider off the event loop. Returns its duration in milliseconds ({} on failure)."""
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(lambda: self.provider)
+        except Exception as e:
+            # Best-effort: the error resurfaces on the first embedding call
+            print(f"[Memory] Embedding provider warm-up skipped: {e}")
+            return {}
+        return {"embeddings_init_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    @property
+    def embedding_model(self) -> str:
+        return self.provider.model
+
+    @property
+    def output_dimensionality(self) -> int:
+        return self.provider.dimensions
 
     async def get_embedding(self, text: str) -> List[float]:
         """
-        Generates a vector embedding for the given text using Gemini API.
+        Generates a vector embedding for the given text using the configured provider.
+        Cached vectors are returned immediately; misses are coalesced with other
+        concurrent requests by the micro-batcher.
         """
+        if self.cache:
+            # LRU hits are served inline; the SQLite lookup runs off the event loop
+            cached = self.cache.get_from_memory(self.embedding_model, self.output_dimensionality, text)
+            if cached is None:
+                cached = await asyncio.to_thread(self.cache.get, self.embedding_model, self.output_dimensionality, text)
+            if cached is not None:
+                return cached
+
+        return await self.batcher.submit(text)
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for many texts, sending up to `batch_size` contents per API call.
+        Returns one vector per input (an empty list where embedding failed).
+        """
+        results: List[List[float]] = [[] for _ in texts]
+        if not texts:
+            return results
+
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get_many, self.embedding_model, self.output_dimensionality, texts)
+        else:
+            cached = [None] * len(texts)
+
+        missing = []
+        for i, (text, vector) in enumerate(zip(texts, cached)):
+            if vector is not None:
+                results[i] = vector
+            else:
+                missing.append(i)
+
+        vectors = await self._embed_and_store([texts[i] for i in missing])
+        for i, vector in zip(missing, vectors):
+            results[i] = vector
+        return results
+
+    async def _embed_and_store(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds texts that missed the cache (without looking them up again, which would count
+        a second miss) and caches the vectors. Identical texts are only embedded once.
+        """
+        unique = list(dict.fromkeys(texts))
+        vectors: Dict[str, List[float]] = {}
+        for start in range(0, len(unique), self.batch_size):
+            batch = unique[start:start + self.batch_size]
+            embedded = await self._embed_batch(batch)
+            if self.cache:
+                # SQLite write, commit and eviction stay off the event loop
+                await asyncio.to_thread(self.cache.put_many, self.embedding_model, self.output_dimensionality, batch, embedded)
+            vectors.update(zip(batch, embedded))
+        return [vectors[text] for text in texts]
+
+    async def embed_query(self, text: str, memo: Optional[dict] = None) -> List[float]:
+        """
+        Embeds a query, reusing vectors from a per-run memo (e.g. the agent `deps`).
+        Everything in one chat turn that embeds the same text (up to whitespace and unicode
+        form, as in the embedding cache) shares a single vector. Case is significant:
+        identifiers and acronyms embed differently.
+        """
+        if memo is None:
+            return await self.get_embedding(text)
+
+        key = normalize_text(text)
+        vector = memo.get(key)
+        if vector:
+            return vector
+
+        vector = await self.get_embedding(text)
+        if vector:
+            memo[key] = vector
+        return vector
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the loop that first waits on them, so recreate per loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Sends a single provider request for a batch of texts."""
         try:
-            # The new genai SDK uses models.embed_content
-            # We run it in an executor because the sync client is blocking, 
-            # and we want to keep the async loop happy if we call this from async code.
-            # However, google.genai has an async client too, but let's stick to safe usage.
-            
-            # Using the simplified method driven by Google's latest SDK docs
-            result = self.client.models.embed_content(
-                model=self.embedding_model,
-                contents=text
-            )
-            
-            # Extract embedding from response
-            # The structure is EmbedContentResponse(embeddings=[ContentEmbedding(values=[...])])
-            if result.embeddings:
-                return result.embeddings[0].values
-            return []
+            # Providers are async (Gemini uses client.aio, local runs in a worker thread),
+            # so the event loop keeps serving other requests while a batch is in flight.
+            async with self._get_semaphore():
+                return await asyncio.wait_for(self.provider.embed(texts), timeout=self.timeout)
             
+        except asyncio.TimeoutError:
+            print(f"[MemoryManager] Embedding request timed out after {self.timeout}s ({len(texts)} texts).")
+            return [[] for _ in texts]
         except Exception as e:
             print(f"Error generating embedding with {self.embedding_model}: {e}")
-            return []
+            return [[] for _ in texts]
 
     async def add_memory(self, db_service, content: str, metadata: dict = None):
         """
@@ -64,33 +240,46 @@ class MemoryManager:
             print("[MemoryManager] Failed to generate embedding.")
             return None
 
-        # Call the database service to insert asynchronously
-        # Since db_service methods are synchronous (ChromaDB), we run them in a thread.
-        result = await asyncio.to_thread(
-            db_service.add_memory,
+        result = await db_service.add_memory(
             content=content,
             embedding=embedding,
             metadata=metadata or {}
         )
         return result
 
-    async def search_relevant_memories(self, db_service, query: str, limit: int = 5, similarity_threshold: float = 0.5):
+    async def add_memories(self, db_service, memories: List[Dict[str, Any]], wait: bool = True) -> Dict[str, Any]:
+        """
+        Bulk version of add_memory for imports and consolidation: embeds the contents in
+        batched API calls and stores them with batched upserts.
+        Each item is {"content", optional "metadata", optional "id"}; the result carries a
+        status per memory, in input order (see AsyncDatabaseService.add_memories).
+        """
+        embeddings = await self.get_embeddings([m["content"] for m in memories])
+        items = [
+            {"id": m.get("id"), "content": m["content"], "embedding": embedding, "metadata": m.get("metadata") or {}}
+            for m, embedding in zip(memories, embeddings)
+        ]
+        return await db_service.add_memories(items, wait=wait)
+
+    async def search_relevant_memories(self, db_service, query: str, limit: int = 5, similarity_threshold: float = 0.5, memo: Optional[dict] = None, filters: Optional[dict] = None, fields: Optional[List[str]] = None):
         """
-        1. Embed the search query.
-        2. Call DatabaseService to find similar vectors.
+        1. Embed the search query (reusing `memo` vectors when given).
+        2. Call DatabaseService for a hybrid (dense + lexical) search, pre-filtered by payload
+           `filters` if any; `fields` limits the metadata returned (None = all).
         """
         print(f"[MemoryManager] Embedding query: '{query}'")
-        query_embedding = await self.get_embedding(query)
+        query_embedding = await self.embed_query(query, memo)
         
         if not query_embedding:
             return []
 
-        # Search in DB (ThreadPoolExecutor)
-        results = await asyncio.to_thread(
-            db_service.search_memories,
+        results = await db_service.search_memories(
             query_embedding=query_embedding,
             match_threshold=similarity_threshold,
-            match_count=limit
+            match_count=limit,
+            filters=filters,
+            fields=fields,
+            query_text=query
         )
         return results
 
@@ -44,3 +44,72 @@ CREATE TABLE IF NOT EXISTS concept_links (
     FOREIGN KEY (target_id) REFERENCES concepts (id) ON DELETE CASCADE,
     UNIQUE(source_id, target_id, relation)
 );
+
+-- Incremental indexing: which chunks of each knowledge source are in the vector store
+CREATE TABLE IF NOT EXISTS chunk_manifest (
+    source TEXT NOT NULL,
+    chunk_hash TEXT NOT NULL, -- sha256 of the chunk text
+    point_id TEXT NOT NULL, -- deterministic Qdrant point ID (uuid5 of source + hash)
+    chunk_index INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL,
+    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- start of the last indexing run that saw the chunk
+    duplicate_of TEXT, -- point ID of the near-duplicate chunk this one is linked to (not embedded or stored itself)
+    PRIMARY KEY (source, chunk_hash)
+);
+
+-- Background ingestion jobs (see jobs.py)
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued', -- queued, running, completed, failed, cancelled
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    progress TEXT, -- JSON snapshot: chunks done/total, throughput, ETA
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs (status, created_at);
+
+-- Knowledge watcher: last seen state of each source file (see watcher.py)
+CREATE TABLE IF NOT EXISTS watched_files (
+    filename TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Near-duplicate detection: SimHash of every stored chunk (see neardup.py)
+CREATE TABLE IF NOT EXISTS chunk_fingerprints (
+    point_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    simhash INTEGER NOT NULL -- 64-bit, stored signed
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_source ON chunk_fingerprints (source);
+CREATE INDEX IF NOT EXISTS idx_manifest_duplicate_of ON chunk_manifest (duplicate_of);
+
+-- Bulk ingest CLI checkpoint: files fully indexed by the current run (see ingest.py --resume).
+-- Chunk-level progress of a file interrupted mid-way is already kept by chunk_manifest.
+CREATE TABLE IF NOT EXISTS ingest_checkpoint (
+    filename TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL DEFAULT 0,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Document catalog: one row per knowledge source with its file and index state.
+-- Maintained by ingest.py and forget_source, so GET /knowledge never scans Qdrant or the disk.
+CREATE TABLE IF NOT EXISTS document_catalog (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT, -- sha256 of the text as last indexed (the file's bytes for text formats, the extracted text otherwise)
+    total_chunks INTEGER NOT NULL DEFAULT 0,
+    embedding_model TEXT,
+    state TEXT NOT NULL DEFAULT 'on_disk', -- on_disk, indexing, indexed, failed, cancelled, missing
+    error TEXT,
+    indexed_at TIMESTAMP, -- last run that stored vectors (NULL = never indexed)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,144 @@
+"""
+In-process cache of vector search results.
+The dashboard, Telegram and the agent's recall tools repeat the same searches over a corpus
+that changes rarely. Entries are keyed by (collection, quantized query vector, limit,
+threshold, filter, projection, query text) and bounded by a TTL and an LRU size.
+Every collection has a generation counter that the vector store bumps after each write.
+Entries from an older generation are never served, and results computed while a write was
+in flight are never stored. Writes acknowledged before they are applied (wait=False) hold
+the collection: nothing is stored for it until they are released.
+"""
+import os
+import copy
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SearchCache:
+    def __init__(self, max_entries: int = None, ttl: float = None, decimals: int = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEARCH_CACHE_TTL", "300"))
+        # Query vectors are rounded before hashing so float noise from re-embedding still hits
+        self.decimals = decimals if decimals is not None else int(os.getenv("SEARCH_CACHE_DECIMALS", "4"))
+
+        # key -> (generation, expires_at, results)
+        self._entries: "OrderedDict[Tuple, Tuple[int, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._holds: Dict[str, int] = {}  # collection -> writes acknowledged but not yet known applied
+        self._lock = threading.Lock()
+
+        # Counters exposed through /stats
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def vector_digest(self, vector: List[float]) -> str:
+        quantized = np.round(np.asarray(vector, dtype=np.float32), self.decimals) + 0.0  # + 0.0 folds -0.0 into 0.0
+        return hashlib.blake2b(quantized.tobytes(), digest_size=16).hexdigest()
+
+    def make_key(self, collection_name: str, query_embedding: List[float], **params) -> Tuple:
+        """Builds the key for a search; `params` are the remaining search arguments (filters, limits, ...)."""
+        return (collection_name, self.vector_digest(query_embedding), json.dumps(params, sort_keys=True, default=str))
+
+    def generation(self, collection_name: str) -> int:
+        return self._generations.get(collection_name, 0)
+
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Returns a copy of the cached results, or None on a miss."""
+        collection_name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, results = entry
+                if generation != self.generation(collection_name):
+                    self.stale += 1
+                    entry = None
+                elif expires_at < time.monotonic():
+                    self.expired += 1
+                    entry = None
+                if entry is None:
+                    del self._entries[key]
+            if entry is None:
+                self.misses[collection_name] = self.misses.get(collection_name, 0) + 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[collection_name] = self.hits.get(collection_name, 0) + 1
+        # Callers own their results: cached hits must not be mutated through them
+        return copy.deepcopy(results)
+
+    def put(self, key: Tuple, results: List[Dict[str, Any]], generation: int):
+        """Stores results computed at `generation` (read before the search); dropped if a write happened since."""
+        with self._lock:
+            if generation != self.generation(key[0]) or self._holds.get(key[0]):
+                return
+            self._entries[key] = (generation, time.monotonic() + self.ttl, copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, collection_name: str):
+        """Bumps the collection's generation: every cached result for it becomes unreachable."""
+        with self._lock:
+            self._generations[collection_name] = self.generation(collection_name) + 1
+
+    def hold(self, collection_name: str):
+        """Stops storing results for the collection until a matching release()."""
+        with self._lock:
+            self._holds[collection_name] = self._holds.get(collection_name, 0) + 1
+
+    def release(self, collection_name: str):
+        """Ends a hold once its writes are applied; results read during it become unreachable."""
+        with self._lock:
+            holds = self._holds.get(collection_name, 0) - 1
+            if holds > 0:
+                self._holds[collection_name] = holds
+            else:
+                self._holds.pop(collection_name, None)
+            self._generations[collection_name] = self.generation(collection_name) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters (overall and per collection) and the current size."""
+        def ratio(hits: int, misses: int) -> float:
+            return round(hits / (hits + misses), 3) if hits + misses else 0.0
+
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": ratio(hits, misses),
+            "stale": self.stale,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "held": sorted(name for name, holds in self._holds.items() if holds),
+            "collections": {
+                name: {
+                    "hits": self.hits.get(name, 0),
+                    "misses": self.misses.get(name, 0),
+                    "hit_ratio": ratio(self.hits.get(name, 0), self.misses.get(name, 0)),
+                    "generation": self.generation(name),
+                }
+                for name in sorted(set(self.hits) | set(self.misses) | set(self._generations))
+            },
+        }
+
+
+def search_cache_from_env() -> Optional[SearchCache]:
+    """The configured cache, or None when SEARCH_CACHE=0."""
+    if os.getenv("SEARCH_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    return SearchCache()
@@ -2,14 +2,13 @@ import json
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from local_db import sqlite_service
-from agent import model
+from agent import get_model
 
 class MorningBrief(BaseModel):
     brief: str = Field(description="A technical, short summary of the telemetry data from a data fusion perspective.")
     points: list[str] = Field(description="2-3 specific insights, warnings, or action proposals based on the logs.")
 
 sleep_agent = Agent(
-    model=model,
     system_prompt=(
         "You are the Aether NightCycleProcessor module. Your task is to consolidate logs and events from the past day. "
         "Analyze the raw data and prepare a Concise Morning Brief."
@@ -33,7 +32,7 @@ async def run_sleep_cycle():
         prompt += f"[{log['type'].upper()}|{log['source']}] {log['message']}\n"
         
     try:
-        result = await sleep_agent.run(prompt)
+        result = await sleep_agent.run(prompt, model=get_model())
         
         # Agent returns a validated Pydantic object (MorningBrief)
         data = result.output.model_dump()
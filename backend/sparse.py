@@ -0,0 +1,64 @@
+"""
+Sparse lexical vectors for hybrid (sparse + dense) retrieval.
+Text is split into lowercase terms; identifier-like tokens (snake_case / camelCase names,
+dotted paths, error codes such as ERR-4012, ticket IDs) are kept whole *and* split into their
+parts, so both `parse_config` and "parse config" match. Each term is hashed to a 32-bit index
+and weighted with BM25's saturated term frequency and length normalization. The IDF half of
+BM25 is applied by Qdrant at query time (Modifier.IDF on the sparse vector), so no corpus
+statistics are kept locally and vectors never need recomputing as the corpus grows.
+"""
+import os
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client.http import models
+
+K1 = 1.2
+B = 0.75
+AVG_DOC_TERMS = int(os.getenv("SPARSE_AVG_DOC_TERMS", "160"))  # ~ terms in a 1000-char chunk
+
+_TOKEN = re.compile(r"\w+(?:[.\-:/#]\w+)*", re.UNICODE)
+_PARTS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in is it its of on or that the this "
+    "to was we were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    for token in _TOKEN.findall(text):
+        lowered = token.lower()
+        if lowered not in _STOPWORDS:
+            terms.append(lowered)
+        parts = _PARTS.findall(token.replace("_", " "))
+        if len(parts) > 1:
+            terms.extend(p.lower() for p in parts if len(p) > 1 and p.lower() not in _STOPWORDS)
+    return terms
+
+
+def _index(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _vector(weights: dict) -> models.SparseVector:
+    # Distinct terms may share a hash bucket: their weights add up
+    merged: dict = {}
+    for term, weight in weights.items():
+        index = _index(term)
+        merged[index] = merged.get(index, 0.0) + weight
+    return models.SparseVector(indices=list(merged), values=list(merged.values()))
+
+
+def document_vector(text: str) -> models.SparseVector:
+    """BM25 term-frequency weights of a stored text (IDF comes from Qdrant)."""
+    counts = Counter(tokenize(text))
+    length_norm = K1 * (1 - B + B * sum(counts.values()) / AVG_DOC_TERMS)
+    return _vector({term: tf * (K1 + 1) / (tf + length_norm) for term, tf in counts.items()})
+
+
+def query_vector(text: str) -> models.SparseVector:
+    """Query terms with weight 1; empty when the query has no indexable terms."""
+    return _vector({term: 1.0 for term in set(tokenize(text))})
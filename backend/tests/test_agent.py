@@ -1,6 +1,6 @@
 import pytest
 from pydantic_ai.models.test import TestModel
-from agent import aether_agent, remember, recall, connect_concepts
+from agent import aether_agent, remember, recall, connect_concepts, inject_dynamic_context
 from unittest.mock import AsyncMock, MagicMock
 from pydantic_ai import RunContext
 
@@ -69,3 +69,29 @@ async def test_connect_concepts_logic(mock_deps, monkeypatch):
     
     assert "Concepts connected" in result
     assert mock_sqlite.add_concept_link.called
+
+@pytest.mark.asyncio
+async def test_inject_dynamic_context_embeds_once(monkeypatch):
+    """Test that context injection embeds the user message once and searches both collections together."""
+    mock_mm = MagicMock()
+    mock_mm.embed_query = AsyncMock(return_value=[0.1] * 3072)
+    monkeypatch.setattr("agent.memory_manager", mock_mm)
+
+    mock_db = MagicMock()
+    mock_db.search_multi = AsyncMock(return_value={
+        "memories": [{"content": "User prefers dark mode"}],
+        "documents": [{"content": "Spec section", "metadata": {"source": "spec.md"}}],
+    })
+    monkeypatch.setattr("agent.db_service", mock_db)
+
+    ctx = MagicMock()
+    ctx.deps = {"user_message": "What theme do I like?", "search_count": 0, "embeddings": {}}
+
+    prompt = await inject_dynamic_context(ctx)
+
+    assert "User prefers dark mode" in prompt
+    assert "spec.md" in prompt
+    assert mock_mm.embed_query.call_count == 1
+    assert mock_db.search_multi.call_count == 1
+    args, kwargs = mock_mm.embed_query.call_args
+    assert args[1] is ctx.deps["embeddings"]
@@ -1,6 +1,8 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from main import app
+from unittest import mock
 from unittest.mock import AsyncMock, MagicMock
 
 @pytest.fixture
@@ -17,12 +19,15 @@ def test_ping(client):
 async def test_get_stats_endpoint(client, monkeypatch):
     """Test the stats endpoint with mocked services."""
     mock_db = MagicMock()
-    mock_db.get_stats.return_value = {"memories_count": 10, "documents_count": 5}
+    mock_db.get_stats = AsyncMock(return_value={"memories_count": 10, "documents_count": 5})
+    mock_db.vector_size = 768
+    mock_db.search_cache.stats.return_value = {"hits": 3, "misses": 1, "hit_ratio": 0.75}
     
     mock_sqlite = MagicMock()
     # Mock get_logs as a coroutine (async)
     mock_sqlite.get_logs = AsyncMock(return_value=[{"type": "info"}, {"type": "error"}])
     mock_sqlite.get_sessions = AsyncMock(return_value=[1, 2, 3])
+    mock_sqlite.get_dedup_stats = AsyncMock(return_value={"linked_chunks": 2, "fingerprints": 10})
     
     # In main.py, db_service is imported from agent, sqlite_service from local_db
     monkeypatch.setattr("main.db_service", mock_db)
@@ -35,6 +40,8 @@ async def test_get_stats_endpoint(client, monkeypatch):
     assert data["stats"]["memories_count"] == 10
     assert data["stats"]["reliability"] == 50.0
     assert data["stats"]["sessions_count"] == 3
+    assert data["stats"]["deduplication"]["vector_bytes_saved"] == 2 * 768 * 4
+    assert data["stats"]["search_cache"]["hit_ratio"] == 0.75
 
 def test_config_get(client, monkeypatch):
     """Test retrieving configuration."""
@@ -56,6 +63,7 @@ async def test_ingest_endpoint(client, tmp_path, monkeypatch):
     
     mock_sqlite = MagicMock()
     mock_sqlite.add_log = AsyncMock()
+    mock_sqlite.update_document_entry = AsyncMock()
     monkeypatch.setattr("main.sqlite_service", mock_sqlite)
     
     # Create a dummy file
@@ -68,4 +76,98 @@ async def test_ingest_endpoint(client, tmp_path, monkeypatch):
     assert response.status_code == 200
     assert "uploaded successfully" in response.json()["message"]
     assert os.path.exists(os.path.join(mock_source_dir, filename))
+    # The upload is registered in the document catalog
+    mock_sqlite.update_document_entry.assert_awaited_once_with(filename, size=len(content), mtime_ns=mock.ANY)
 import os
+
+def test_memories_pagination_and_ndjson(client, monkeypatch):
+    """Test the cursor-paginated memories listing and its NDJSON stream."""
+    memories = [{"id": str(i), "content": f"M{i}", "category": "general", "timestamp": ""} for i in range(3)]
+
+    async def iter_memories():
+        for memory in memories:
+            yield memory
+
+    mock_db = MagicMock()
+    mock_db.list_memories_page = AsyncMock(return_value={"memories": memories[:2], "next_cursor": "2"})
+    mock_db.iter_memories = iter_memories
+    monkeypatch.setattr("main.db_service", mock_db)
+
+    data = client.get("/memories?limit=2").json()
+    assert data["status"] == "success"
+    assert data["next_cursor"] == "2"
+    assert len(data["memories"]) == 2
+    client.get("/memories?limit=5000&cursor=2")
+    mock_db.list_memories_page.assert_awaited_with(1000, "2")
+
+    response = client.get("/memories?format=ndjson")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line)["content"] for line in lines] == ["M0", "M1", "M2"]
+
+def test_index_job_rejects_paths_outside_source_dir(client, tmp_path, monkeypatch):
+    """Test that queued filenames cannot escape the knowledge source folder, while nested names can."""
+    source_dir = tmp_path / "knowledge"
+    (source_dir / "sub").mkdir(parents=True)
+    (source_dir / "sub" / "c.txt").write_text("nested", encoding="utf-8")
+    (tmp_path / "secret.env").write_text("KEY=1", encoding="utf-8")
+    monkeypatch.setattr("ingest.SOURCE_DIR", str(source_dir))
+    mock_jobs = MagicMock()
+    mock_jobs.enqueue = AsyncMock(return_value={"id": "job-1", "status": "queued"})
+    monkeypatch.setattr("main.ingest_jobs", mock_jobs)
+
+    for filename in ("../secret.env", str(tmp_path / "secret.env"), "/etc/passwd"):
+        data = client.post("/knowledge/jobs", json={"filename": filename}).json()
+        assert data["status"] == "error"
+        assert "outside the knowledge source folder" in data["message"]
+    mock_jobs.enqueue.assert_not_awaited()
+
+    assert client.post("/knowledge/jobs", json={"filename": "sub/c.txt"}).json()["status"] == "success"
+    mock_jobs.enqueue.assert_awaited_once_with("sub/c.txt", max_attempts=None)
+
+def test_knowledge_content_accepts_nested_names_only_inside_source_dir(client, tmp_path, monkeypatch):
+    """Test that subfolder sources are addressable while encoded '../' paths are refused."""
+    source_dir = tmp_path / "knowledge"
+    (source_dir / "specs").mkdir(parents=True)
+    (source_dir / "specs" / "api.md").write_text("# API", encoding="utf-8")
+    (tmp_path / "secret.md").write_text("KEY=1", encoding="utf-8")
+    monkeypatch.setattr("ingest.SOURCE_DIR", str(source_dir))
+
+    assert client.get("/knowledge/content/specs/api.md").json() == {"status": "success", "content": "# API"}
+    data = client.get("/knowledge/content/..%2Fsecret.md").json()
+    assert data["status"] == "error" and "outside" in data["message"]
+    assert client.delete("/knowledge/..%2Fsecret.md").json()["status"] == "error"
+    assert (tmp_path / "secret.md").exists()
+
+def test_delete_document_cancels_its_ingest_jobs(client, tmp_path, monkeypatch):
+    """Test that deleting a source cancels its jobs before its chunks are forgotten."""
+    source_dir = tmp_path / "knowledge"
+    source_dir.mkdir()
+    (source_dir / "notes.md").write_text("# Notes", encoding="utf-8")
+    monkeypatch.setattr("ingest.SOURCE_DIR", str(source_dir))
+    calls = []
+    mock_jobs = MagicMock()
+    mock_jobs.cancel_file = AsyncMock(side_effect=lambda name: calls.append(("cancel", name)))
+    mock_jobs.requeue_orphans = AsyncMock()
+    monkeypatch.setattr("main.ingest_jobs", mock_jobs)
+
+    async def forget_source(name, db):
+        calls.append(("forget", name))
+        return {"deleted": True, "orphaned_sources": []}
+    monkeypatch.setattr("ingest.forget_source", forget_source)
+    monkeypatch.setattr("main.sqlite_service", MagicMock(forget_document=AsyncMock(), add_log=AsyncMock()))
+
+    assert client.delete("/knowledge/notes.md").json()["status"] == "success"
+    assert calls == [("cancel", "notes.md"), ("forget", "notes.md")]
+    assert not (source_dir / "notes.md").exists()
+
+def test_main_imports_without_gemini_key(tmp_path):
+    """Test that the kernel module loads without GEMINI_API_KEY (the chat model is built on first use)."""
+    import os
+    import subprocess
+    import sys
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    env["QDRANT_LOCAL_PATH"] = str(tmp_path / "qdrant")
+    result = subprocess.run([sys.executable, "-c", "import main"], cwd=backend, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,86 @@
+import pytest
+from embedding_cache import EmbeddingCache
+from unittest.mock import AsyncMock, MagicMock
+
+MODEL = "models/gemini-embedding-001"
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(db_path=str(tmp_path / "embedding_cache.db"), lru_size=2)
+
+def test_cache_roundtrip_and_counters(cache):
+    """Test storing a vector and reading it back from the LRU."""
+    assert cache.get(MODEL, None, "hello world") is None
+    cache.put(MODEL, None, "hello world", [0.5, 0.25])
+
+    # Whitespace differences share the same content address
+    assert cache.get(MODEL, None, "  hello   world ") == [0.5, 0.25]
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+def test_cache_is_keyed_by_model_and_dimensions(cache):
+    """Test that vectors from other models or sizes are never returned."""
+    cache.put(MODEL, 768, "text", [1.0])
+    assert cache.get(MODEL, None, "text") is None
+    assert cache.get("other-model", 768, "text") is None
+    assert cache.get(MODEL, 768, "text") == [1.0]
+
+def test_cache_persists_to_disk(tmp_path):
+    """Test that a fresh cache instance reads vectors written by a previous one."""
+    path = str(tmp_path / "embedding_cache.db")
+    EmbeddingCache(db_path=path).put(MODEL, None, "persisted", [0.125, 0.5])
+
+    reopened = EmbeddingCache(db_path=path)
+    assert reopened.get(MODEL, None, "persisted") == [0.125, 0.5]
+    assert reopened.stats()["disk_hits"] == 1
+
+def test_cache_evicts_when_over_budget(tmp_path):
+    """Test size-based eviction of the least recently used rows."""
+    # Each 4-float vector takes 16 bytes on disk
+    cache = EmbeddingCache(db_path=str(tmp_path / "embedding_cache.db"), lru_size=0, max_bytes=40)
+    for i in range(4):
+        cache.put(MODEL, None, f"text {i}", [float(i)] * 4)
+
+    assert cache.stats()["evictions"] >= 2
+    assert cache.stats()["disk_bytes"] <= 40
+    assert cache.get(MODEL, None, "text 3") == [3.0] * 4
+    assert cache.get(MODEL, None, "text 0") is None
+
+@pytest.mark.asyncio
+async def test_get_embedding_uses_cache(tmp_path, monkeypatch):
+    """Test that MemoryManager only calls the API once for repeated text."""
+    from memory import MemoryManager
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+    manager = MemoryManager()
+    manager.cache = EmbeddingCache(db_path=str(tmp_path / "embedding_cache.db"))
+
+    result = MagicMock()
+    result.embeddings = [MagicMock(values=[0.1, 0.2])]
+    manager.provider.client = MagicMock()
+    manager.provider.client.aio.models.embed_content = AsyncMock(return_value=result)
+
+    first = await manager.get_embedding("repeated query")
+    second = await manager.get_embedding("repeated query")
+
+    assert first == second
+    assert manager.provider.client.aio.models.embed_content.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_single_text_miss_is_counted_once(tmp_path):
+    """Test that a get_embedding miss (looked up, then batched) and a hit give a 0.5 hit ratio."""
+    from memory import MemoryManager
+    from embedding_providers import LocalHashEmbeddingProvider
+    manager = MemoryManager(provider=LocalHashEmbeddingProvider(dimensions=8))
+    manager.cache = EmbeddingCache(db_path=str(tmp_path / "embedding_cache.db"))
+
+    await manager.get_embedding("counted once")
+    await manager.get_embedding("counted once")
+
+    stats = manager.cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["memory_hits"] == 1  # The repeat was served from the LRU without a disk lookup
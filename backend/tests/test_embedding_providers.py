@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+from embedding_providers import (
+    LocalHashEmbeddingProvider,
+    GeminiEmbeddingProvider,
+    get_embedding_provider,
+    embedding_dimensions,
+    embedding_model,
+)
+
+def test_auto_provider_falls_back_to_local(monkeypatch):
+    """Test that a missing API key selects the offline provider instead of raising."""
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "auto")
+
+    provider = get_embedding_provider()
+
+    assert isinstance(provider, LocalHashEmbeddingProvider)
+    assert embedding_dimensions() == provider.dimensions
+    assert embedding_model() == provider.model
+
+@pytest.mark.asyncio
+async def test_auto_fallback_refuses_collections_of_another_model(tmp_path, monkeypatch):
+    """Test that falling back to the local provider fails loudly on collections holding Gemini vectors."""
+    from database import AsyncDatabaseService, EmbeddingMismatchError
+    monkeypatch.setenv("QDRANT_URL", "")
+    monkeypatch.setenv("QDRANT_API_KEY", "")
+    monkeypatch.setenv("QDRANT_LOCAL_PATH", str(tmp_path / "qdrant"))
+    monkeypatch.setenv("LOCAL_EMBEDDING_DIMENSIONS", "8")
+    gemini = AsyncDatabaseService(vector_size=8, embedding_model=GeminiEmbeddingProvider.default_model)
+    await gemini.add_memory("Embedded by Gemini", [1.0] + [0.0] * 7)
+    await gemini.close()
+
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "auto")
+    service = AsyncDatabaseService()
+    try:
+        with pytest.raises(EmbeddingMismatchError, match="GEMINI_API_KEY"):
+            await service.initialize()
+    finally:
+        await service.close()
+
+def test_explicit_gemini_provider_requires_key(monkeypatch):
+    """Test that explicitly selecting Gemini without a key is still an error."""
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        get_embedding_provider("gemini")
+    assert embedding_dimensions("gemini") == GeminiEmbeddingProvider.default_dimensions
+
+@pytest.mark.asyncio
+async def test_local_provider_is_deterministic_and_normalized():
+    """Test the local provider's vector shape, determinism and lexical similarity."""
+    provider = LocalHashEmbeddingProvider(dimensions=256)
+    texts = ["Qdrant stores vectors", "qdrant stores  vectors", "The weather is sunny today"]
+
+    first = await provider.embed(texts)
+    second = await provider.embed(texts)
+
+    assert first == second
+    vectors = np.array(first)
+    assert vectors.shape == (3, 256)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    # Same words -> identical vector, unrelated text -> low similarity
+    assert vectors[0] @ vectors[1] == pytest.approx(1.0)
+    assert vectors[0] @ vectors[2] < 0.5
+
+def test_database_vector_size_follows_provider(tmp_path, monkeypatch):
+    """Test that collections are created with the provider's dimensionality."""
+    from database import DatabaseService
+    monkeypatch.setenv("QDRANT_URL", "")
+    monkeypatch.setenv("QDRANT_API_KEY", "")
+    monkeypatch.setenv("QDRANT_LOCAL_PATH", str(tmp_path / "qdrant"))
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+    monkeypatch.setenv("LOCAL_EMBEDDING_DIMENSIONS", "128")
+
+    service = DatabaseService()
+
+    assert service.vector_size == 128
+    info = service.client.get_collection("documents")
+    assert info.config.params.vectors.size == 128
+
+def test_truncate_and_normalize():
+    """Test Matryoshka truncation keeps the leading components at unit length."""
+    from embedding_providers import truncate_and_normalize
+    reduced = truncate_and_normalize([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], 2)
+    assert reduced[0] == pytest.approx([0.6, 0.8])
+    assert reduced[1] == [0.0, 0.0]
+
+def test_gemini_dimensions_are_configurable(monkeypatch):
+    """Test EMBEDDING_DIMENSIONS validation for the Gemini provider."""
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "768")
+    assert embedding_dimensions("gemini") == 768
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "4096")
+    with pytest.raises(ValueError):
+        embedding_dimensions("gemini")
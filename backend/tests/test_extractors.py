@@ -0,0 +1,122 @@
+import io
+import json
+import zipfile
+import pytest
+import extractors
+from extractors import ExtractionError, extracted_text_path
+
+
+def extract(func, path) -> str:
+    out = io.StringIO()
+    func(str(path), out)
+    return out.getvalue()
+
+
+def write_docx(path, paragraphs):
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f'<?xml version="1.0"?><w:document xmlns:w="{w}"><w:body>{body}</w:body></w:document>')
+
+
+def write_pdf(path, pages):
+    """Minimal one-font PDF with one line of text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(data)
+
+
+def test_html_extractor_drops_markup_and_scripts(tmp_path):
+    """Test that HTML is reduced to visible text with block boundaries kept."""
+    path = tmp_path / "page.html"
+    path.write_text("<html><head><style>p{}</style><script>var x = 1;</script></head>"
+                    "<body><h1>Title</h1><p>First &amp; second</p></body></html>", encoding="utf-8")
+    text = extract(extractors.extract_html, path)
+    assert "Title" in text and "First & second" in text
+    assert "var x" not in text and "p{}" not in text
+    assert text.index("Title") < text.index("\n", text.index("Title"))
+
+
+def test_docx_json_and_csv_extractors(tmp_path):
+    """Test paragraph, record and row rendering of the structured formats."""
+    docx = tmp_path / "report.docx"
+    write_docx(docx, ["Quarterly report", "Revenue grew"])
+    assert extract(extractors.extract_docx, docx) == "Quarterly report\n\nRevenue grew\n\n"
+
+    (tmp_path / "broken.docx").write_bytes(b"not a zip")
+    with pytest.raises(ExtractionError):
+        extract(extractors.extract_docx, tmp_path / "broken.docx")
+
+    data = tmp_path / "config.json"
+    data.write_text('[{"name": "aether", "tags": ["ai", "agent"]}]', encoding="utf-8")
+    assert extract(extractors.extract_json, data) == "[0].name: aether\n[0].tags[0]: ai\n[0].tags[1]: agent\n\n"
+
+    table = tmp_path / "people.csv"
+    table.write_text("name,role\nAda,engineer\nGrace,\n", encoding="utf-8")
+    assert extract(extractors.extract_csv, table) == "name: Ada | role: engineer\nname: Grace\n"
+
+
+def test_json_arrays_are_streamed_element_by_element(tmp_path, monkeypatch):
+    """Test that top-level arrays parse across tiny read blocks and invalid JSON is reported."""
+    records = [{"id": i, "score": -1.25e3 * i, "tags": ["x, ]" * (i % 3)], "ok": i % 2 == 0} for i in range(50)]
+    data = tmp_path / "records.json"
+    data.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    with open(data, encoding="utf-8") as f:
+        assert [r for _, r in extractors._iter_json_records(f, block_size=3)] == records
+    assert extract(extractors.extract_json, data).startswith("[0].id: 0\n[0].score: -0.0\n")
+
+    (tmp_path / "truncated.json").write_text('[{"id": 1}, {"id": 2', encoding="utf-8")
+    with pytest.raises(ExtractionError):
+        extract(extractors.extract_json, tmp_path / "truncated.json")
+
+
+def test_pdf_extractor_reads_pages(tmp_path):
+    """Test that PDF text is extracted page by page with pypdf."""
+    pdf = tmp_path / "manual.pdf"
+    write_pdf(pdf, ["Install the agent", "Configure Qdrant"])
+    text = extract(extractors.extract_pdf, pdf)
+    assert text == "[Page 1]\nInstall the agent\n\n[Page 2]\nConfigure Qdrant\n\n"
+
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    with pytest.raises(ExtractionError):
+        extract(extractors.extract_pdf, tmp_path / "broken.pdf")
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_path_uses_process_pool(tmp_path):
+    """Test that text files pass through untouched and other formats are converted in the pool."""
+    notes = tmp_path / "notes.md"
+    notes.write_text("# Notes", encoding="utf-8")
+    async with extracted_text_path(str(notes)) as text_path:
+        assert text_path == str(notes)
+
+    docx = tmp_path / "report.docx"
+    write_docx(docx, ["Hello from Word"])
+    try:
+        async with extracted_text_path(str(docx)) as text_path:
+            with open(text_path, encoding="utf-8") as f:
+                assert f.read().strip() == "Hello from Word"
+        assert not (tmp_path / text_path).exists()  # Temporary rendition is removed
+
+        binary = tmp_path / "image.bin"
+        binary.write_bytes(b"\x89PNG\x00\x00")
+        with pytest.raises(ExtractionError):
+            async with extracted_text_path(str(binary)):
+                pass
+    finally:
+        extractors.shutdown_pool()
@@ -1,18 +1,28 @@
 import pytest
+import hashlib
 import os
 from ingest import split_text, process_content
 from unittest.mock import AsyncMock, MagicMock
+from database import AsyncDatabaseService
 
 @pytest.fixture
 def mock_db():
-    db = MagicMock()
-    db.add_document_chunk = MagicMock()
+    db = MagicMock(spec=AsyncDatabaseService)
+    db.add_document_chunks = AsyncMock(return_value={"status": "success"})
     return db
 
+@pytest.fixture(autouse=True)
+def manifest_store(sqlite_service, monkeypatch):
+    """Route the chunk manifest to the temporary test database."""
+    monkeypatch.setattr("ingest.sqlite_service", sqlite_service)
+    return sqlite_service
+
 @pytest.fixture
 def mock_memory_manager(monkeypatch):
     mm = MagicMock()
-    mm.get_embedding = AsyncMock(return_value=[0.1] * 3072)
+    mm.batch_size = 100
+    mm.embedding_model = "test-embedding"
+    mm.get_embeddings = AsyncMock(side_effect=lambda texts: [[0.1] * 3072 for _ in texts])
     monkeypatch.setattr("ingest.memory_manager", mm)
     return mm
 
@@ -42,10 +52,289 @@ async def test_process_content_flow(mock_db, mock_memory_manager):
     success = await process_content(content, filename, mock_db)
     
     assert success is True
-    assert mock_memory_manager.get_embedding.called
-    assert mock_db.add_document_chunk.called
+    assert mock_memory_manager.get_embeddings.called
+    assert mock_db.add_document_chunks.called
     
     # Check if first chunk call has correct metadata
-    args, kwargs = mock_db.add_document_chunk.call_args_list[0]
-    assert kwargs["metadata"]["source"] == filename
-    assert kwargs["metadata"]["chunk_index"] == 0
+    args, kwargs = mock_db.add_document_chunks.call_args_list[0]
+    assert args[0][0]["metadata"]["source"] == filename
+    assert args[0][0]["metadata"]["chunk_index"] == 0
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_embeddings_and_upserts(mock_db, mock_memory_manager, monkeypatch):
+    """Test that the pipeline sends many chunks per embedding request and per upsert."""
+    import ingest
+    monkeypatch.setattr(ingest, "EMBED_BATCH_SIZE", 4)
+    monkeypatch.setattr(ingest, "UPSERT_BATCH_SIZE", 5)
+    monkeypatch.setattr(ingest, "EMBED_CONCURRENCY", 2)
+    chunks = [{"content": f"chunk {i}", "chunk_index": i} for i in range(10)]
+
+    updates = []
+    stats = await ingest.run_ingest_pipeline(chunks, "big.md", mock_db, progress=updates.append)
+
+    assert stats["stored"] == 10
+    assert stats["failed"] == 0
+    assert stats["chunks_per_sec"] > 0
+    assert mock_memory_manager.get_embeddings.call_count == 3
+    assert mock_db.add_document_chunks.call_count == 2
+    stored = sorted(p["metadata"]["chunk_index"] for call in mock_db.add_document_chunks.call_args_list for p in call.args[0])
+    assert stored == list(range(10))
+    assert updates[-1]["stored"] == 10
+
+@pytest.mark.asyncio
+async def test_pipeline_rate_limit(mock_db, mock_memory_manager, monkeypatch):
+    """Test that INGEST_RATE_LIMIT spaces out embedding requests."""
+    import time
+    import ingest
+    monkeypatch.setattr(ingest, "EMBED_BATCH_SIZE", 1)
+    monkeypatch.setattr(ingest, "rate_limiter", ingest.RateLimiter(20.0))
+
+    started = time.perf_counter()
+    units = [{"content": c, "chunk_index": i} for i, c in enumerate("abcd")]
+    await ingest.run_ingest_pipeline(units, "slow.md", mock_db)
+
+    # 4 requests at 20/sec need at least 3 intervals of 50ms
+    assert time.perf_counter() - started >= 0.14
+
+def test_iter_chunks_realigns_after_edit():
+    """Test that content-defined boundaries keep unrelated chunks identical after an edit."""
+    from ingest import iter_chunks
+    paragraphs = [f"Paragraph {i}: " + ("lorem ipsum dolor sit amet " * 6) + "\n\n" for i in range(40)]
+    original = list(iter_chunks("".join(paragraphs), chunk_size=400, overlap=50))
+
+    paragraphs[20] = "Paragraph 20 was rewritten with completely different wording.\n\n"
+    edited = list(iter_chunks("".join(paragraphs), chunk_size=400, overlap=50))
+
+    assert "".join(original).count("Paragraph 39") >= 1
+    assert len(set(edited) - set(original)) <= 2
+    assert all(len(c) <= 400 for c in edited)
+
+@pytest.mark.asyncio
+async def test_reindex_only_embeds_changed_chunks(mock_db, mock_memory_manager, manifest_store, monkeypatch):
+    """Test incremental re-indexing with deterministic chunk IDs and the chunk manifest."""
+    import ingest
+    monkeypatch.setattr(ingest, "CHUNK_SIZE", 400)
+    monkeypatch.setattr(ingest, "CHUNK_OVERLAP", 50)
+    mock_db.delete_document_chunks = AsyncMock(return_value=True)
+    mock_db.update_document_chunks = AsyncMock(return_value=True)
+    paragraphs = [f"Section {i}. " + ("the quick brown fox jumps over the lazy dog " * 5) + "\n\n" for i in range(30)]
+
+    first = await ingest.ingest_content("".join(paragraphs), "spec.md", mock_db)
+    first_ids = {p["id"] for call in mock_db.add_document_chunks.call_args_list for p in call.args[0]}
+    assert first["stored"] == first["total_chunks"]
+
+    # Re-indexing identical content embeds nothing
+    mock_memory_manager.get_embeddings.reset_mock()
+    unchanged = await ingest.ingest_content("".join(paragraphs), "spec.md", mock_db)
+    assert unchanged["to_embed"] == 0
+    assert not mock_memory_manager.get_embeddings.called
+
+    # Editing one paragraph only embeds the chunks around it
+    paragraphs[15] = "Section 15 now documents the new retry policy.\n\n"
+    mock_db.add_document_chunks.reset_mock()
+    edited = await ingest.ingest_content("".join(paragraphs), "spec.md", mock_db)
+    assert 1 <= edited["to_embed"] <= 2
+    assert edited["removed"] >= 1
+    removed_ids = mock_db.delete_document_chunks.call_args.args[0]
+    assert set(removed_ids) <= first_ids
+
+    manifest = await manifest_store.get_chunk_manifest("spec.md")
+    assert len(manifest) == edited["total_chunks"]
+
+@pytest.mark.asyncio
+async def test_repeated_chunks_keep_first_position_across_batches(mock_db, mock_memory_manager, monkeypatch):
+    """Test that a chunk repeated in later scan batches is deduplicated, so re-runs see no moves."""
+    import ingest
+    monkeypatch.setattr(ingest, "MANIFEST_BATCH_SIZE", 2)
+    mock_db.update_document_chunks = AsyncMock(return_value=True)
+    mock_db.update_document_fields = AsyncMock(return_value=True)
+    chunks = ["License header", "Intro", "License header", "Body", "License header"]
+
+    first = await ingest.index_stream(iter(chunks), "repeat.md", mock_db)
+    assert first["stored"] == 3
+    stored = {p["content"]: p["metadata"]["chunk_index"] for call in mock_db.add_document_chunks.call_args_list for p in call.args[0]}
+    assert stored == {"License header": 0, "Intro": 1, "Body": 3}
+
+    again = await ingest.index_stream(iter(chunks), "repeat.md", mock_db)
+    assert again["to_embed"] == 0
+    assert again["moved"] == 0 and again["removed"] == 0
+    assert again["unchanged"] == 3
+    assert not mock_db.update_document_chunks.called
+
+def test_iter_chunks_streamed_blocks_match_whole_text():
+    """Test that chunking streamed blocks yields exactly the chunks of the joined text."""
+    from ingest import iter_chunks
+    text = "".join(f"line {i} " + ("x" * (i % 37)) + ("\r\n" if i % 5 else "\n\n") for i in range(500))
+    text += "y" * 5000  # One huge line without a trailing newline
+    whole = list(iter_chunks(text, chunk_size=300, overlap=40))
+    for block in (1, 7, 64, 1000):
+        blocks = (text[i:i + block] for i in range(0, len(text), block))
+        assert list(iter_chunks(blocks, chunk_size=300, overlap=40)) == whole
+
+@pytest.mark.asyncio
+async def test_ingest_file_streams_from_disk(mock_db, mock_memory_manager, monkeypatch, tmp_path):
+    """Test that files are chunked lazily and embedding starts before the file is fully read."""
+    import ingest
+    monkeypatch.setattr(ingest, "CHUNK_SIZE", 200)
+    monkeypatch.setattr(ingest, "CHUNK_OVERLAP", 20)
+    monkeypatch.setattr(ingest, "STREAM_BLOCK_SIZE", 1024)
+    monkeypatch.setattr(ingest, "MANIFEST_BATCH_SIZE", 8)
+    monkeypatch.setattr(ingest, "EMBED_BATCH_SIZE", 8)
+    monkeypatch.setattr(ingest, "UPSERT_BATCH_SIZE", 8)
+    mock_db.update_document_fields = AsyncMock(return_value=True)
+    path = tmp_path / "server.log"
+    path.write_text("".join(f"2024-01-01 12:00:{i % 60:02d} INFO request {i} served\n" for i in range(3000)), encoding="utf-8")
+
+    reports = []
+    stats = await ingest.ingest_file(str(path), mock_db, progress=reports.append)
+
+    assert stats["stored"] == stats["total_chunks"] > 100
+    assert reports[0]["bytes_read"] < reports[0]["bytes_total"] == path.stat().st_size
+    # Chunk metadata is written before the count is known, then fixed up in one request
+    mock_db.update_document_fields.assert_called_once_with("server.log", {"total_chunks": stats["total_chunks"]})
+
+@pytest.mark.asyncio
+async def test_near_duplicate_chunks_are_linked_not_embedded(mock_db, mock_memory_manager, manifest_store, monkeypatch):
+    """Test that near-identical chunks of another source are linked instead of re-embedded."""
+    import ingest
+    monkeypatch.setattr(ingest, "CHUNK_SIZE", 2000)
+    monkeypatch.setattr(ingest, "CHUNK_OVERLAP", 0)
+    mock_db.delete_document_chunks = AsyncMock(return_value=True)
+    mock_db.update_document_fields = AsyncMock(return_value=True)
+    mock_db.delete_document = AsyncMock(return_value=True)
+    spec = " ".join(f"requirement{i} must hold for component{i % 7}" for i in range(40))
+
+    original = await ingest.ingest_content(spec, "spec_v1.md", mock_db)
+    assert original["stored"] == 1 and original["deduplicated"] == 0
+
+    mock_memory_manager.get_embeddings.reset_mock()
+    copy = await ingest.ingest_content(spec.replace("requirement3 ", "requirement3b "), "spec_v2.md", mock_db)
+    assert copy["deduplicated"] == 1 and copy["to_embed"] == 0
+    assert not mock_memory_manager.get_embeddings.called
+    assert (await manifest_store.get_dedup_stats())["linked_chunks"] == 1
+
+    # Deleting the original unlinks the copy, which must then be re-indexed on its own
+    forgotten = await ingest.forget_source("spec_v1.md", mock_db)
+    assert forgotten["orphaned_sources"] == ["spec_v2.md"]
+    assert (await manifest_store.get_dedup_stats())["linked_chunks"] == 0
+
+@pytest.mark.asyncio
+async def test_bulk_ingest_checkpoint_resume_and_dry_run(mock_db, mock_memory_manager, manifest_store, monkeypatch, tmp_path):
+    """Test the bulk CLI: dry-run counts, checkpointed files skipped on --resume, failed ones retried."""
+    import ingest
+    monkeypatch.setattr(ingest, "CHUNK_SIZE", 200)
+    monkeypatch.setattr(ingest, "CHUNK_OVERLAP", 0)
+    mock_memory_manager.cache = None
+    mock_db.update_document_fields = AsyncMock(return_value=True)
+    for name in ("a.md", "b.md"):
+        (tmp_path / name).write_text(" ".join(f"{name}-term{i}" for i in range(80)), encoding="utf-8")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.txt").write_text("nested " * 50, encoding="utf-8")
+    files = ingest.discover_files(str(tmp_path))
+    assert [name for _, name in files] == ["a.md", "b.md", "sub/c.txt"]
+
+    plan = await ingest.bulk_ingest(files, None, dry_run=True)
+    assert plan["to_embed"] == plan["chunks"] == plan["cache_misses"] > 3
+    assert not mock_memory_manager.get_embeddings.called
+
+    # b.md fails to store (e.g. quota exhausted): it is not checkpointed
+    mock_db.add_document_chunks = AsyncMock(side_effect=lambda points: {"status": "error"} if points[0]["metadata"]["source"] == "b.md" else {"status": "success"})
+    first = await ingest.bulk_ingest(files, mock_db, workers=2)
+    assert first["indexed"] == 2 and first["failed_files"] == ["b.md"]
+
+    mock_db.add_document_chunks = AsyncMock(return_value={"status": "success"})
+    mock_memory_manager.get_embeddings.reset_mock()
+    resumed = await ingest.bulk_ingest(files, mock_db, workers=2, resume=True)
+    assert resumed["skipped"] == 2 and resumed["indexed"] == 1 and not resumed["failed_files"]
+    assert {p["metadata"]["source"] for call in mock_db.add_document_chunks.call_args_list for p in call.args[0]} == {"b.md"}
+
+    # Once everything is indexed, a dry run reports nothing left to embed
+    assert (await ingest.bulk_ingest(files, None, dry_run=True))["to_embed"] == 0
+
+@pytest.mark.asyncio
+async def test_pipeline_counts_per_point_failures(mock_db, mock_memory_manager):
+    """Test that only points the database reports as written are counted and recorded."""
+    import ingest
+    mock_db.add_document_chunks = AsyncMock(side_effect=lambda points: {
+        "status": "partial",
+        "results": [{"id": p["id"], "status": "error" if i == 1 else "success"} for i, p in enumerate(points)]
+    })
+    recorded = []
+    units = [{"id": f"id-{i}", "content": f"chunk {i}", "chunk_index": i} for i in range(3)]
+
+    async def on_stored(points):
+        recorded.extend(p["id"] for p in points)
+
+    stats = await ingest.run_ingest_pipeline(units, "partial.md", mock_db, on_stored=on_stored)
+    assert stats["stored"] == 2 and stats["failed"] == 1
+    assert recorded == ["id-0", "id-2"]
+
+@pytest.mark.asyncio
+async def test_pipeline_fails_instead_of_hanging_when_upserts_fail(mock_db, mock_memory_manager, monkeypatch):
+    """Test that a failing upsert stops the embedding stages instead of leaving them blocked on full queues."""
+    import asyncio
+    import ingest
+    monkeypatch.setattr(ingest, "EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(ingest, "UPSERT_BATCH_SIZE", 2)
+    monkeypatch.setattr(ingest, "EMBED_CONCURRENCY", 2)
+    mock_db.add_document_chunks = AsyncMock(side_effect=RuntimeError("database is locked"))
+    units = [{"content": f"chunk {i}", "chunk_index": i} for i in range(200)]
+
+    with pytest.raises(RuntimeError, match="database is locked"):
+        await asyncio.wait_for(ingest.run_ingest_pipeline(units, "locked.md", mock_db), timeout=5)
+    assert mock_memory_manager.get_embeddings.await_count < 100  # Embedding stopped with the upserter
+
+@pytest.mark.asyncio
+async def test_document_catalog_tracks_index_state(mock_db, mock_memory_manager, manifest_store, tmp_path):
+    """Test that indexing and forgetting a source keep its catalog row in step."""
+    import ingest
+    source_dir = tmp_path / "knowledge"
+    source_dir.mkdir()
+    mock_db.update_document_fields = AsyncMock(return_value=True)
+    mock_db.delete_document = AsyncMock(return_value=True)
+    (source_dir / "guide.md").write_text("Install the kernel.\n\nRun the agent.", encoding="utf-8")
+    (source_dir / "draft.md").write_text("Not indexed yet.", encoding="utf-8")
+    (source_dir / "specs").mkdir()
+    (source_dir / "specs" / "api.md").write_text("Nested, named like the CLI and the watcher name it.", encoding="utf-8")
+
+    await ingest.sync_catalog(str(source_dir))
+    catalog = await manifest_store.list_document_catalog()
+    assert {e["filename"] for e in catalog} == {"guide.md", "draft.md", "specs/api.md"}
+    assert {e["state"] for e in catalog} == {"on_disk"}
+
+    stats = await ingest.ingest_file(str(source_dir / "guide.md"), mock_db)
+    entry = await manifest_store.get_document_entry("guide.md")
+    assert entry["state"] == "indexed" and entry["indexed_at"]
+    assert entry["total_chunks"] == stats["total_chunks"]
+    assert entry["embedding_model"] == "test-embedding"
+    assert entry["content_hash"] == hashlib.sha256((source_dir / "guide.md").read_bytes()).hexdigest()
+
+    mock_db.add_document_chunks = AsyncMock(side_effect=RuntimeError("qdrant down"))
+    (source_dir / "guide.md").write_text("Rewritten guide.", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        await ingest.ingest_file(str(source_dir / "guide.md"), mock_db)
+    entry = await manifest_store.get_document_entry("guide.md")
+    assert entry["state"] == "failed" and entry["error"] == "qdrant down"
+
+    # Removing the draft from disk drops its (never indexed) row on the next sync
+    (source_dir / "draft.md").unlink()
+    (source_dir / "specs" / "api.md").unlink()
+    await ingest.sync_catalog(str(source_dir))
+    await ingest.forget_source("guide.md", mock_db)
+    assert await manifest_store.list_document_catalog() == []
+    assert not await manifest_store.has_chunk_manifest("guide.md")
+
+@pytest.mark.asyncio
+async def test_catalog_resyncs_only_when_the_folder_changed(manifest_store, tmp_path):
+    """Test that a listing matching the catalog skips the sync while a hand-copied file triggers it."""
+    import ingest
+    source_dir = tmp_path / "knowledge"
+    source_dir.mkdir()
+    (source_dir / "guide.md").write_text("Install the kernel.", encoding="utf-8")
+
+    assert await ingest.sync_catalog(str(source_dir), if_stale=True)
+    assert not await ingest.sync_catalog(str(source_dir), if_stale=True)
+
+    (source_dir / "copied.md").write_text("Dropped in by hand.", encoding="utf-8")
+    assert await ingest.sync_catalog(str(source_dir), if_stale=True)
+    assert {e["filename"] for e in await manifest_store.list_document_catalog()} == {"guide.md", "copied.md"}
@@ -0,0 +1,151 @@
+import pytest
+import asyncio
+from jobs import IngestJobManager, summarize_progress
+
+
+@pytest.fixture
+def source_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("ingest.SOURCE_DIR", str(tmp_path))
+    (tmp_path / "notes.md").write_text("# Notes\n", encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def job_store(sqlite_service, monkeypatch):
+    """Route job persistence to the temporary test database."""
+    monkeypatch.setattr("jobs.sqlite_service", sqlite_service)
+    return sqlite_service
+
+
+async def wait_for_status(manager, job_id, *statuses, timeout=5.0):
+    async def poll():
+        while (job := await manager.get(job_id))["status"] not in statuses:
+            await asyncio.sleep(0.01)
+        return job
+    return await asyncio.wait_for(poll(), timeout)
+
+
+def test_summarize_progress_extrapolates_total_while_streaming():
+    """Test that the chunk total and ETA are estimated from bytes read mid-stream."""
+    progress = summarize_progress({"scanned": 100, "stored": 40, "unchanged": 10, "bytes_read": 250, "bytes_total": 1000}, elapsed=5.0)
+    assert progress["chunks_total"] == 400
+    assert progress["total_is_estimate"] is True
+    assert progress["chunks_per_sec"] == 10.0
+    assert progress["eta_seconds"] == 35.0
+
+    final = summarize_progress({"scanned": 400, "stored": 400, "total_chunks": 400}, elapsed=10.0)
+    assert final["percent"] == 100.0 and final["total_is_estimate"] is False
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_background_and_reports_progress(source_dir):
+    """Test that enqueue returns immediately and the worker records progress and completion."""
+    release = asyncio.Event()
+
+    async def runner(path, db, filename=None, progress=None):
+        progress({"scanned": 10, "stored": 5, "bytes_read": 50, "bytes_total": 100})
+        await release.wait()
+        return {"stored": 20, "failed": 0, "unchanged": 0, "moved": 0, "scanned": 20, "total_chunks": 20}
+
+    manager = IngestJobManager(workers=1, runner=runner)
+    await manager.start(db=None)
+    try:
+        job = await manager.enqueue("notes.md")
+        assert job["status"] == "queued"
+
+        running = await wait_for_status(manager, job["id"], "running")
+        # Enqueuing the same file again returns the active job instead of indexing twice
+        assert (await manager.enqueue("notes.md"))["id"] == job["id"]
+        await asyncio.sleep(0.05)
+        running = await manager.get(job["id"])
+        assert running["progress"]["chunks_done"] == 5
+
+        release.set()
+        done = await wait_for_status(manager, job["id"], "completed")
+        assert done["progress"]["chunks_total"] == 20
+        assert done["attempts"] == 1
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_retries_then_fails(source_dir):
+    """Test automatic retries, the final failed state, and a manual retry."""
+    calls = []
+
+    async def runner(path, db, filename=None, progress=None):
+        calls.append(filename)
+        if len(calls) < 4:
+            raise RuntimeError("embedding service unavailable")
+        return {"stored": 1, "failed": 0, "scanned": 1, "total_chunks": 1}
+
+    manager = IngestJobManager(workers=2, max_attempts=3, retry_delay=0.01, runner=runner)
+    await manager.start(db=None)
+    try:
+        job = await manager.enqueue("notes.md")
+        failed = await wait_for_status(manager, job["id"], "failed")
+        assert failed["attempts"] == 3
+        assert "unavailable" in failed["error"]
+
+        await manager.retry(job["id"])
+        done = await wait_for_status(manager, job["id"], "completed")
+        assert done["error"] is None
+        assert len(calls) == 4
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_job_and_resume_after_restart(source_dir, job_store):
+    """Test cancelling a running job, and that jobs interrupted by shutdown are resumed."""
+    started = asyncio.Event()
+
+    async def slow_runner(path, db, filename=None, progress=None):
+        started.set()
+        await asyncio.sleep(60)
+
+    manager = IngestJobManager(workers=1, runner=slow_runner)
+    await manager.start(db=None)
+    job = await manager.enqueue("notes.md")
+    await asyncio.wait_for(started.wait(), 5)
+    await manager.cancel(job["id"])
+    assert (await wait_for_status(manager, job["id"], "cancelled"))["finished_at"]
+
+    # A job running at shutdown goes back to the queue and runs on the next start
+    started.clear()
+    interrupted = (await manager.retry(job["id"]))
+    await asyncio.wait_for(started.wait(), 5)
+    await manager.stop()
+    assert (await job_store.get_ingest_job(interrupted["id"]))["status"] == "queued"
+
+    async def fast_runner(path, db, filename=None, progress=None):
+        return {"stored": 1, "failed": 0, "scanned": 1, "total_chunks": 1}
+
+    restarted = IngestJobManager(workers=1, runner=fast_runner)
+    await restarted.start(db=None)
+    try:
+        await wait_for_status(restarted, job["id"], "completed")
+    finally:
+        await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_rejects_paths_outside_source_dir(source_dir):
+    """Test that the worker refuses persisted jobs whose filename escapes the source folder."""
+    calls = []
+
+    async def runner(path, db, filename=None, progress=None):
+        calls.append(path)
+        return {"stored": 1, "failed": 0, "scanned": 1, "total_chunks": 1}
+
+    (source_dir.parent / "outside.md").write_text("secret", encoding="utf-8")
+    manager = IngestJobManager(workers=1, max_attempts=1, runner=runner)
+    await manager.start(db=None)
+    try:
+        for filename in ("../outside.md", str(source_dir.parent / "outside.md")):
+            job = await manager.enqueue(filename)
+            failed = await wait_for_status(manager, job["id"], "failed")
+            assert "outside the knowledge source folder" in failed["error"]
+        assert calls == []
+    finally:
+        await manager.stop()
@@ -0,0 +1,135 @@
+import pytest
+import asyncio
+import time
+from memory import MemoryManager
+from unittest.mock import AsyncMock, MagicMock
+
+def fake_embed_response(contents):
+    """Builds an EmbedContentResponse-like object with one vector per input text."""
+    texts = contents if isinstance(contents, list) else [contents]
+    result = MagicMock()
+    result.embeddings = [MagicMock(values=[float(len(t)), 1.0]) for t in texts]
+    return result
+
+@pytest.fixture
+def manager(monkeypatch):
+    """MemoryManager with a fake Gemini client and no embedding cache."""
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+    monkeypatch.setenv("EMBEDDING_CACHE", "0")
+    mm = MemoryManager()
+    mm.provider.client = MagicMock()
+    mm.provider.client.aio.models.embed_content = AsyncMock(side_effect=lambda model, contents, **kwargs: fake_embed_response(contents))
+    return mm
+
+@pytest.mark.asyncio
+async def test_get_embeddings_batches_requests(manager):
+    """Test that many texts are sent in batches of `batch_size`."""
+    manager.batch_size = 2
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    vectors = await manager.get_embeddings(texts)
+
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert manager.provider.client.aio.models.embed_content.call_count == 3
+
+@pytest.mark.asyncio
+async def test_get_embeddings_deduplicates_texts(manager):
+    """Test that identical texts are embedded only once."""
+    vectors = await manager.get_embeddings(["same", "same", "other"])
+
+    assert vectors[0] == vectors[1]
+    args, kwargs = manager.provider.client.aio.models.embed_content.call_args
+    assert kwargs["contents"] == ["same", "other"]
+
+@pytest.mark.asyncio
+async def test_concurrent_get_embedding_is_micro_batched(manager):
+    """Test that concurrent single-text requests are coalesced into one API call."""
+    texts = ["one", "three", "fifteen"]
+
+    vectors = await asyncio.gather(*(manager.get_embedding(t) for t in texts))
+
+    assert [v[0] for v in vectors] == [3.0, 5.0, 7.0]
+    assert manager.provider.client.aio.models.embed_content.call_count == 1
+    assert manager.batcher.batches == 1
+
+@pytest.mark.asyncio
+async def test_failed_batch_returns_empty_vectors(manager):
+    """Test that API errors degrade to empty vectors instead of raising."""
+    manager.provider.client.aio.models.embed_content = AsyncMock(side_effect=RuntimeError("quota exceeded"))
+
+    vectors = await asyncio.gather(manager.get_embedding("x"), manager.get_embedding("y"))
+
+    assert vectors == [[], []]
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_embedding(manager):
+    """Regression test: embedding must not block the event loop for the network round trip."""
+    async def slow_embed(model, contents, **kwargs):
+        await asyncio.sleep(0.3)
+        return fake_embed_response(contents)
+
+    def blocking_embed(model, contents, **kwargs):
+        time.sleep(0.3)
+        return fake_embed_response(contents)
+
+    manager.provider.client.aio.models.embed_content = AsyncMock(side_effect=slow_embed)
+    # If anything fell back to the synchronous client, the heartbeat below would stall
+    manager.provider.client.models.embed_content = MagicMock(side_effect=blocking_embed)
+
+    gaps = []
+    async def heartbeat():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(heartbeat())
+    try:
+        vectors = await asyncio.gather(*(manager.get_embeddings([f"text {i}"]) for i in range(8)))
+    finally:
+        ticker.cancel()
+
+    assert all(v[0] for v in vectors)
+    assert not manager.provider.client.models.embed_content.called
+    assert len(gaps) >= 10
+    assert max(gaps) < 0.15
+
+@pytest.mark.asyncio
+async def test_embedding_timeout_and_concurrency_limit(manager):
+    """Test that requests respect the concurrency bound and time out cleanly."""
+    in_flight = 0
+    peak = 0
+    async def hanging_embed(model, contents, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(10)
+        finally:
+            in_flight -= 1
+
+    manager.provider.client.aio.models.embed_content = AsyncMock(side_effect=hanging_embed)
+    manager.max_concurrency = 2
+    manager.timeout = 0.05
+
+    vectors = await asyncio.gather(*(manager.get_embeddings([f"text {i}"]) for i in range(4)))
+
+    assert vectors == [[[]]] * 4
+    assert peak <= 2
+
+@pytest.mark.asyncio
+async def test_embed_query_reuses_run_memo(manager):
+    """Test that queries differing only in whitespace share an embedding, but not ones differing in case."""
+    memo = {}
+    first = await manager.embed_query("Project deadline?", memo)
+    second = await manager.embed_query("  Project   deadline? ", memo)
+
+    assert first == second
+    assert manager.provider.client.aio.models.embed_content.call_count == 1
+
+    await manager.embed_query("project deadline?", memo)
+    assert manager.provider.client.aio.models.embed_content.call_count == 2
+    assert len(memo) == 2
@@ -0,0 +1,30 @@
+import pytest
+from neardup import simhash, hamming, to_signed, from_signed, FingerprintMatcher
+
+BASE = (
+    "Aether stores long-term memories in Qdrant and keeps session logs in SQLite. "
+    "The sleep cycle consolidates the day's events into a morning brief every night, "
+    "and the world model reflects on recent activity to propose next steps."
+)
+
+def test_simhash_near_duplicates_are_close():
+    """Test that a light edit keeps the fingerprint within a few bits, while unrelated text does not."""
+    edited = BASE.replace("every night", "each night")
+    unrelated = (
+        "Quarterly revenue grew by twelve percent while operating costs declined, "
+        "driven by lower logistics spending and a favourable currency environment overall this year."
+    )
+    assert hamming(simhash(BASE), simhash(BASE + "  ")) == 0
+    assert hamming(simhash(BASE), simhash(edited)) <= 8
+    assert hamming(simhash(BASE), simhash(unrelated)) > 16
+
+def test_short_chunks_are_not_fingerprinted():
+    assert simhash("Just a title") is None
+
+def test_matcher_picks_nearest_within_distance():
+    """Test the vectorized matcher and the signed representation used for SQLite storage."""
+    value = simhash(BASE)
+    assert from_signed(to_signed(value)) == value
+    matcher = FingerprintMatcher([("far", value ^ 0xFFFF), ("near", value ^ 0b111)], max_distance=6)
+    assert matcher.match([value, value ^ 0xFFFFFF, None]) == ["near", None, None]
+    assert FingerprintMatcher([]).match([value]) == [None]
@@ -1,7 +1,8 @@
 import pytest
 import os
 import shutil
-from database import DatabaseService
+from unittest.mock import AsyncMock, MagicMock
+from database import AsyncDatabaseService, DatabaseService
 
 @pytest.fixture
 def test_qdrant_path(tmp_path):
@@ -16,9 +17,34 @@ def qdrant_service(test_qdrant_path, monkeypatch):
     monkeypatch.setenv("QDRANT_URL", "")
     monkeypatch.setenv("QDRANT_API_KEY", "")
     monkeypatch.setenv("QDRANT_LOCAL_PATH", test_qdrant_path)
+    # Tests below use Gemini-sized (3072) vectors
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
     
     service = DatabaseService()
-    return service
+    yield service
+    service.close()
+
+@pytest.fixture
+def local_qdrant(test_qdrant_path, monkeypatch):
+    """Fixture forcing embedded storage at the temporary path; returns the path."""
+    monkeypatch.setenv("QDRANT_URL", "")
+    monkeypatch.setenv("QDRANT_API_KEY", "")
+    monkeypatch.setenv("QDRANT_LOCAL_PATH", test_qdrant_path)
+    return test_qdrant_path
+
+@pytest.fixture
+async def async_qdrant_service(local_qdrant, monkeypatch):
+    """Fixture for the AsyncDatabaseService the kernel uses, with Gemini-sized (3072) vectors."""
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "gemini")
+    service = AsyncDatabaseService()
+    yield service
+    await service.close()
+
+def vector(index: int, size: int = 3072):
+    """Unit vector along one axis."""
+    embedding = [0.0] * size
+    embedding[index] = 1.0
+    return embedding
 
 def test_qdrant_initialization(qdrant_service):
     """Test if collections are created on init."""
@@ -75,3 +101,453 @@ def test_database_stats(qdrant_service):
     stats = qdrant_service.get_stats()
     assert stats["memories_count"] == 1
     assert stats["documents_count"] == 1
+
+
+def test_search_multi_collections(qdrant_service):
+    """Test searching memories and documents with one query vector."""
+    embedding = vector(2)
+    qdrant_service.add_memory("Memory about Qdrant", embedding)
+    qdrant_service.add_document_chunk("Doc about Qdrant", embedding, {"source": "qdrant.md"})
+
+    results = qdrant_service.search_multi(embedding, {
+        "memories": {"match_threshold": 0.8, "match_count": 3},
+        "documents": {"match_threshold": 0.8, "match_count": 3},
+    })
+
+    assert results["memories"][0]["content"] == "Memory about Qdrant"
+    assert results["documents"][0]["metadata"]["source"] == "qdrant.md"
+
+def test_blocking_facade_wraps_async_service(qdrant_service):
+    """Test that the blocking facade drives the async service: coroutines, async iterators and the client."""
+    assert isinstance(qdrant_service._target, AsyncDatabaseService)
+    qdrant_service.add_memories([{"content": f"Memory {i}", "embedding": vector(3)} for i in range(3)])
+    assert len(list(qdrant_service.iter_memories(page_size=2))) == 3
+    assert qdrant_service.client.count("memories").count == 3
+    assert qdrant_service.vector_size == 3072
+
+@pytest.mark.asyncio
+async def test_collection_migrates_to_smaller_dimensions(local_qdrant):
+    """Test that shrinking the embedding size truncates and re-normalizes stored vectors."""
+    full = AsyncDatabaseService(vector_size=8, embedding_model="matryoshka")
+    await full.add_memory("Kept across migration", [0.6, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0])
+    await full.close()
+
+    reduced = AsyncDatabaseService(vector_size=4, embedding_model="matryoshka")
+    try:
+        await reduced.initialize()
+        info = await reduced.client.get_collection("memories")
+        assert info.config.params.vectors.size == 4
+
+        points, _ = await reduced.client.scroll("memories", with_vectors=True)
+        assert len(points) == 1
+        assert points[0].payload["content"] == "Kept across migration"
+        assert points[0].vector[""] == pytest.approx([1.0, 0.0, 0.0, 0.0])
+        assert not await reduced.client.collection_exists("memories__resize")
+    finally:
+        await reduced.close()
+
+@pytest.mark.asyncio
+async def test_collection_refuses_vectors_of_another_model(local_qdrant):
+    """Test that a model switch or an up-size is refused on filled collections and allowed on empty ones."""
+    from database import EmbeddingMismatchError, EMBEDDING_MODEL_KEY
+    first = AsyncDatabaseService(vector_size=4, embedding_model="model-a")
+    await first.add_memory("Embedded by model A", [1.0, 0.0, 0.0, 0.0])
+    await first.close()
+
+    for vector_size, model, error in ((4, "model-b", "model-a"), (2, "model-b", "model-a"), (8, "model-a", "up-sized")):
+        service = AsyncDatabaseService(vector_size=vector_size, embedding_model=model)
+        try:
+            with pytest.raises(EmbeddingMismatchError, match=error):
+                await service.initialize()
+            assert (await service.client.count("memories")).count == 1  # Nothing was touched
+        finally:
+            await service.close()
+
+    # The empty documents collection simply follows the new model
+    service = AsyncDatabaseService(vector_size=4, embedding_model="model-b")
+    try:
+        await service._ensure_collection("documents")
+        config = (await service.client.get_collection("documents")).config
+        assert config.metadata[EMBEDDING_MODEL_KEY] == "model-b"
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_unrecorded_full_size_collection_is_adopted_as_gemini(local_qdrant):
+    """Test that collections from before the model was recorded are treated as Gemini Embedding 001 vectors."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, VectorParams, PointStruct
+    from database import EmbeddingMismatchError, EMBEDDING_MODEL_KEY
+    legacy = QdrantClient(path=local_qdrant)
+    legacy.create_collection("memories", vectors_config=VectorParams(size=3072, distance=Distance.COSINE))
+    legacy.upsert("memories", points=[PointStruct(id=1, vector=vector(0), payload={"content": "Old memory"})])
+    legacy.close()
+
+    local = AsyncDatabaseService(vector_size=3072, embedding_model="local-hash-ngram-v1-3072")
+    try:
+        with pytest.raises(EmbeddingMismatchError):
+            await local.initialize()
+    finally:
+        await local.close()
+
+    gemini = AsyncDatabaseService(vector_size=3072, embedding_model="models/gemini-embedding-001")
+    try:
+        await gemini.initialize()
+        config = (await gemini.client.get_collection("memories")).config
+        assert config.metadata[EMBEDDING_MODEL_KEY] == "models/gemini-embedding-001"
+        assert (await gemini.client.count("memories")).count == 1
+    finally:
+        await gemini.close()
+
+@pytest.mark.asyncio
+async def test_add_document_chunks_in_bulk(async_qdrant_service):
+    """Test that many chunks are stored with a single call."""
+    chunks = [
+        {"content": f"Chunk {i}", "embedding": vector(3), "metadata": {"source": "bulk.md", "chunk_index": i}}
+        for i in range(5)
+    ]
+
+    result = await async_qdrant_service.add_document_chunks(chunks)
+
+    assert result["status"] == "success" and result["count"] == 5
+    assert [r["status"] for r in result["results"]] == ["success"] * 5
+    assert (await async_qdrant_service.get_stats())["documents_count"] == 5
+
+@pytest.mark.asyncio
+async def test_add_memories_batches_with_per_point_status(async_qdrant_service, monkeypatch):
+    """Test batched upserts, wait=False, and that a bad point only fails itself."""
+    calls = []
+    upsert = async_qdrant_service.client.upsert
+
+    async def recording_upsert(**kwargs):
+        calls.append(kwargs)
+        return await upsert(**kwargs)
+
+    monkeypatch.setattr(async_qdrant_service.client, "upsert", recording_upsert)
+    memories = [{"content": f"Memory {i}", "embedding": vector(5)} for i in range(7)]
+    memories.insert(3, {"content": "Failed to embed", "embedding": []})
+
+    result = await async_qdrant_service.add_memories(memories, batch_size=3, wait=False)
+
+    assert result["status"] == "partial" and result["count"] == 7 and result["failed"] == 1
+    assert result["results"][3]["status"] == "error"
+    assert [len(c["points"]) for c in calls] == [3, 3, 1]
+    assert all(c["wait"] is False for c in calls)
+    assert (await async_qdrant_service.get_stats())["memories_count"] == 7
+
+@pytest.mark.asyncio
+async def test_unapplied_writes_hold_the_search_cache(async_qdrant_service):
+    """Test that a wait=False write keeps searches out of the cache until a barrier confirms it was applied."""
+    import asyncio
+    service = async_qdrant_service
+    await service.initialize()
+    service.local = False  # Server semantics: acknowledged is not yet applied
+    await service.add_memories([{"content": "Pending", "embedding": vector(1)}], wait=False)
+    assert service.search_cache.stats()["held"] == ["memories"]
+
+    await service.search_memories(vector(1), match_threshold=0.0)
+    assert service.search_cache.stats()["entries"] == 0
+
+    await asyncio.gather(*service._settling)
+    assert service.search_cache.stats()["held"] == []
+    assert [h["content"] for h in await service.search_memories(vector(1), match_threshold=0.0)] == ["Pending"]
+    assert service.search_cache.stats()["entries"] == 1
+
+@pytest.mark.asyncio
+async def test_document_chunk_ids_and_updates(async_qdrant_service):
+    """Test deterministic chunk IDs, payload updates and targeted deletes."""
+    import uuid
+    service = async_qdrant_service
+    ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"chunk-{i}")) for i in range(3)]
+    chunks = [{"id": pid, "content": f"Chunk {i}", "embedding": vector(4), "metadata": {"source": "ids.md", "chunk_index": i}} for i, pid in enumerate(ids)]
+
+    await service.add_document_chunks(chunks)
+    # Re-adding the same IDs overwrites instead of duplicating
+    await service.add_document_chunks(chunks)
+    assert (await service.get_stats())["documents_count"] == 3
+
+    assert await service.update_document_chunks({ids[2]: {"chunk_index": 1}})
+    assert (await service.client.retrieve("documents", [ids[2]]))[0].payload["chunk_index"] == 1
+
+    assert await service.update_document_fields("ids.md", {"total_chunks": 3})
+    assert all(p.payload["total_chunks"] == 3 for p in await service.client.retrieve("documents", ids))
+
+    assert await service.delete_document_chunks(ids[:2])
+    assert (await service.get_stats())["documents_count"] == 1
+
+@pytest.mark.asyncio
+async def test_async_service_api(local_qdrant):
+    """Test the AsyncQdrantClient-based service used by the kernel end to end."""
+    service = AsyncDatabaseService(vector_size=4)
+    try:
+        # Collections are created lazily on first use
+        assert await service.get_stats() == {"memories_count": 0, "documents_count": 0}
+
+        memory = await service.add_memory("Async memory", [1.0, 0.0, 0.0, 0.0], {"category": "test"})
+        assert memory["status"] == "success"
+        chunks = [{"content": f"Chunk {i}", "embedding": [0.0, 1.0, 0.0, 0.0], "metadata": {"source": "async.md", "chunk_index": i}} for i in range(3)]
+        assert (await service.add_document_chunks(chunks, batch_size=2))["count"] == 3
+
+        results = await service.search_multi([1.0, 0.0, 0.0, 0.0], {"memories": {"match_threshold": 0.9}, "documents": {"match_threshold": 0.9}})
+        assert [m["content"] for m in results["memories"]] == ["Async memory"]
+        assert results["documents"] == []
+
+        assert await service.update_document_fields("async.md", {"total_chunks": 3})
+        assert (await service.list_documents())[0]["metadata"]["total_chunks"] == 3
+        assert await service.delete_document("async.md")
+        assert await service.delete_memory(memory["id"])
+        assert await service.get_stats() == {"memories_count": 0, "documents_count": 0}
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_async_service_lazy_client_and_warm_up(local_qdrant):
+    """Test that construction opens nothing and warm_up initializes and probes every collection."""
+    from database import COLLECTIONS
+    service = AsyncDatabaseService(vector_size=4)
+    assert service._client is None
+    assert not os.path.exists(local_qdrant)
+    await service.close()  # Closing an unopened service is a no-op
+
+    try:
+        timings = await service.warm_up()
+        assert set(timings) == {"qdrant_init_ms", "qdrant_probe_ms"}
+        assert all(ms >= 0 for ms in timings.values())
+        names = {c.name for c in (await service.client.get_collections()).collections}
+        assert set(COLLECTIONS) <= names
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_unreachable_qdrant_degrades_instead_of_raising(monkeypatch):
+    """Test that warm-up is best-effort and service calls report failures as before when Qdrant is down."""
+    monkeypatch.setenv("QDRANT_URL", "http://127.0.0.1:9")  # Nothing listens on the discard port
+    monkeypatch.setenv("QDRANT_API_KEY", "unused")
+    service = AsyncDatabaseService(vector_size=4, embedding_model="test")
+    try:
+        assert await service.warm_up() == {}
+        assert await service.get_stats() == {"memories_count": 0, "documents_count": 0}
+        assert await service.search_memories([1.0, 0.0, 0.0, 0.0]) == []
+        assert await service.recent_memories() == []
+        assert await service.delete_memory("missing") is False
+        assert (await service.add_memory("Lost", [1.0, 0.0, 0.0, 0.0]))["status"] == "error"
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_search_cache_invalidated_by_writes(async_qdrant_service):
+    """Test that repeated searches are served from the cache until the collection is written."""
+    service = async_qdrant_service
+    cache = service.search_cache
+    query = vector(0)
+    await service.add_memory("First fact", query, {"category": "test"})
+
+    first = await service.search_memories(query, match_threshold=0.9)
+    assert [m["content"] for m in first] == ["First fact"]
+    assert await service.search_memories(query, match_threshold=0.9) == first
+    assert cache.stats()["collections"]["memories"]["hits"] == 1
+
+    second = await service.add_memory("Second fact", query, {"category": "test"})
+    assert {m["content"] for m in await service.search_memories(query, match_threshold=0.9)} == {"First fact", "Second fact"}
+
+    await service.delete_memory(second["id"])
+    assert [m["content"] for m in await service.search_memories(query, match_threshold=0.9)] == ["First fact"]
+    assert cache.stats()["collections"]["memories"]["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_search_with_vectors_for_reranking(async_qdrant_service):
+    """Test that vectors for re-ranking come back as float32 arrays, on dense and hybrid searches alike."""
+    query = vector(0)
+    await async_qdrant_service.add_memory("First fact", query, {"category": "test"})
+    for query_text in (None, "first fact"):
+        hits = await async_qdrant_service.search_memories(query, match_threshold=0.9, query_text=query_text, with_vectors=True)
+        assert hits[0]["vector"].dtype == "float32"
+        assert hits[0]["vector"].shape == (3072,)
+        assert ("fused_score" in hits[0]) == (query_text is not None)
+    assert "vector" not in (await async_qdrant_service.search_memories(query, match_threshold=0.9, query_text="first fact"))[0]
+
+@pytest.mark.asyncio
+async def test_filtered_search_and_payload_indexes(async_qdrant_service):
+    """Test payload-filtered searches and creation of the declared payload indexes."""
+    service = async_qdrant_service
+    embedding = vector(6)
+    await service.add_memory("Ship v2 by Friday", embedding, {"category": "project"})
+    await service.add_memory("Prefers dark mode", embedding, {"category": "preference"})
+    await service.add_document_chunks([
+        {"content": f"Chunk {i}", "embedding": embedding, "metadata": {"source": f"doc{i % 2}.md", "chunk_index": i}}
+        for i in range(6)
+    ])
+
+    project = await service.search_memories(embedding, filters={"category": "project"})
+    assert [m["content"] for m in project] == ["Ship v2 by Friday"]
+    both = await service.search_memories(embedding, filters={"category": ["project", "preference"]})
+    assert len(both) == 2
+    docs = await service.search_documents(embedding, match_count=10, filters={"source": "doc1.md", "chunk_index": {"gte": 3}})
+    assert sorted(d["metadata"]["chunk_index"] for d in docs) == [3, 5]
+    recent = await service.search_multi(embedding, {"memories": {"filters": {"timestamp": {"gte": "2000-01-01T00:00:00"}}}})
+    assert len(recent["memories"]) == 2
+
+    # Against a Qdrant server, missing indexes are created at collection setup
+    client = MagicMock()
+    client.get_collection = AsyncMock(return_value=MagicMock(payload_schema={"source": object()}))
+    client.create_payload_index = AsyncMock()
+    server = AsyncDatabaseService(vector_size=8)
+    server.client = client
+    server.local = False
+    await server._ensure_payload_indexes("documents")
+    created = {c.kwargs["field_name"] for c in client.create_payload_index.call_args_list}
+    assert created == {"type", "timestamp", "chunk_index"}
+
+@pytest.mark.asyncio
+async def test_search_thresholds_and_payload_projection(async_qdrant_service):
+    """Test server-side score thresholds, projected payloads and stored previews."""
+    from database import PREVIEW_CHARS
+    from qdrant_client.http.models import PointStruct
+    service = async_qdrant_service
+    query = vector(7)
+    weak = [0.0] * 3072
+    weak[7], weak[8] = 0.3, 0.95
+    long_text = "x" * (PREVIEW_CHARS * 3)
+    await service.add_document_chunk(long_text, query, {"source": "long.md", "chunk_index": 0})
+    await service.add_document_chunk("Barely related", weak, {"source": "weak.md", "chunk_index": 0})
+
+    # Weak hits are dropped by Qdrant, so they don't eat into the limit
+    hits = await service.search_documents(query, match_threshold=0.8, match_count=1)
+    assert [h["metadata"]["source"] for h in hits] == ["long.md"]
+    assert hits[0]["content"] == long_text and "preview" not in hits[0]["metadata"]
+
+    snippet = await service.search_documents(query, match_threshold=0.8, fields=["source"], preview=True)
+    assert snippet[0]["content"] == long_text[:PREVIEW_CHARS]
+    assert snippet[0]["metadata"] == {"source": "long.md"}
+
+    # Points stored before previews existed fall back to their full content
+    legacy_vector = vector(9)
+    await service.client.upsert("documents", [PointStruct(id=1, vector=legacy_vector, payload={"content": long_text, "source": "old.md"})])
+    legacy = await service.search_documents(legacy_vector, match_threshold=0.9, fields=["source"], preview=True)
+    assert legacy[0]["content"] == long_text[:PREVIEW_CHARS]
+
+@pytest.mark.asyncio
+async def test_cursor_pagination(async_qdrant_service):
+    """Test that listings page through collections instead of truncating them."""
+    service = async_qdrant_service
+    embedding = vector(7)
+    await service.add_memories([
+        {"content": f"Memory {i}", "embedding": embedding, "metadata": {"timestamp": f"2024-01-{i + 1:02d}T00:00:00"}}
+        for i in range(7)
+    ])
+    await service.add_document_chunks([
+        {"content": f"Chunk {i}", "embedding": embedding, "metadata": {"source": f"doc{i % 3}.md"}}
+        for i in range(9)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        page = await service.list_memories_page(limit=3, cursor=cursor)
+        assert len(page["memories"]) <= 3
+        seen.extend(m["id"] for m in page["memories"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 7
+    assert len([m async for m in service.iter_memories(page_size=2)]) == 7
+
+    recent = await service.recent_memories(limit=2)
+    assert [m["content"] for m in recent] == ["Memory 6", "Memory 5"]
+
+    assert len([p async for p in service.iter_document_chunks(page_size=2)]) == 9
+    docs = await service.list_documents()
+    assert sorted(d["filename"] for d in docs) == ["doc0.md", "doc1.md", "doc2.md"]
+    assert all("content" not in d["metadata"] for d in docs)
+
+@pytest.mark.asyncio
+async def test_storage_profiles_layout_and_migration(local_qdrant):
+    """Test that collections are created with, and migrated to, their storage profile."""
+    from types import SimpleNamespace
+    from qdrant_client.http import models
+    service = AsyncDatabaseService(vector_size=8)
+    service.profiles = {"memories": "fast", "documents": "compact"}
+
+    layout = service._collection_layout("documents__resize", 8)
+    assert layout["vectors_config"].on_disk is True
+    assert isinstance(layout["quantization_config"], models.BinaryQuantization)
+    assert service._collection_layout("memories", 8)["quantization_config"] is None
+
+    # An existing server collection with Qdrant defaults (in-RAM float32, no quantization)
+    config = SimpleNamespace(
+        params=SimpleNamespace(vectors=SimpleNamespace(on_disk=None)),
+        hnsw_config=models.HnswConfig(m=16, ef_construct=100, full_scan_threshold=10000),
+        quantization_config=None
+    )
+    client = MagicMock()
+    client.get_collection = AsyncMock(return_value=SimpleNamespace(config=config))
+    client.update_collection = AsyncMock()
+    service.client = client
+    service.local = False
+
+    await service._ensure_storage_profile("memories")
+    assert not client.update_collection.called  # Already matches "fast"
+
+    await service._ensure_storage_profile("documents")
+    changes = client.update_collection.call_args.kwargs
+    assert changes["vectors_config"][""].on_disk is True
+    assert changes["hnsw_config"].on_disk is True
+    assert isinstance(changes["quantization_config"], models.BinaryQuantization)
+
+@pytest.mark.asyncio
+async def test_hybrid_search_finds_exact_identifiers(local_qdrant):
+    """Test that legacy collections gain sparse vectors and hybrid queries match exact terms."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, VectorParams, PointStruct
+
+    # A collection created before hybrid search: unnamed dense vectors only
+    legacy = QdrantClient(path=local_qdrant)
+    legacy.create_collection("documents", vectors_config=VectorParams(size=4, distance=Distance.COSINE), metadata={"embedding_model": "legacy"})
+    legacy.upsert("documents", points=[
+        PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0], payload={"content": "Upload fails with ERR-4012 when the token expired", "source": "errors.md"}),
+        PointStruct(id=2, vector=[0.0, 1.0, 0.0, 0.0], payload={"content": "General notes about uploads", "source": "notes.md"}),
+    ])
+    legacy.close()
+
+    service = AsyncDatabaseService(vector_size=4, embedding_model="legacy")
+    try:
+        await service.initialize()
+        assert "text" in (await service.client.get_collection("documents")).config.params.sparse_vectors
+        assert (await service.client.count("documents")).count == 2
+
+        query = [0.0, 1.0, 0.0, 0.0]  # Semantically closest to the general notes only
+        dense = await service.search_documents(query, match_threshold=0.5)
+        assert [d["metadata"]["source"] for d in dense] == ["notes.md"]
+
+        # "ERR-5000" shares only the weak "err" term with the question: below the lexical floor
+        await service.add_document_chunk("Retry policy for ERR-5000", [0.0, 0.0, 1.0, 0.0], {"source": "retry.md"})
+        hybrid = await service.search_documents(query, match_threshold=0.5, query_text="what is ERR-4012?")
+        assert {d["metadata"]["source"] for d in hybrid} == {"notes.md", "errors.md"}
+        # "similarity" stays the dense cosine; the RRF score is reported separately
+        similarity = {d["metadata"]["source"]: d["similarity"] for d in hybrid}
+        assert similarity["notes.md"] == pytest.approx(1.0) and similarity["errors.md"] == pytest.approx(0.0)
+        assert all(0 < d["fused_score"] <= 1 and "vector" not in d for d in hybrid)
+
+        found = await service.search_multi(query, {"documents": {"match_count": 2}}, query_text="err-5000")
+        assert {d["metadata"]["source"] for d in found["documents"]} == {"notes.md", "retry.md"}
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_hybrid_search_off_keeps_legacy_collections(local_qdrant, monkeypatch):
+    """Test that with QDRANT_HYBRID_SEARCH=0 a collection without sparse vectors is neither re-laid out nor broken."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, VectorParams
+    monkeypatch.setattr("database.HYBRID_SEARCH", False)
+    legacy = QdrantClient(path=local_qdrant)
+    legacy.create_collection("documents", vectors_config=VectorParams(size=4, distance=Distance.COSINE), metadata={"embedding_model": "legacy"})
+    legacy.close()
+
+    service = AsyncDatabaseService(vector_size=4, embedding_model="legacy")
+    try:
+        assert (await service.add_document_chunk("Dense only", [1.0, 0.0, 0.0, 0.0], {"source": "a.md"}))["status"] == "success"
+        assert service.dense_only == {"documents"}
+        assert not (await service.client.get_collection("documents")).config.params.sparse_vectors
+        hits = await service.search_documents([1.0, 0.0, 0.0, 0.0], query_text="dense")
+        assert [h["content"] for h in hits] == ["Dense only"]
+    finally:
+        await service.close()
@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+import rerank
+from rerank import mmr, diversify
+
+
+def hit(id, vector, source):
+    return {"id": id, "content": f"chunk {id}", "similarity": 0.9, "metadata": {"source": source}, "vector": np.asarray(vector, dtype=np.float32)}
+
+
+QUERY = [1.0, 0.0, 0.0]
+HITS = [
+    hit("a1", [0.95, 0.31, 0.0], "a.md"),
+    hit("a2", [0.94, 0.34, 0.0], "a.md"),  # Overlapping neighbour of a1
+    hit("b1", [0.90, 0.0, 0.44], "b.md"),
+    hit("c1", [0.50, -0.87, 0.0], "c.md"),
+]
+
+
+def test_mmr_trades_relevance_for_novelty():
+    """Test that lambda=1 keeps the similarity order and a lower lambda skips the near-duplicate."""
+    vectors = np.stack([h["vector"] for h in HITS])
+    assert mmr(np.asarray(QUERY), vectors, 3, lambda_=1.0) == [0, 1, 2]
+    assert mmr(np.asarray(QUERY), vectors, 2, lambda_=0.7) == [0, 2]
+    assert mmr(np.asarray(QUERY), vectors, 3, lambda_=0.5) == [0, 3, 2]
+    assert mmr(np.asarray(QUERY), vectors, 10, lambda_=0.5) == [0, 3, 2, 1]
+
+
+def test_diversify_caps_sources_and_strips_vectors(monkeypatch):
+    """Test the per-source cap, removal of vectors and the passthrough when MMR is off."""
+    picked = diversify(QUERY, HITS, 3, lambda_=1.0, max_per_source=1)
+    assert [h["id"] for h in picked] == ["a1", "b1", "c1"]
+    assert all("vector" not in h for h in picked)
+    assert "vector" in HITS[0]  # Input hits are left untouched
+
+    monkeypatch.setattr(rerank, "MMR_ENABLED", False)
+    assert [h["id"] for h in diversify(QUERY, HITS, 2)] == ["a1", "a2"]
+    assert rerank.candidate_count(3) == 3
+
+
+def test_hybrid_rank_is_the_relevance_term():
+    """Test that a top lexical-only hit (far from the query vector) survives near-duplicate dense chunks."""
+    hits = [
+        {**hit("err", [0.0, 0.0, 1.0], "errors.md"), "similarity": 0.0, "fused_score": 0.5},  # Exact ERR-4012 match
+        {**hit("a1", [0.95, 0.31, 0.0], "a.md"), "fused_score": 0.33},
+        {**hit("a2", [0.94, 0.34, 0.0], "a.md"), "fused_score": 0.25},
+    ]
+    assert rerank.relevance_scores(hits).tolist() == pytest.approx([1.0, 0.66, 0.5])
+    assert [h["id"] for h in diversify(QUERY, hits, 2, lambda_=0.7)] == ["err", "a1"]
+    # Dense hits (no fused score) fall back to the query cosine
+    assert rerank.relevance_scores(HITS) is None
@@ -0,0 +1,80 @@
+from search_cache import SearchCache
+
+HITS = [{"id": "1", "content": "Aether uses Qdrant", "metadata": {"category": "project"}, "similarity": 0.9}]
+
+
+def test_key_tolerates_float_noise_but_not_parameter_changes():
+    """Test that re-embedding noise maps to the same key while any search argument changes it."""
+    cache = SearchCache(decimals=3)
+    key = cache.make_key("memories", [0.1, -0.0, 0.3], limit=5, filters={"a": 1, "b": 2})
+    assert cache.make_key("memories", [0.10001, 0.0, 0.29999], limit=5, filters={"b": 2, "a": 1}) == key
+    assert cache.make_key("memories", [0.1, 0.0, 0.3], limit=6, filters={"a": 1, "b": 2}) != key
+    assert cache.make_key("documents", [0.1, 0.0, 0.3], limit=5, filters={"a": 1, "b": 2}) != key
+
+
+def test_generation_invalidates_and_rejects_racing_results():
+    """Test that a write hides cached results and results read before it are not stored."""
+    cache = SearchCache(ttl=60)
+    key = cache.make_key("memories", [1.0, 0.0], limit=5)
+    cache.put(key, HITS, cache.generation("memories"))
+
+    cached = cache.get(key)
+    assert cached == HITS
+    cached[0]["content"] = "mutated by a caller"
+    assert cache.get(key) == HITS
+
+    before_write = cache.generation("memories")
+    cache.invalidate("memories")
+    assert cache.get(key) is None
+    cache.put(key, HITS, before_write)  # Search that raced the write
+    assert cache.get(key) is None
+
+    cache.invalidate("documents")  # Other collections are unaffected
+    cache.put(key, HITS, cache.generation("memories"))
+    assert cache.get(key) == HITS
+
+    stats = cache.stats()
+    assert stats["stale"] == 1
+    assert stats["collections"]["memories"]["hits"] == 3
+    assert stats["collections"]["memories"]["misses"] == 2
+    assert stats["collections"]["memories"]["generation"] == 1
+    assert stats["hit_ratio"] == 0.6
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    """Test that entries expire after the TTL and the least recently used entry is evicted first."""
+    now = [1000.0]
+    monkeypatch.setattr("search_cache.time.monotonic", lambda: now[0])
+    cache = SearchCache(max_entries=2, ttl=10)
+    keys = [cache.make_key("documents", [float(i), 1.0], limit=3) for i in range(3)]
+
+    cache.put(keys[0], HITS, 0)
+    cache.put(keys[1], HITS, 0)
+    assert cache.get(keys[0]) == HITS  # keys[1] is now least recently used
+    cache.put(keys[2], HITS, 0)
+    assert cache.get(keys[1]) is None
+    assert cache.stats()["evictions"] == 1
+
+    now[0] += 11
+    assert cache.get(keys[0]) is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_hold_blocks_caching_until_writes_are_applied():
+    """Test that results read while an acknowledged write is pending are neither stored nor served after it."""
+    cache = SearchCache(ttl=60)
+    key = cache.make_key("memories", [1.0, 0.0], limit=5)
+
+    cache.hold("memories")
+    during_write = cache.generation("memories")
+    cache.put(key, HITS, during_write)
+    assert cache.get(key) is None
+    assert cache.stats()["held"] == ["memories"]
+
+    cache.release("memories")
+    cache.put(key, HITS, during_write)  # Read before the write was applied
+    assert cache.get(key) is None
+    cache.put(key, HITS, cache.generation("memories"))
+    assert cache.get(key) == HITS
+    assert cache.stats()["held"] == []
@@ -0,0 +1,23 @@
+from sparse import tokenize, document_vector, query_vector
+
+def test_identifiers_are_indexed_whole_and_by_parts():
+    """Test that code identifiers and error codes match both exactly and by their parts."""
+    terms = tokenize("The parse_config() call in DatabaseService raised ERR-4012")
+    assert {"parse_config", "parse", "config", "databaseservice", "database", "service", "err-4012", "4012"} <= set(terms)
+    assert "the" not in terms and "in" not in terms
+
+def test_bm25_weights_saturate_and_normalize_length():
+    """Test that repeated terms gain less than linearly and long texts weigh each term less."""
+    once = document_vector("qdrant")
+    thrice = document_vector("qdrant qdrant qdrant")
+    assert once.indices == thrice.indices
+    assert once.values[0] < thrice.values[0] < 3 * once.values[0]
+
+    short = document_vector("qdrant index")
+    long = document_vector("qdrant " + " ".join(f"word{i}" for i in range(400)))
+    assert long.values[long.indices.index(short.indices[0])] < short.values[0]
+
+def test_query_vector_uses_unit_weights():
+    vector = query_vector("ERR-4012 err-4012")
+    assert sorted(vector.indices) == sorted(document_vector("err-4012").indices) and set(vector.values) == {1.0}
+    assert query_vector("the of and").indices == []
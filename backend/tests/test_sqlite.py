@@ -79,3 +79,50 @@ async def test_session_deletion(sqlite_service):
     # Since foreign_keys are ON in delete_session, messages should be gone
     messages_after = await sqlite_service.get_messages(session_id)
     assert len(messages_after) == 0
+
+@pytest.mark.asyncio
+async def test_init_db_adds_missing_columns(test_db_path, schema_path):
+    """Test that init_db upgrades tables created by an older schema."""
+    import aiosqlite
+    from local_db import SQLiteService
+    async with aiosqlite.connect(test_db_path) as db:
+        await db.execute(
+            "CREATE TABLE chunk_manifest (source TEXT NOT NULL, chunk_hash TEXT NOT NULL, point_id TEXT NOT NULL, "
+            "chunk_index INTEGER NOT NULL, total_chunks INTEGER NOT NULL, indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+            "PRIMARY KEY (source, chunk_hash))"
+        )
+        await db.commit()
+
+    service = SQLiteService(db_path=test_db_path, schema_path=schema_path)
+    await service.init_db()
+    await service.upsert_chunk_manifest("a.md", [{"chunk_hash": "h", "point_id": "p", "chunk_index": 0, "total_chunks": 1, "duplicate_of": "q"}])
+    assert (await service.get_chunk_manifest("a.md"))["h"]["duplicate_of"] == "q"
+
+@pytest.mark.asyncio
+async def test_document_catalog_backfills_from_manifest(sqlite_service):
+    """Test that sources indexed before the catalog existed show up as indexed."""
+    await sqlite_service.upsert_chunk_manifest("old.md", [{"chunk_hash": "h", "point_id": "p", "chunk_index": 0, "total_chunks": 4}])
+    await sqlite_service.sync_document_catalog({"old.md": (2048, 1), "new.md": (10, 2)})
+    catalog = {e["filename"]: e for e in await sqlite_service.list_document_catalog()}
+    assert catalog["old.md"]["state"] == "indexed" and catalog["old.md"]["total_chunks"] == 4
+    assert catalog["new.md"]["state"] == "on_disk" and catalog["new.md"]["indexed_at"] is None
+
+    await sqlite_service.update_document_entry("new.md", state="indexing")
+    assert (await sqlite_service.get_document_entry("new.md"))["size"] == 10  # Untouched columns are kept
+
+@pytest.mark.asyncio
+async def test_document_catalog_recovers_interrupted_and_missing_sources(sqlite_service):
+    """Test that startup fails rows left 'indexing' and indexed files gone from disk are marked missing."""
+    await sqlite_service.sync_document_catalog({"crashed.md": (10, 1), "gone.md": (20, 2)})
+    await sqlite_service.update_document_entry("crashed.md", state="indexing")
+    await sqlite_service.update_document_entry("gone.md", state="indexed", indexed_at="2026-01-01T00:00:00")
+
+    await sqlite_service.sync_document_catalog({"crashed.md": (10, 1)})  # A rescan leaves running jobs alone
+    assert (await sqlite_service.get_document_entry("crashed.md"))["state"] == "indexing"
+    gone = await sqlite_service.get_document_entry("gone.md")
+    assert gone["state"] == "missing" and gone["indexed_at"]
+
+    await sqlite_service.sync_document_catalog({"crashed.md": (10, 1), "gone.md": (20, 2)}, interrupted=True)
+    crashed = await sqlite_service.get_document_entry("crashed.md")
+    assert crashed["state"] == "failed" and "interrupted" in crashed["error"]
+    assert (await sqlite_service.get_document_entry("gone.md"))["state"] == "indexed"
@@ -0,0 +1,97 @@
+import pytest
+import os
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from watcher import KnowledgeWatcher
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    path = tmp_path / "knowledge"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def fake_jobs(sqlite_service, monkeypatch):
+    """Route watcher state to the test database and capture queued jobs."""
+    monkeypatch.setattr("watcher.sqlite_service", sqlite_service)
+    monkeypatch.setattr("ingest.sqlite_service", sqlite_service)
+    jobs = MagicMock()
+    jobs.enqueue = AsyncMock(side_effect=lambda name, follow_up=False: {"id": f"job-{name}"})
+    jobs.cancel_file = AsyncMock()
+    jobs.requeue_orphans = AsyncMock()
+    monkeypatch.setattr("watcher.ingest_jobs", jobs)
+    return jobs
+
+
+@pytest.fixture
+def mock_db():
+    db = MagicMock()
+    db.delete_document = AsyncMock(return_value=True)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_startup_reconciliation(source_dir, fake_jobs, mock_db, sqlite_service):
+    """Test that changes made while offline are queued and deleted files lose their vectors."""
+    (source_dir / "kept.md").write_text("unchanged", encoding="utf-8")
+    (source_dir / "edited.md").write_text("new text", encoding="utf-8")
+    (source_dir / "image.png").write_bytes(b"\x89PNG")
+    (source_dir / "specs").mkdir()
+    (source_dir / "specs" / "api.md").write_text("nested", encoding="utf-8")
+    (source_dir / ".git").mkdir()
+    (source_dir / ".git" / "HEAD.md").write_text("hidden", encoding="utf-8")
+    kept = os.stat(source_dir / "kept.md")
+    await sqlite_service.upsert_watched_file("kept.md", kept.st_mtime_ns, kept.st_size)
+    await sqlite_service.upsert_watched_file("edited.md", 1, 3)
+    await sqlite_service.upsert_watched_file("gone.md", 1, 3)
+
+    watcher = KnowledgeWatcher(source_dir=str(source_dir), backend="poll", poll_interval=60)
+    await watcher.start(mock_db)
+    await watcher.stop()
+
+    # Subfolders are watched under their relative names, like the bulk CLI indexes them
+    assert [c.args[0] for c in fake_jobs.enqueue.call_args_list] == ["edited.md", "specs/api.md"]
+    mock_db.delete_document.assert_called_once_with("gone.md")
+    fake_jobs.cancel_file.assert_awaited_once_with("gone.md")
+    assert set(await sqlite_service.get_watched_files()) == {"kept.md", "edited.md", "specs/api.md"}
+
+
+@pytest.mark.asyncio
+async def test_changes_are_debounced(source_dir, fake_jobs, mock_db):
+    """Test that a burst of writes to one file results in a single indexing job."""
+    watcher = KnowledgeWatcher(source_dir=str(source_dir), debounce=0.2, backend="poll")
+    watcher.db = mock_db
+
+    path = source_dir / "draft.md"
+    for i in range(3):
+        path.write_text("x" * (i + 1), encoding="utf-8")
+        assert (await watcher.scan())["changed"] == set()
+
+    await asyncio.sleep(0.25)
+    assert (await watcher.scan())["changed"] == {"draft.md"}
+    assert (await watcher.scan())["changed"] == set()
+    assert fake_jobs.enqueue.await_count == 1
+
+    path.unlink()
+    assert (await watcher.scan())["removed"] == set()
+    await asyncio.sleep(0.25)
+    assert (await watcher.scan())["removed"] == {"draft.md"}
+    mock_db.delete_document.assert_called_once_with("draft.md")
+
+
+@pytest.mark.asyncio
+async def test_polling_loop_picks_up_new_files(source_dir, fake_jobs, mock_db):
+    """Test the background loop with the polling fallback."""
+    watcher = KnowledgeWatcher(source_dir=str(source_dir), debounce=0.05, poll_interval=0.02, backend="poll")
+    await watcher.start(mock_db)
+    try:
+        (source_dir / "notes.txt").write_text("hello", encoding="utf-8")
+        for _ in range(100):
+            if fake_jobs.enqueue.await_count:
+                break
+            await asyncio.sleep(0.02)
+        fake_jobs.enqueue.assert_awaited_once_with("notes.txt", follow_up=True)
+    finally:
+        await watcher.stop()
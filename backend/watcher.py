@@ -0,0 +1,154 @@
+"""
+Knowledge source watcher.
+Keeps the vector store in sync with SOURCE_DIR (including subfolders) without manual "index" clicks:
+created or modified files are queued as incremental indexing jobs, deleted files have
+their vectors removed. Filesystem events (watchfiles/inotify, when installed) only wake
+the watcher up early; what changed is always decided by comparing mtime/size snapshots,
+so the periodic polling fallback behaves exactly the same, just with more latency.
+A file is only processed once its snapshot has been stable for the debounce window,
+which coalesces editor save bursts and half-written uploads into a single job.
+On start, a reconciliation pass compares the directory with the last known snapshot
+(persisted in SQLite) to pick up changes made while the kernel was offline.
+Enable with KNOWLEDGE_WATCHER=1.
+"""
+import os
+import time
+import asyncio
+from typing import Dict, Optional, Set, Tuple
+
+from local_db import sqlite_service
+from jobs import ingest_jobs
+
+Snapshot = Dict[str, Tuple[int, int]]  # filename (relative POSIX path) -> (mtime_ns, size)
+
+
+class KnowledgeWatcher:
+    def __init__(self, source_dir: str = None, debounce: float = None, poll_interval: float = None, backend: str = None):
+        self.source_dir = source_dir
+        self.enabled = os.getenv("KNOWLEDGE_WATCHER", "0") == "1"
+        self.debounce = debounce if debounce is not None else float(os.getenv("KNOWLEDGE_WATCH_DEBOUNCE", "2.0"))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("KNOWLEDGE_WATCH_POLL_INTERVAL", "5.0"))
+        self.backend = backend or os.getenv("KNOWLEDGE_WATCH_BACKEND", "auto")  # auto, watchfiles, poll
+        self.db = None
+        self.known: Snapshot = {}
+        self._pending: Dict[str, Tuple[Optional[Tuple[int, int]], float]] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self.stats = {"scans": 0, "queued": 0, "deleted": 0}
+
+    def _dir(self) -> str:
+        from ingest import SOURCE_DIR
+        return self.source_dir or SOURCE_DIR
+
+    def snapshot(self) -> Snapshot:
+        """Stats the indexable files under the source directory (no file contents are read)."""
+        from ingest import walk_sources
+        return {name: (info.st_mtime_ns, info.st_size) for name, _, info in walk_sources(self._dir())}
+
+    async def start(self, db):
+        """Reconciles the directory with the last known state, then starts watching."""
+        self.db = db
+        self.known = {name: (row["mtime_ns"], row["size"]) for name, row in (await sqlite_service.get_watched_files()).items()}
+        await self.scan(reconcile=True)
+
+        self._tasks = [asyncio.create_task(self._loop())]
+        watcher = self._event_source()
+        if watcher:
+            self._tasks.append(asyncio.create_task(watcher))
+        print(f"[Watcher] Watching {self._dir()} ({'events' if watcher else f'polling every {self.poll_interval}s'}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _event_source(self):
+        if self.backend == "poll":
+            return None
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            if self.backend == "watchfiles":
+                print("[Watcher] watchfiles is not installed. Falling back to polling.")
+            return None
+
+        async def watch():
+            os.makedirs(self._dir(), exist_ok=True)
+            try:
+                async for _ in awatch(self._dir(), recursive=True):
+                    self._wakeup.set()
+            except Exception as e:
+                # e.g. inotify watch limit reached: the polling loop keeps running regardless
+                print(f"[Watcher] Filesystem events unavailable ({e}). Falling back to polling.")
+
+        return watch()
+
+    async def _loop(self):
+        while True:
+            # Events wake the loop early; the timeout doubles as the polling fallback
+            timeout = self.debounce if self._pending else self.poll_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.scan()
+            except Exception as e:
+                print(f"[Watcher] Scan failed: {e}")
+
+    async def scan(self, reconcile: bool = False) -> Dict[str, Set[str]]:
+        """
+        Diffs the directory against the known snapshot. Changes are acted on once they have
+        been stable for `debounce` seconds (immediately when reconciling at startup).
+        """
+        self.stats["scans"] += 1
+        # os.walk plus a stat per file: off the event loop for large folders
+        current = await asyncio.to_thread(self.snapshot)
+        now = time.monotonic()
+        ready_changed, ready_removed = set(), set()
+
+        for name in set(current) | set(self.known) | set(self._pending):
+            state = current.get(name)
+            if state == self.known.get(name):
+                self._pending.pop(name, None)
+                continue
+            pending = self._pending.get(name)
+            if pending is None or pending[0] != state:
+                # New or still changing: (re)start the quiet period
+                self._pending[name] = (state, now)
+                if not reconcile:
+                    continue
+            elif now - pending[1] < self.debounce:
+                continue
+            del self._pending[name]
+            (ready_changed if state else ready_removed).add(name)
+
+        for name in sorted(ready_changed):
+            await self._index(name, current[name])
+        for name in sorted(ready_removed):
+            await self._remove(name)
+        return {"changed": ready_changed, "removed": ready_removed}
+
+    async def _index(self, name: str, state: Tuple[int, int]):
+        job = await ingest_jobs.enqueue(name, follow_up=True)
+        self.known[name] = state
+        await sqlite_service.upsert_watched_file(name, *state)
+        self.stats["queued"] += 1
+        print(f"[Watcher] {name} changed. Queued indexing job {job['id']}.")
+
+    async def _remove(self, name: str):
+        from ingest import forget_source
+        await ingest_jobs.cancel_file(name)
+        result = await forget_source(name, self.db)
+        if result["deleted"]:
+            await ingest_jobs.requeue_orphans(result["orphaned_sources"])
+            await sqlite_service.remove_watched_file(name)
+            self.known.pop(name, None)
+            self.stats["deleted"] += 1
+            await sqlite_service.add_log("info", "KNOWLEDGE", f"Source removed from disk, vectors deleted: {name}")
+
+
+# Singleton instance
+knowledge_watcher = KnowledgeWatcher()
@@ -2,14 +2,13 @@ import json
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from local_db import sqlite_service
-from agent import model
+from agent import get_model
 
 class WorldInsight(BaseModel):
     insight: str = Field(description="Main conclusion about the project development direction based on telemetry.")
     suggested_action: str = Field(description="Proposed optimization or proactive fix action for Aether.")
 
 world_agent = Agent(
-    model=model,
     system_prompt=(
         "You are the Aether Active World Model (AWM) module. "
         "Your task is to conduct a silent background simulation (Self-Reflection) based on the latest raw system logs. "
@@ -34,7 +33,7 @@ async def run_active_world_model_simulation():
         prompt += f"[{log['type'].upper()}|{log['source']}] {log['message']}\n"
         
     try:
-        result = await world_agent.run(prompt)
+        result = await world_agent.run(prompt, model=get_model())
         
         # Agent returns a validated Pydantic object (WorldInsight)
         data = result.output.model_dump()
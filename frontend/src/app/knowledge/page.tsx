@@ -170,7 +170,19 @@ export default function KnowledgeBase() {
             const res = await fetch(`http://localhost:8000/knowledge/index/${filename}`, {
                 method: "POST",
             });
-            const data = await res.json();
+            let data = await res.json();
+            if (data.status === "success" && data.job) {
+                // Indexing runs as a background job; poll until it settles
+                let job = data.job;
+                while (job.status === "queued" || job.status === "running") {
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                    const poll = await fetch(`http://localhost:8000/knowledge/jobs/${job.id}`);
+                    job = (await poll.json()).job ?? { status: "failed", error: "Job not found." };
+                }
+                data = job.status === "completed"
+                    ? { status: "success" }
+                    : { status: "error", message: job.error || `Indexing ${job.status}.` };
+            }
             if (data.status === "success") {
                 await fetchDocuments();
                 setNotification({
@@ -241,7 +253,7 @@ export default function KnowledgeBase() {
                             ref={fileInputRef}
                             className="hidden"
                             onChange={handleFileChange}
-                            accept=".md,.txt,.pdf"
+                            accept=".md,.txt,.pdf,.docx,.html,.htm,.json,.jsonl,.csv,.tsv,.py,.js,.ts,.tsx"
                         />
 
                         <button
@@ -23,11 +23,19 @@ export default function Memories() {
 
     const fetchMemories = async () => {
         try {
-            const response = await fetch("http://localhost:8000/memories");
-            const data = await response.json();
-            if (data.status === "success") {
-                setMemories(data.memories);
-            }
+            // The API pages through memories; follow next_cursor until the last page
+            // eslint-disable-next-line @typescript-eslint/no-explicit-any
+            const all: any[] = [];
+            let cursor: string | null = null;
+            do {
+                const query: string = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+                const response = await fetch(`http://localhost:8000/memories?limit=500${query}`);
+                const data = await response.json();
+                if (data.status !== "success") break;
+                all.push(...data.memories);
+                cursor = data.next_cursor;
+            } while (cursor);
+            setMemories(all);
         } catch (error) {
             console.error("Failed to fetch memories", error);
         } finally {
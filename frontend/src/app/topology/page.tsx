@@ -6,7 +6,8 @@ import { useState, useEffect } from "react";
 import NeuralTopologyView from "@/components/NeuralTopologyView";
 
 export default function NeuralTopology() {
-    const [memories, setMemories] = useState([]);
+    // eslint-disable-next-line @typescript-eslint/no-explicit-any
+    const [memories, setMemories] = useState<any[]>([]);
     const [conceptGraph, setConceptGraph] = useState({ nodes: [], links: [] });
     const [isNightMode, setIsNightMode] = useState(false);
     const [isLoading, setIsLoading] = useState(true);
@@ -15,11 +16,18 @@ export default function NeuralTopology() {
         const fetchData = async () => {
             try {
                 // Fetch memories
-                const memRes = await fetch("http://localhost:8000/memories");
-                const memData = await memRes.json();
-                if (memData.status === "success") {
-                    setMemories(memData.memories);
-                }
+                // eslint-disable-next-line @typescript-eslint/no-explicit-any
+                const allMemories: any[] = [];
+                let cursor: string | null = null;
+                do {
+                    const query: string = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+                    const memRes = await fetch(`http://localhost:8000/memories?limit=500${query}`);
+                    const memData = await memRes.json();
+                    if (memData.status !== "success") break;
+                    allMemories.push(...memData.memories);
+                    cursor = memData.next_cursor;
+                } while (cursor);
+                setMemories(allMemories);
 
                 // Fetch graph
                 const graphRes = await fetch("http://localhost:8000/graph");